@@ -0,0 +1,141 @@
+"""partition log_entries by month and add hourly log rollups
+
+Revision ID: 2b8e0f4c6d13
+Revises: d41b7a2e9c05
+Create Date: 2026-10-19 12:48:05.912376
+
+On Postgres log_entries becomes a table partitioned by RANGE (timestamp) with
+one partition per month plus a default partition; its primary key grows to
+(id, timestamp) because partition keys must be part of every unique index.
+SQLite keeps a plain table and is rotated by app.services.log_retention.
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b8e0f4c6d13'
+down_revision: Union[str, None] = 'd41b7a2e9c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOG_ENTRY_INDEXES = {
+    'ix_log_entries_timestamp_id': ['timestamp', 'id'],
+    'ix_log_entries_document_id_timestamp_id': ['document_id', 'timestamp', 'id'],
+    'ix_log_entries_user_id_timestamp_id': ['user_id', 'timestamp', 'id'],
+    'ix_log_entries_event_type_timestamp_id': ['event_type', 'timestamp', 'id'],
+}
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _drop_log_entry_indexes() -> None:
+    op.drop_index(op.f('ix_log_entries_id'), table_name='log_entries')
+    for name in LOG_ENTRY_INDEXES:
+        op.drop_index(name, table_name='log_entries')
+
+
+def _create_log_entry_indexes() -> None:
+    op.create_index(op.f('ix_log_entries_id'), 'log_entries', ['id'], unique=False)
+    for name, columns in LOG_ENTRY_INDEXES.items():
+        op.create_index(name, 'log_entries', columns, unique=False)
+
+
+def _partition_log_entries() -> None:
+    bind = op.get_bind()
+    _drop_log_entry_indexes()
+    op.execute("ALTER TABLE log_entries RENAME TO log_entries_unpartitioned")
+    op.execute("ALTER TABLE log_entries_unpartitioned DROP CONSTRAINT log_entries_pkey")
+    op.execute("ALTER SEQUENCE log_entries_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE log_entries (
+            id INTEGER NOT NULL DEFAULT nextval('log_entries_id_seq'),
+            event_type VARCHAR NOT NULL,
+            document_id INTEGER REFERENCES documents (id),
+            user_id INTEGER REFERENCES users (id),
+            details JSON,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE log_entries_id_seq OWNED BY log_entries.id")
+    op.execute("CREATE TABLE log_entries_default PARTITION OF log_entries DEFAULT")
+
+    months = {
+        row[0].date() for row in bind.execute(sa.text(
+            "SELECT DISTINCT date_trunc('month', timestamp) FROM log_entries_unpartitioned"
+        ))
+    }
+    current = date.today().replace(day=1)
+    months.update({current, _next_month(current)})
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE log_entries_{month.year:04d}_{month.month:02d} PARTITION OF log_entries "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+
+    op.execute(
+        "INSERT INTO log_entries (id, event_type, document_id, user_id, details, timestamp) "
+        "SELECT id, event_type, document_id, user_id, details, timestamp FROM log_entries_unpartitioned"
+    )
+    op.execute("DROP TABLE log_entries_unpartitioned")
+    _create_log_entry_indexes()
+
+
+def _unpartition_log_entries() -> None:
+    _drop_log_entry_indexes()
+    op.execute("ALTER TABLE log_entries RENAME TO log_entries_partitioned")
+    op.execute("ALTER SEQUENCE log_entries_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE log_entries (
+            id INTEGER NOT NULL DEFAULT nextval('log_entries_id_seq') PRIMARY KEY,
+            event_type VARCHAR NOT NULL,
+            document_id INTEGER REFERENCES documents (id),
+            user_id INTEGER REFERENCES users (id),
+            details JSON,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute("ALTER SEQUENCE log_entries_id_seq OWNED BY log_entries.id")
+    op.execute(
+        "INSERT INTO log_entries (id, event_type, document_id, user_id, details, timestamp) "
+        "SELECT id, event_type, document_id, user_id, details, timestamp FROM log_entries_partitioned"
+    )
+    op.execute("DROP TABLE log_entries_partitioned CASCADE")
+    _create_log_entry_indexes()
+
+
+def upgrade() -> None:
+    op.create_table(
+        'log_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('bucket', 'event_type', name='uq_log_rollups_bucket_event_type')
+    )
+
+    # Backfill the hourly counters from the existing log entries
+    if op.get_bind().dialect.name == 'postgresql':
+        hour = "date_trunc('hour', timestamp)"
+    else:
+        hour = "strftime('%Y-%m-%d %H:00:00.000000', timestamp)"
+    op.execute(
+        f"INSERT INTO log_rollups (bucket, event_type, count) "
+        f"SELECT {hour}, event_type, COUNT(*) FROM log_entries GROUP BY 1, 2"
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_log_entries()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_log_entries()
+    op.drop_table('log_rollups')
@@ -0,0 +1,47 @@
+"""add unique index for year/month folders
+
+Revision ID: 3c7e9a1f5b20
+Revises: 9e5c2a7b4f18
+Create Date: 2026-10-19 17:12:05.418337
+
+Duplicate year/month folders created by earlier races are kept as plain
+folders (year and month cleared) so the index can be built; the oldest one
+of each set stays the dated folder.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7e9a1f5b20'
+down_revision: Union[str, None] = '9e5c2a7b4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE folders SET year = NULL, month = NULL
+        WHERE year IS NOT NULL AND id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MIN(id) AS keep_id FROM folders
+                WHERE year IS NOT NULL
+                GROUP BY COALESCE(parent_id, 0), year, COALESCE(month, 0)
+            ) AS keepers
+        )
+    """)
+    op.create_index(
+        'uq_folders_parent_id_year_month',
+        'folders',
+        [sa.text('COALESCE(parent_id, 0)'), 'year', sa.text('COALESCE(month, 0)')],
+        unique=True,
+        sqlite_where=sa.text('year IS NOT NULL'),
+        postgresql_where=sa.text('year IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_folders_parent_id_year_month', table_name='folders')
@@ -0,0 +1,33 @@
+"""add document listing indexes
+
+Revision ID: 5f2a9c1e7b34
+Revises: a4b325debba9, add_credentials_column
+Create Date: 2026-10-19 09:12:40.511203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c1e7b34'
+down_revision: Union[str, None] = ('a4b325debba9', 'add_credentials_column')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite indexes for keyset pagination of GET /documents
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'], unique=False)
+    op.create_index('ix_documents_folder_id_created_at_id', 'documents', ['folder_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_documents_mime_type_created_at_id', 'documents', ['mime_type', 'created_at', 'id'], unique=False)
+    op.create_index('ix_document_categories_category_id_document_id', 'document_categories', ['category_id', 'document_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_categories_category_id_document_id', table_name='document_categories')
+    op.drop_index('ix_documents_mime_type_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_folder_id_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
@@ -0,0 +1,39 @@
+"""add per-user unread notification counters
+
+Revision ID: 6a1f3c8d2e49
+Revises: 2b8e0f4c6d13
+Create Date: 2026-10-19 13:55:21.406118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1f3c8d2e49'
+down_revision: Union[str, None] = '2b8e0f4c6d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Seed the counters from the notifications that are currently unread
+    op.execute(
+        "INSERT INTO notification_counters (user_id, unread_count) "
+        "SELECT user_id, COUNT(*) FROM notifications "
+        "WHERE user_id IS NOT NULL AND read = false GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_counters')
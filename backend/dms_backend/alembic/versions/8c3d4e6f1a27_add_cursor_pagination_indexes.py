@@ -0,0 +1,71 @@
+"""add cursor pagination indexes for logs, notifications and feedback
+
+Revision ID: 8c3d4e6f1a27
+Revises: 5f2a9c1e7b34
+Create Date: 2026-10-19 10:03:17.284915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3d4e6f1a27'
+down_revision: Union[str, None] = '5f2a9c1e7b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # log_entries and notifications were previously only created by
+    # Base.metadata.create_all, so create them here when they are missing
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('log_entries'):
+        op.create_table(
+            'log_entries',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('event_type', sa.String(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('details', sa.JSON(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'])
+        )
+        op.create_index(op.f('ix_log_entries_id'), 'log_entries', ['id'], unique=False)
+    if not inspector.has_table('notifications'):
+        op.create_table(
+            'notifications',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('message', sa.String(), nullable=False),
+            sa.Column('event_type', sa.String(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('read', sa.Boolean(), nullable=True),
+            sa.Column('read_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'])
+        )
+        op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+
+    # Composite (sort key, id) indexes so each cursor page is an index range scan
+    op.create_index('ix_log_entries_timestamp_id', 'log_entries', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_log_entries_document_id_timestamp_id', 'log_entries', ['document_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_log_entries_user_id_timestamp_id', 'log_entries', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_notifications_user_id_created_at_id', 'notifications', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_notifications_user_id_read_created_at_id', 'notifications', ['user_id', 'read', 'created_at', 'id'], unique=False)
+    op.create_index('ix_feedback_timestamp_id', 'feedback', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_feedback_user_id_timestamp_id', 'feedback', ['user_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_user_id_timestamp_id', table_name='feedback')
+    op.drop_index('ix_feedback_timestamp_id', table_name='feedback')
+    op.drop_index('ix_notifications_user_id_read_created_at_id', table_name='notifications')
+    op.drop_index('ix_notifications_user_id_created_at_id', table_name='notifications')
+    op.drop_index('ix_log_entries_user_id_timestamp_id', table_name='log_entries')
+    op.drop_index('ix_log_entries_document_id_timestamp_id', table_name='log_entries')
+    op.drop_index('ix_log_entries_timestamp_id', table_name='log_entries')
@@ -0,0 +1,26 @@
+"""add email digest preference to users
+
+Revision ID: 9e5c2a7b4f18
+Revises: 6a1f3c8d2e49
+Create Date: 2026-10-19 14:37:44.058263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e5c2a7b4f18'
+down_revision: Union[str, None] = '6a1f3c8d2e49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('email_digest', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'email_digest')
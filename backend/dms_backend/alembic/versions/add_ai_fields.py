@@ -1,7 +1,7 @@
 """add AI fields to document model
 
 Revision ID: add_ai_fields
-Revises: 
+Revises: c715aea142e3
 Create Date: 2024-01-30 12:00:00.000000
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = 'add_ai_fields'
-down_revision = None
+down_revision = 'c715aea142e3'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,40 @@
+"""add indexes for hot query predicates
+
+Revision ID: d41b7a2e9c05
+Revises: 8c3d4e6f1a27
+Create Date: 2026-10-19 11:26:52.730418
+
+documents.folder_id is already served by ix_documents_folder_id_created_at_id and
+notifications(user_id, read, created_at) by ix_notifications_user_id_read_created_at_id.
+documents/folders.google_drive_id lookups use the index behind their unique constraints.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41b7a2e9c05'
+down_revision: Union[str, None] = '8c3d4e6f1a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_folders_parent_id_year_month', 'folders', ['parent_id', 'year', 'month'], unique=False)
+    op.create_index('ix_folders_parent_id_name', 'folders', ['parent_id', 'name'], unique=False)
+    op.create_index('ix_document_categories_document_id_category_id', 'document_categories', ['document_id', 'category_id'], unique=False)
+    op.create_index('ix_log_entries_event_type_timestamp_id', 'log_entries', ['event_type', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_feedback_processed', 'feedback', ['processed'], unique=False)
+    op.create_index('ix_feedback_document_id_timestamp', 'feedback', ['document_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_document_id_timestamp', table_name='feedback')
+    op.drop_index('ix_feedback_processed', table_name='feedback')
+    op.drop_index('ix_log_entries_event_type_timestamp_id', table_name='log_entries')
+    op.drop_index('ix_document_categories_document_id_category_id', table_name='document_categories')
+    op.drop_index('ix_folders_parent_id_name', table_name='folders')
+    op.drop_index('ix_folders_parent_id_year_month', table_name='folders')
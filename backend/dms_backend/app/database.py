@@ -1,14 +1,190 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.util import await_only
+import asyncio
 import os
+import threading
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dms.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Async drivers for each supported backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
+# Connection pool settings, only used for server databases. The sync and the
+# async engine each get their own pool of this size.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# SQLite tuning
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+def get_async_database_url(url: str) -> str:
+    """Translate a sync DATABASE_URL into the same database with an async driver"""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_engine/create_async_engine that suit the URL's dialect"""
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def configure_sqlite(engine: Engine) -> None:
+    """Apply the SQLite pragmas to every new connection of the engine
+
+    WAL lets readers run while a write is in progress, and the busy timeout
+    makes a second writer wait for the lock instead of failing right away.
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+# SQLite allows a single writer per database. Sessions take this lock before
+# their first write and hold it until the transaction ends, so concurrent
+# requests queue up in the application instead of racing for the file lock.
+# It is a threading.Lock so sync sessions (threadpool) and async sessions
+# (event loop) queue on the same lock.
+sqlite_writer_lock = threading.Lock()
+
+# Leading keywords of plain text statements that only read
+READ_ONLY_TEXT_KEYWORDS = ("SELECT", "EXPLAIN")
+
+def _is_write(statement) -> bool:
+    # Plain text statements may write too (maintenance jobs use them), so they
+    # count as a write unless they start with a read-only keyword
+    if isinstance(statement, TextClause):
+        words = statement.text.split(None, 1)
+        return not words or words[0].upper() not in READ_ONLY_TEXT_KEYWORDS
+    return not getattr(statement, "is_select", False)
+
+def _has_pending_writes(session: Session) -> bool:
+    return bool(session.new or session.dirty or session.deleted)
+
+class SQLiteWriterSession(Session):
+    """Session that serializes SQLite write transactions through sqlite_writer_lock"""
+
+    _holds_writer_lock = False
+
+    def _wait_for_writer_lock(self) -> None:
+        sqlite_writer_lock.acquire()
+
+    def _acquire_writer_lock(self) -> None:
+        if not self._holds_writer_lock:
+            self._wait_for_writer_lock()
+            self._holds_writer_lock = True
+
+    def _release_writer_lock(self) -> None:
+        if self._holds_writer_lock:
+            self._holds_writer_lock = False
+            sqlite_writer_lock.release()
+
+    def execute(self, statement, *args, **kwargs):
+        if _is_write(statement):
+            self._acquire_writer_lock()
+        return super().execute(statement, *args, **kwargs)
+
+    def flush(self, objects=None):
+        if _has_pending_writes(self):
+            self._acquire_writer_lock()
+        super().flush(objects)
+
+    def commit(self):
+        if _has_pending_writes(self):
+            self._acquire_writer_lock()
+        try:
+            super().commit()
+        finally:
+            self._release_writer_lock()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._release_writer_lock()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_writer_lock()
+
+async def _acquire_sqlite_writer_lock() -> None:
+    """Take sqlite_writer_lock, waiting in the default executor if it is held"""
+    if sqlite_writer_lock.acquire(blocking=False):
+        return
+    waiter = asyncio.get_running_loop().run_in_executor(None, sqlite_writer_lock.acquire)
+    try:
+        await asyncio.shield(waiter)
+    except asyncio.CancelledError:
+        # The executor thread still takes the lock; hand it back once it has
+        waiter.add_done_callback(lambda _: sqlite_writer_lock.release())
+        raise
+
+class _AsyncSQLiteWriterSession(SQLiteWriterSession):
+    """Sync session behind SQLiteWriterAsyncSession
+
+    Its methods run in the async session's greenlet, so waiting for the lock
+    is awaited and the event loop keeps serving other requests meanwhile.
+    """
+
+    def _wait_for_writer_lock(self) -> None:
+        await_only(_acquire_sqlite_writer_lock())
+
+class SQLiteWriterAsyncSession(AsyncSession):
+    """AsyncSession counterpart of SQLiteWriterSession
+
+    The lock is taken by the underlying sync session, so functions passed to
+    run_sync only take it when they actually write, like async callers do.
+    """
+
+    sync_session_class = _AsyncSQLiteWriterSession
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+if is_sqlite(SQLALCHEMY_DATABASE_URL):
+    configure_sqlite(engine)
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=SQLiteWriterSession if is_sqlite(SQLALCHEMY_DATABASE_URL) else Session
+)
+
+# Async engine used by the async routers so DB I/O does not block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", get_async_database_url(SQLALCHEMY_DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+if is_sqlite(ASYNC_DATABASE_URL):
+    configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=SQLiteWriterAsyncSession if is_sqlite(ASYNC_DATABASE_URL) else AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -18,3 +194,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
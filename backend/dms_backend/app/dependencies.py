@@ -1,10 +1,18 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional, Tuple
+import os
+import threading
+import time
 
-from .database import get_db
+from .database import get_async_db
 from .models import User
 
 # OAuth2 scheme for token authentication
@@ -14,17 +22,101 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 SECRET_KEY = "your-secret-key-here"  # Should be loaded from environment in production
 ALGORITHM = "HS256"
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user as seen by request handlers
+
+    A plain value rather than a User row, so it can be cached and shared
+    between requests without being bound to any session.
+    """
+    id: int
+    email: str
+    role: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, role=user.role)
+
+class PrincipalCache:
+    """LRU cache of verified token -> CurrentUser with a per-entry expiry
+
+    Entries never outlive the token's own `exp` claim. Changes to a user
+    drop that user's entries and bulk changes to users drop all of them
+    (see the events below); the TTL bounds how stale other workers can be.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        # User events can fire from sync sessions in the threadpool
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: CurrentUser, token_expires_at: Optional[float] = None) -> None:
+        ttl = self.ttl
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [t for t, (_, p) in self._entries.items() if p.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache(
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+    max_size=int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_cached_principals(orm_execute_state):
+    # Bulk update(User)/delete(User) statements skip the mapper events above
+    # and may hit any number of users, so drop every entry
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is User.__mapper__:
+        principal_cache.clear()
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     """Get the current authenticated user from the JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         # Decode JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -33,10 +125,13 @@ async def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
+
     # Get user from database
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
-        
-    return user
+
+    principal = CurrentUser.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
@@ -1,19 +1,25 @@
-from fastapi import FastAPI, Request, BackgroundTasks, Depends
+from fastapi import FastAPI, Request, BackgroundTasks, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy.orm import Session
-from google.oauth2.credentials import Credentials
-import json
 import os
 
-from app.database import get_db, engine
-from app.models import Base, User, Document, Folder
+from app.database import get_db, engine, async_engine
+from app.metrics import MetricsMiddleware, instrument_engine, register_queue
+from app.models import User, Document, Folder
 from app.routers import auth, documents, categories, logs, notifications, optimization, feedback, sheets
-from app.services.google_drive import GoogleDriveService
+from app.services.ai_service import ENABLE_AI, warm_up_ai_service
+from app.services.api_scheduler import Priority, api_scheduler
+from app.services.drive_clients import drive_client_pool
+from app.services.drive_metadata import drive_metadata_cache
 from app.services.folder_structure import FolderStructureService
 from app.services.model_trainer import start_model_trainer
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.services.logging import log_sink
+from app.services.log_retention import periodic_log_maintenance
+from app.services.notifications import periodic_notification_purge
+from app.services.notification_events import notification_broker
+from app.services.email_delivery import email_delivery
+import asyncio
 
 app = FastAPI(title="DMS API")
 
@@ -52,14 +58,44 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
-# Add logging middleware for debugging
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    print(f"Request: {request.method} {request.url}")
-    print(f"Headers: {request.headers}")
-    response = await call_next(request)
-    print(f"Response status: {response.status_code}")
-    return response
+maintenance_tasks = []
+
+@app.on_event("startup")
+async def start_background_workers():
+    """Start in-process background writers and maintenance jobs"""
+    await log_sink.start()
+    email_delivery.start()
+    maintenance_tasks.append(asyncio.create_task(periodic_log_maintenance()))
+    maintenance_tasks.append(asyncio.create_task(periodic_notification_purge()))
+    if ENABLE_AI:
+        # Load the model and AI clients off the event loop instead of during the first upload
+        asyncio.get_running_loop().run_in_executor(None, warm_up_ai_service)
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """Flush and stop in-process background writers and maintenance jobs"""
+    for task in maintenance_tasks:
+        task.cancel()
+    maintenance_tasks.clear()
+    await log_sink.stop()
+    await asyncio.get_running_loop().run_in_executor(None, email_delivery.stop)
+
+# Request metrics and sampled access logs
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+register_queue("log_sink", lambda: log_sink.pending_count)
+register_queue("email_delivery", lambda: email_delivery.pending_count)
+register_queue("drive_metadata_refresh", lambda: drive_metadata_cache.refreshing_count)
+register_queue("notification_streams", lambda: notification_broker.pending_count)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics
+
+    Async so the queue depths are read on the event loop that owns the queues.
+    """
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
 
 # Include routers with API prefix
 app.include_router(auth.router, prefix="/api/v1")
@@ -86,22 +122,31 @@ async def drive_webhook(request: Request, background_tasks: BackgroundTasks, db:
     
     return {"status": "processing"}
 
-async def sync_drive_changes(resource_id: str, db: Session):
-    """Sync changes from Google Drive to database"""
+def sync_drive_changes(resource_id: str, db: Session):
+    """Sync changes from Google Drive to database
+
+    A plain function on purpose: background tasks run it in the threadpool,
+    so its blocking Drive and DB calls stay off the event loop. Its Drive
+    calls wait behind those of interactive requests.
+    """
+    with api_scheduler.lane(Priority.BACKGROUND):
+        _sync_drive_changes(resource_id, db)
+
+def _sync_drive_changes(resource_id: str, db: Session):
     # Get user with valid credentials
     user = db.query(User).first()  # In production, handle multiple users
     if not user or not user.credentials:
         return
     
     # Initialize services
-    creds_dict = json.loads(user.credentials)
-    credentials = Credentials.from_authorized_user_info(creds_dict)
-    drive_service = GoogleDriveService(credentials)
+    drive_service = drive_client_pool.get(user.id, user.credentials)
     folder_service = FolderStructureService(db, drive_service)
     
     try:
         # Get changed resource
         file_metadata = drive_service.get_file_metadata(resource_id)
+        # The webhook means the cached copy is outdated; this fetch is the newest
+        drive_metadata_cache.store(resource_id, file_metadata)
         
         # Find corresponding folder/document in database
         if file_metadata["mimeType"] == "application/vnd.google-apps.folder":
@@ -126,4 +171,9 @@ async def sync_drive_changes(resource_id: str, db: Session):
 async def healthz():
     """Health check endpoint for monitoring service status"""
     from datetime import datetime
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        # Google API calls and queue wait times per API and priority lane
+        "api_scheduler": api_scheduler.stats()
+    }
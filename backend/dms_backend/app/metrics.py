@@ -0,0 +1,204 @@
+"""Prometheus metrics and access logging for the API process"""
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from prometheus_client import REGISTRY, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Share of ordinary requests written to the access log; errors and slow requests are always logged
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))
+ACCESS_LOG_SLOW_SECONDS = float(os.getenv("ACCESS_LOG_SLOW_SECONDS", "1.0"))
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"]
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing database statements",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+EXTERNAL_API_DURATION = Histogram(
+    "external_api_request_duration_seconds",
+    "Time spent in calls to Google APIs, excluding time queued for the rate limit",
+    ["api", "method", "outcome"]
+)
+EXTERNAL_API_QUEUE_WAIT = Histogram(
+    "external_api_queue_wait_seconds",
+    "Time calls to Google APIs waited for the rate limit",
+    ["api", "lane"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+UPLOAD_STAGE_DURATION = Histogram(
+    "upload_stage_duration_seconds",
+    "Time spent in each stage of POST /documents/upload",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+def _json_logger(name: str) -> logging.Logger:
+    """A logger that writes one JSON object per line to stdout"""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+access_logger = _json_logger("dms.access")
+slow_logger = _json_logger("dms.slow")
+
+def log_json(logger: logging.Logger, **fields) -> None:
+    logger.info(json.dumps({"timestamp": datetime.utcnow().isoformat(), **fields}))
+
+class StageTimer:
+    """Collects how long each named stage of a request took
+
+    Pass the request's arrival time (see ``request_started``) to count the
+    time before the handler ran as a ``receive`` stage and in the total.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        now = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.started = now if started is None else started
+        if started is not None:
+            self.stages["receive"] = now - started
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """The stages as a Server-Timing header value, in milliseconds"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def observe(self, histogram: Histogram) -> None:
+        for name, seconds in self.stages.items():
+            histogram.labels(name).observe(seconds)
+
+def request_started(scope) -> Optional[float]:
+    """perf_counter() value at which MetricsMiddleware saw the request arrive"""
+    return scope.get("state", {}).get("request_started")
+
+_queue_depths: Dict[str, Callable[[], float]] = {}
+
+def register_queue(name: str, depth: Callable[[], float]) -> None:
+    """Report ``depth()`` as the depth of a background queue on every scrape"""
+    _queue_depths[name] = depth
+
+class _QueueDepthCollector:
+    def collect(self):
+        family = GaugeMetricFamily("background_queue_depth", "Items waiting in background queues", labels=["queue"])
+        for name, depth in list(_queue_depths.items()):
+            try:
+                family.add_metric([name], depth())
+            except Exception as e:
+                print(f"Error reading depth of queue {name}: {str(e)}")
+        yield family
+
+REGISTRY.register(_QueueDepthCollector())
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement the engine sends (for an AsyncEngine pass ``sync_engine``)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def observe(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_DURATION.labels(_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+class MetricsMiddleware:
+    """Records request metrics and writes sampled, structured access logs
+
+    A plain ASGI middleware so it adds little to each request. Requests are
+    labelled by route template rather than URL to keep label values bounded.
+    Access log lines are JSON without headers or query strings, which may
+    carry credentials.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        # Lets handlers tell how long the request spent before reaching them (see StageTimer)
+        scope.setdefault("state", {})["request_started"] = started
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            duration = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            REQUEST_DURATION.labels(method, route_path, str(status)).observe(duration)
+            if status >= 500 or duration >= ACCESS_LOG_SLOW_SECONDS or random.random() < ACCESS_LOG_SAMPLE_RATE:
+                client = scope.get("client")
+                log_json(
+                    access_logger,
+                    method=method,
+                    path=scope["path"],
+                    route=route_path,
+                    status=status,
+                    duration_ms=round(duration * 1000, 1),
+                    client=client[0] if client else None
+                )
@@ -0,0 +1,37 @@
+"""Bring the database schema up to date; run before starting the API
+
+    python -m app.migrate
+
+Runs the Alembic migrations against DATABASE_URL. Databases created before
+the app relied on migrations (tables made by ``create_all`` at startup, no
+``alembic_version``) have the schema of the revisions that existed then, so
+they are marked as being at those revisions and upgraded from there.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heads of the revision graph while startup still ran create_all
+CREATE_ALL_REVISIONS = ("a4b325debba9", "add_credentials_column")
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+def migrate() -> None:
+    config = alembic_config()
+    tables = inspect(engine).get_table_names()
+    if tables and "alembic_version" not in tables:
+        print("Database has no migration history; stamping it at the create_all schema")
+        command.stamp(config, list(CREATE_ALL_REVISIONS))
+    command.upgrade(config, "head")
+
+if __name__ == "__main__":
+    migrate()
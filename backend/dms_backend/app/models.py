@@ -1,12 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Table, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Table, JSON, Boolean, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship, synonym
 from datetime import datetime
 from .database import Base
 
 # Association table for document categories
 document_categories = Table('document_categories', Base.metadata,
     Column('document_id', Integer, ForeignKey('documents.id')),
-    Column('category_id', Integer, ForeignKey('categories.id'))
+    Column('category_id', Integer, ForeignKey('categories.id')),
+    Index('ix_document_categories_category_id_document_id', 'category_id', 'document_id'),
+    Index('ix_document_categories_document_id_category_id', 'document_id', 'category_id')
 )
 
 # Model for tracking ML model performance
@@ -30,6 +32,7 @@ class User(Base):
     hashed_password = Column(String, nullable=True)
     role = Column(String, nullable=True)  # admin or user
     credentials = Column(String, nullable=True)  # Store OAuth credentials as JSON string
+    email_digest = Column(Boolean, default=False)  # Collapse notification emails into digests
     created_at = Column(DateTime, default=datetime.utcnow)
     documents = relationship("Document", back_populates="owner")
     logs = relationship("LogEntry", back_populates="user")
@@ -42,6 +45,7 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
     google_drive_id = Column(String, unique=True)
+    drive_id = synonym("google_drive_id")
     mime_type = Column(String)
     size_bytes = Column(Float)
     extracted_text = Column(String, nullable=True)
@@ -60,6 +64,13 @@ class Document(Base):
     notifications = relationship("Notification", back_populates="document")
     feedback = relationship("Feedback", back_populates="document")
 
+    # Composite indexes backing keyset pagination of GET /documents
+    __table_args__ = (
+        Index('ix_documents_created_at_id', 'created_at', 'id'),
+        Index('ix_documents_folder_id_created_at_id', 'folder_id', 'created_at', 'id'),
+        Index('ix_documents_mime_type_created_at_id', 'mime_type', 'created_at', 'id'),
+    )
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -82,6 +93,27 @@ class LogEntry(Base):
     document = relationship("Document", back_populates="logs")
     user = relationship("User", back_populates="logs")
 
+    # Composite indexes backing keyset pagination of GET /logs
+    __table_args__ = (
+        Index('ix_log_entries_timestamp_id', 'timestamp', 'id'),
+        Index('ix_log_entries_document_id_timestamp_id', 'document_id', 'timestamp', 'id'),
+        Index('ix_log_entries_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        Index('ix_log_entries_event_type_timestamp_id', 'event_type', 'timestamp', 'id'),
+    )
+
+class LogRollup(Base):
+    """Hourly per-event-type counts of log entries, maintained as entries are written"""
+    __tablename__ = "log_rollups"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, nullable=False)  # Start of the hour
+    event_type = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('bucket', 'event_type', name='uq_log_rollups_bucket_event_type'),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
 
@@ -97,6 +129,19 @@ class Notification(Base):
     user = relationship("User", back_populates="notifications")
     document = relationship("Document", back_populates="notifications")
 
+    # Composite indexes backing keyset pagination of GET /notifications
+    __table_args__ = (
+        Index('ix_notifications_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_notifications_user_id_read_created_at_id', 'user_id', 'read', 'created_at', 'id'),
+    )
+
+class NotificationCounter(Base):
+    """Per-user unread notification count, kept in step by NotificationService"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
 class Feedback(Base):
     __tablename__ = "feedback"
 
@@ -113,12 +158,22 @@ class Feedback(Base):
     document = relationship("Document", back_populates="feedback")
     user = relationship("User", back_populates="feedback")
 
+    # Composite indexes backing keyset pagination of GET /feedback, the
+    # retraining job's unprocessed scan and the latest-feedback-per-document lookup
+    __table_args__ = (
+        Index('ix_feedback_timestamp_id', 'timestamp', 'id'),
+        Index('ix_feedback_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        Index('ix_feedback_processed', 'processed'),
+        Index('ix_feedback_document_id_timestamp', 'document_id', 'timestamp'),
+    )
+
 class Folder(Base):
     __tablename__ = "folders"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     google_drive_id = Column(String, unique=True)
+    drive_id = synonym("google_drive_id")
     parent_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
     year = Column(Integer, nullable=True)  # For year-based organization
     month = Column(Integer, nullable=True)  # For month-based organization
@@ -126,3 +181,19 @@ class Folder(Base):
     
     parent = relationship("Folder", remote_side=[id], backref="subfolders")
     documents = relationship("Document", back_populates="folder")
+
+    # Child lookups by year/month (create_year_month_structure) and by name (folder paths)
+    __table_args__ = (
+        Index('ix_folders_parent_id_year_month', 'parent_id', 'year', 'month'),
+        Index('ix_folders_parent_id_name', 'parent_id', 'name'),
+        # One year folder per parent and one month folder per year folder, so
+        # concurrent uploads cannot create duplicates. NULLs are coalesced as
+        # they never compare equal in a unique index.
+        Index(
+            'uq_folders_parent_id_year_month',
+            func.coalesce(parent_id, 0), year, func.coalesce(month, 0),
+            unique=True,
+            sqlite_where=year.isnot(None),
+            postgresql_where=year.isnot(None)
+        ),
+    )
@@ -0,0 +1,53 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Encode a (timestamp, id) sort key as an opaque cursor string"""
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor back into its sort key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_paginate(query, timestamp_column, id_column, cursor: Optional[str], limit: int):
+    """Order a query newest-first and restrict it to the page after the cursor
+
+    The (timestamp, id) row-value comparison lets the database seek straight
+    into a composite index, so every page costs the same no matter how deep it is.
+    One extra row is fetched so the caller can tell whether another page exists.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id))
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def build_page(rows: List[Any], limit: int, timestamp_attr: str, items: List[Any]) -> dict:
+    """Build the page envelope for rows fetched through keyset_paginate
+
+    ``rows`` are the raw results (including the look-ahead row) and ``items``
+    the serialized representation of the first ``limit`` of them.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(getattr(last, timestamp_attr), last.id)
+    return {"items": items[:limit], "next_cursor": next_cursor}
@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-import json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from typing import Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import get_async_db
 from app.services.google_drive import GoogleDriveService
+from app.services.drive_clients import drive_client_pool
 from app.models import User
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -30,7 +30,7 @@ async def oauth_callback(
     code: Optional[str] = None,
     state: Optional[str] = None,
     error: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Handle OAuth2 callback from Google"""
     frontend_url = os.getenv("FRONTEND_URL", "https://document-management-app-jbey7enb.devinapps.com")
@@ -103,15 +103,9 @@ async def oauth_callback(
                 status_code=302
             )
         
-        # Store credentials in database (you might want to encrypt these)
-        creds_dict = {
-            'token': credentials.token,
-            'refresh_token': credentials.refresh_token,
-            'token_uri': credentials.token_uri,
-            'client_id': credentials.client_id,
-            'client_secret': credentials.client_secret,
-            'scopes': credentials.scopes
-        }
+        # Store credentials in database (you might want to encrypt these).
+        # to_json keeps the expiry, so expired tokens are refreshed up front.
+        credentials_json = credentials.to_json()
         
         # Get user info from Google
         drive_service = GoogleDriveService(credentials)
@@ -127,20 +121,20 @@ async def oauth_callback(
         
         try:
             # Find or create user
-            user = db.query(User).filter(User.email == email).first()
+            user = (await db.execute(select(User).where(User.email == email))).scalars().first()
             if not user:
                 user = User(
                     email=email,
-                    credentials=json.dumps(creds_dict)
+                    credentials=credentials_json
                 )
                 db.add(user)
             else:
-                user.credentials = json.dumps(creds_dict)
+                user.credentials = credentials_json
             
-            db.commit()
+            await db.commit()
         except Exception as e:
             print(f"Database error: {str(e)}")
-            db.rollback()
+            await db.rollback()
             return JSONResponse(
                 status_code=500,
                 content={"detail": "Failed to save user information"}
@@ -166,38 +160,23 @@ async def oauth_callback(
 
 @router.get("/refresh")
 async def refresh_token(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Refresh OAuth2 token"""
-    user = db.query(User).first()  # In reality, get current user
+    user = (await db.execute(select(User).limit(1))).scalars().first()  # In reality, get current user
     if not user or not user.credentials:
         return JSONResponse(
             status_code=401,
             content={"detail": "Not authenticated"}
         )
     
-    creds_dict = json.loads(user.credentials)
-    credentials = Credentials.from_authorized_user_info(creds_dict)
-    
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh()
-            
-            # Update stored credentials
-            creds_dict = {
-                'token': credentials.token,
-                'refresh_token': credentials.refresh_token,
-                'token_uri': credentials.token_uri,
-                'client_id': credentials.client_id,
-                'client_secret': credentials.client_secret,
-                'scopes': credentials.scopes
-            }
-            user.credentials = json.dumps(creds_dict)
-            db.commit()
-        else:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Token refresh failed"}
-            )
+    try:
+        # Refreshes at most once even when several requests ask at the same time
+        await run_in_threadpool(drive_client_pool.refresh, user.id, user.credentials)
+    except HTTPException:
+        return JSONResponse(
+            status_code=401,
+            content={"detail": "Token refresh failed"}
+        )
     
     return {"message": "Token refreshed successfully"}
@@ -1,19 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-import os
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import Category, Document
-from app.services.ai_categorization import AICategorization
+from app.services.ai_service import get_ai_service
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
-# Initialize AI service if enabled
-ENABLE_AI = os.getenv("ENABLE_AI_CATEGORIZATION", "false").lower() == "true"
-ai_service = AICategorization() if ENABLE_AI else None
-
 @router.get("/")
 def get_categories(db: Session = Depends(get_db)):
     """Get all categories"""
@@ -32,34 +30,37 @@ def create_category(name: str, description: Optional[str] = None, db: Session =
 async def train_category(
     category_id: int,
     document_ids: List[int],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Train AI model with documents for a specific category"""
-    if not ENABLE_AI or not ai_service:
+    ai_service = get_ai_service()
+    if not ai_service:
         raise HTTPException(status_code=400, detail="AI categorization is not enabled")
     
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    documents = db.query(Document).filter(Document.id.in_(document_ids)).all()
+    result = await db.execute(select(Document).where(Document.id.in_(document_ids)))
+    documents = result.scalars().all()
     if not documents:
         raise HTTPException(status_code=404, detail="No valid documents found")
     
     # Train model with documents
     for document in documents:
         if document.extracted_text:
-            ai_service.classify_document(document.extracted_text, category.name)
+            await run_in_threadpool(ai_service.classify_document, document.extracted_text, category.name)
     
     return {"message": f"Successfully trained model with {len(documents)} documents"}
 
 @router.get("/suggest")
 async def suggest_category(text: str):
     """Get category suggestion for text"""
-    if not ENABLE_AI or not ai_service:
+    ai_service = get_ai_service()
+    if not ai_service:
         raise HTTPException(status_code=400, detail="AI categorization is not enabled")
     
-    category, confidence = ai_service.predict_category(text)
+    category, confidence = await run_in_threadpool(ai_service.predict_category, text)
     return {
         "suggested_category": category,
         "confidence_score": confidence
@@ -1,66 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterator, List, Optional, Set
 from datetime import datetime
-from google.oauth2.credentials import Credentials
-import json
+import asyncio
 import os
 
-from app.database import get_db
-from app.models import Document, User, Folder, Category
+from app.database import SessionLocal, get_async_db
+from app.metrics import UPLOAD_STAGE_DURATION, StageTimer, log_json, request_started, slow_logger
+from app.models import Document, User, Folder, Category, Feedback, LogEntry, Notification, document_categories
+from app.pagination import keyset_paginate, build_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.documents import DocumentBulkCategorize, DocumentBulkMove, DocumentSelection
 from app.services.google_drive import GoogleDriveService
+from app.services.archives import UploadSource, is_archive, iter_archive
+from app.services.drive_clients import drive_client_pool
+from app.services.drive_metadata import drive_metadata_cache
 from app.services.folder_structure import FolderStructureService
-from app.services.ai_categorization import AICategorization
+from app.services.ai_service import get_ai_service
 from app.services.logging import logging_service
 from app.services.notifications import notification_service
 
-# Initialize AI service if enabled
-ENABLE_AI = os.getenv("ENABLE_AI_CATEGORIZATION", "false").lower() == "true"
-ai_service = AICategorization() if ENABLE_AI else None
-
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-def get_drive_service(db: Session = Depends(get_db)) -> GoogleDriveService:
+# Columns that may be requested through the `fields` projection of GET /documents.
+# extracted_text can be arbitrarily large, so it is only loaded when asked for.
+LISTABLE_FIELDS = {
+    "id", "filename", "google_drive_id", "mime_type", "size_bytes", "extracted_text",
+    "confidence_score", "ai_prediction", "prediction_timestamp", "created_at",
+    "modified_at", "owner_id", "folder_id",
+}
+DEFAULT_LIST_FIELDS = sorted(LISTABLE_FIELDS - {"extracted_text"})
+
+# Drive calls a single bulk request may have in flight at once
+DRIVE_CONCURRENCY = int(os.getenv("DRIVE_BULK_CONCURRENCY", "8"))
+# Limits for POST /documents/upload/batch, counted after unpacking archives
+UPLOAD_BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "1000"))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(100 * 1024 * 1024)))
+# Single uploads slower than this are logged with their stage breakdown
+UPLOAD_SLOW_SECONDS = float(os.getenv("UPLOAD_SLOW_SECONDS", "5"))
+# Documents a filter-based bulk request acts on at most; the caller continues with `next_after_id`
+BULK_FILTER_MAX_DOCUMENTS = int(os.getenv("BULK_FILTER_MAX_DOCUMENTS", "10000"))
+
+async def get_drive_service(db: AsyncSession = Depends(get_async_db)) -> GoogleDriveService:
     """Get authenticated Google Drive service"""
-    user = db.query(User).first()  # In reality, get current user
+    user = (await db.execute(select(User).limit(1))).scalars().first()  # In reality, get current user
     if not user or not user.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    creds_dict = json.loads(user.credentials)
-    credentials = Credentials.from_authorized_user_info(creds_dict)
-    
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh()
-            
-            # Update stored credentials
-            creds_dict = {
-                'token': credentials.token,
-                'refresh_token': credentials.refresh_token,
-                'token_uri': credentials.token_uri,
-                'client_id': credentials.client_id,
-                'client_secret': credentials.client_secret,
-                'scopes': credentials.scopes
-            }
-            user.credentials = json.dumps(creds_dict)
-            db.commit()
-        else:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    return GoogleDriveService(credentials)
+    # Client lookup and a possible token refresh block on HTTP
+    return await run_in_threadpool(drive_client_pool.get, user.id, user.credentials)
+
+async def _get_or_create_categories(db: AsyncSession, names: Set[str]) -> Dict[str, Category]:
+    """Categories by name, creating the missing ones in the current transaction
+
+    Missing names are inserted with ON CONFLICT DO NOTHING and read back, so
+    concurrent uploads creating the same new category all end up with the
+    one row instead of failing on the unique name.
+    """
+    query = select(Category).where(Category.name.in_(names))
+    categories = {category.name: category for category in (await db.execute(query)).scalars()}
+    missing = names - categories.keys()
+    if missing:
+        dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        await db.execute(
+            dialect_insert(Category).values([{"name": name} for name in sorted(missing)])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        query = select(Category).where(Category.name.in_(missing))
+        categories.update({category.name: category for category in (await db.execute(query)).scalars()})
+    return categories
 
 @router.post("/upload")
 async def upload_document(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     folder_id: Optional[int] = None,
     category_name: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     drive_service: GoogleDriveService = Depends(get_drive_service)
 ):
-    """Upload a document to Google Drive and store metadata in database"""
+    """Upload a document to Google Drive and store metadata in database
+
+    Each stage is timed and reported in the Server-Timing header; `receive`
+    is the time spent receiving and parsing the request before this handler.
+    """
+    timer = StageTimer(request_started(request.scope))
+    content = b""
     try:
         # Read file content
-        content = await file.read()
+        with timer.stage("read"):
+            content = await file.read()
         
         # Process with AI if enabled
         extracted_text = None
@@ -68,33 +100,39 @@ async def upload_document(
         suggested_category = None
         suggested_folder = None
         
-        if ENABLE_AI and ai_service:
+        ai_service = get_ai_service()
+        if ai_service:
             try:
                 # Extract text using Google Cloud Vision
-                extracted_text = ai_service.extract_text(content)
+                with timer.stage("ocr"):
+                    extracted_text = await run_in_threadpool(ai_service.extract_text, content)
                 
                 # Analyze entities and get suggestions
-                entities = ai_service.analyze_entities(extracted_text)
-                suggestions = ai_service.suggest_folder(extracted_text, entities)
-                
-                # Get category suggestion
-                if category_name:
-                    # Use provided category for training
-                    confidence_score = ai_service.classify_document(extracted_text, category_name)
-                    suggested_category = category_name
-                else:
-                    # Get AI suggestion
-                    suggested_category, confidence_score = ai_service.predict_category(extracted_text)
+                with timer.stage("entities"):
+                    entities = await run_in_threadpool(ai_service.analyze_entities, extracted_text)
+                with timer.stage("classify"):
+                    suggestions = await run_in_threadpool(ai_service.suggest_folder, extracted_text, entities)
+                    
+                    # Get category suggestion
+                    if category_name:
+                        # Use provided category for training
+                        confidence_score = await run_in_threadpool(
+                            ai_service.classify_document, extracted_text, category_name
+                        )
+                        suggested_category = category_name
+                    else:
+                        # Get AI suggestion
+                        suggested_category, confidence_score = await run_in_threadpool(
+                            ai_service.predict_category, extracted_text
+                        )
                 
                 # Update folder suggestion
                 if not folder_id and suggestions:
-                    folder_service = FolderStructureService(db, drive_service)
-                    suggested_folder = folder_service.create_year_month_structure(
-                        suggestions.get('year'),
-                        suggestions.get('month'),
-                        None  # Root folder
-                    )
-                    folder_id = suggested_folder.id
+                    with timer.stage("folder"):
+                        folder_id = await run_in_threadpool(
+                            _year_month_folder_id, drive_service, suggestions.get('year'), suggestions.get('month')
+                        )
+                        suggested_folder = await db.get(Folder, folder_id)
             except Exception as e:
                 print(f"AI processing error: {str(e)}")
                 # Continue without AI processing
@@ -102,17 +140,20 @@ async def upload_document(
         # Get target folder
         folder = None
         if folder_id:
-            folder = db.query(Folder).filter(Folder.id == folder_id).first()
+            with timer.stage("folder"):
+                folder = await db.get(Folder, folder_id)
             if not folder:
                 raise HTTPException(status_code=404, detail="Folder not found")
         
         # Upload to Google Drive
-        drive_file = drive_service.upload_file(
-            name=file.filename,
-            content=content,
-            mime_type=file.content_type,
-            parent_id=folder.drive_id if folder else None
-        )
+        with timer.stage("drive_upload"):
+            drive_file = await run_in_threadpool(
+                drive_service.upload_file,
+                name=file.filename,
+                content=content,
+                mime_type=file.content_type,
+                parent_id=folder.drive_id if folder else None
+            )
         
         # Create document record
         document = Document(
@@ -125,37 +166,35 @@ async def upload_document(
             confidence_score=confidence_score
         )
         
-        # Add category if suggested or provided
-        if suggested_category or category_name:
-            category = db.query(Category).filter(
-                Category.name == (category_name or suggested_category)
-            ).first()
-            if not category:
-                category = Category(name=category_name or suggested_category)
-                db.add(category)
-            document.categories.append(category)
-        
-        db.add(document)
-        db.commit()
-        db.refresh(document)
+        with timer.stage("db"):
+            # Add category if suggested or provided
+            if suggested_category or category_name:
+                name = category_name or suggested_category
+                document.categories.append((await _get_or_create_categories(db, {name}))[name])
+            
+            db.add(document)
+            await db.commit()
+            await db.refresh(document)
         
         # Log document upload
-        await logging_service.log_event(
-            db=db,
-            event_type="document_upload",
-            document_id=document.id,
-            user_id=None,  # TODO: Get from auth
-            details={"filename": document.filename, "size": document.size_bytes}
-        )
+        with timer.stage("log"):
+            await logging_service.log_event(
+                db=db,
+                event_type="document_upload",
+                document_id=document.id,
+                user_id=None,  # TODO: Get from auth
+                details={"filename": document.filename, "size": document.size_bytes}
+            )
         
         # Send notification
-        await notification_service.create_notification(
-            db=db,
-            user_id=None,  # TODO: Get from auth
-            message=f"New document uploaded: {document.filename}",
-            event_type="document_upload",
-            document_id=document.id
-        )
+        with timer.stage("notify"):
+            await notification_service.create_notification(
+                db=db,
+                user_id=None,  # TODO: Get from auth
+                message=f"New document uploaded: {document.filename}",
+                event_type="document_upload",
+                document_id=document.id
+            )
         
         return {
             "document": document,
@@ -166,52 +205,322 @@ async def upload_document(
                     "id": suggested_folder.id if suggested_folder else None,
                     "name": suggested_folder.name if suggested_folder else None
                 } if suggested_folder else None
-            } if ENABLE_AI else None
+            } if ai_service else None
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing document: {str(e)}"
+            detail=f"Error processing document: {str(e)}",
+            # The error response replaces `response`, so it needs its own copy of the header
+            headers={"Server-Timing": timer.server_timing()}
         )
-    
-    
-    return document
+    finally:
+        response.headers["Server-Timing"] = timer.server_timing()
+        timer.observe(UPLOAD_STAGE_DURATION)
+        if timer.total >= UPLOAD_SLOW_SECONDS:
+            log_json(
+                slow_logger,
+                event="slow_upload",
+                filename=file.filename,
+                size_bytes=len(content),
+                total_ms=round(timer.total * 1000, 1),
+                stages_ms={name: round(seconds * 1000, 1) for name, seconds in timer.stages.items()}
+            )
+
+def _year_month_folder_id(drive_service: GoogleDriveService, year: int, month: int) -> int:
+    """Resolve the top-level year/month folder in a worker thread with its own session
+
+    Concurrent uploads for the same month wait on each other there (see
+    YearMonthFolderCache), which must not happen on the event loop.
+    """
+    db = SessionLocal()
+    try:
+        return FolderStructureService(db, drive_service).create_year_month_structure(year, month, None).id
+    finally:
+        db.close()
+
+def _upload_sources(file: UploadFile, unpack_archives: bool) -> Iterator[UploadSource]:
+    if unpack_archives and is_archive(file.filename):
+        return iter_archive(file.filename, file.file)
+    return iter([UploadSource(
+        file.filename, file.content_type or "application/octet-stream", file.size, file.file.read
+    )])
+
+def _analyze_upload(ai_service, content: bytes, category_name: Optional[str]) -> dict:
+    """Run the AI text extraction and categorization for one uploaded file"""
+    extracted_text = ai_service.extract_text(content)
+    if category_name:
+        return {
+            "extracted_text": extracted_text,
+            "category": category_name,
+            "confidence_score": ai_service.classify_document(extracted_text, category_name)
+        }
+    category, confidence_score = ai_service.predict_category(extracted_text)
+    return {"extracted_text": extracted_text, "category": category, "confidence_score": confidence_score}
+
+@router.post("/upload/batch")
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    folder_id: Optional[int] = None,
+    category_name: Optional[str] = None,
+    unpack_archives: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    drive_service: GoogleDriveService = Depends(get_drive_service)
+):
+    """Upload many documents at once
+
+    Accepts any number of file parts; zip and tar archives are unpacked on
+    the fly unless `unpack_archives` is false. Files are uploaded to Drive
+    in parallel (at most DRIVE_BULK_CONCURRENCY at a time, which also bounds
+    how many are held in memory) and their rows are inserted together.
+    Returns one result per file.
+    """
+    folder = None
+    if folder_id:
+        folder = await db.get(Folder, folder_id)
+        if not folder:
+            raise HTTPException(status_code=404, detail="Folder not found")
+
+    ai_service = get_ai_service()
+    results = []
+    uploaded = []
+    semaphore = asyncio.Semaphore(DRIVE_CONCURRENCY)
+
+    async def process(index: int, source: UploadSource, content: bytes):
+        try:
+            analysis = {}
+            if ai_service:
+                try:
+                    analysis = await run_in_threadpool(_analyze_upload, ai_service, content, category_name)
+                except Exception as e:
+                    print(f"AI processing error: {str(e)}")
+            drive_file = await run_in_threadpool(
+                drive_service.upload_file,
+                name=source.filename,
+                content=content,
+                mime_type=source.mime_type,
+                parent_id=folder.drive_id if folder else None
+            )
+            uploaded.append((index, dict(drive_file, mimeType=source.mime_type), analysis))
+        except Exception as e:
+            results[index].update(status="failed", error=str(e))
+        finally:
+            semaphore.release()
+
+    tasks = []
+    for file in files:
+        sources = _upload_sources(file, unpack_archives)
+        try:
+            while True:
+                await semaphore.acquire()
+                source = await run_in_threadpool(next, sources, None)
+                if source is None or len(results) >= UPLOAD_BATCH_MAX_FILES:
+                    semaphore.release()
+                    if source is not None:
+                        results.append({"filename": source.filename, "status": "skipped", "error": "Too many files in one batch"})
+                    break
+                results.append({"filename": source.filename})
+                if source.size is not None and source.size > UPLOAD_MAX_FILE_BYTES:
+                    results[-1].update(status="failed", error="File too large")
+                    semaphore.release()
+                    continue
+                # Read before advancing: archive members can only be read in order
+                try:
+                    content = await run_in_threadpool(source.read)
+                except Exception as e:
+                    results[-1].update(status="failed", error=f"Could not read file: {str(e)}")
+                    semaphore.release()
+                    break
+                tasks.append(asyncio.create_task(process(len(results) - 1, source, content)))
+        except Exception as e:
+            semaphore.release()
+            results.append({"filename": file.filename, "status": "failed", "error": f"Could not read upload: {str(e)}"})
+    await asyncio.gather(*tasks)
+
+    if uploaded:
+        uploaded.sort(key=lambda item: item[0])
+        rows = [
+            {
+                "filename": results[index]["filename"],
+                "google_drive_id": drive_file["id"],
+                "mime_type": drive_file.get("mimeType"),
+                "size_bytes": int(drive_file["size"]) if drive_file.get("size") is not None else None,
+                "folder_id": folder.id if folder else None,
+                "extracted_text": analysis.get("extracted_text"),
+                "confidence_score": analysis.get("confidence_score"),
+                "ai_prediction": analysis.get("category")
+            }
+            for index, drive_file, analysis in uploaded
+        ]
+        try:
+            ids = (await db.execute(
+                insert(Document).returning(Document.id, sort_by_parameter_order=True), rows
+            )).scalars().all()
+
+            category_names = {category_name or analysis.get("category") for _, _, analysis in uploaded} - {None}
+            if category_names:
+                categories = await _get_or_create_categories(db, category_names)
+                links = [
+                    {"document_id": document_id, "category_id": categories[category_name or analysis["category"]].id}
+                    for document_id, (_, _, analysis) in zip(ids, uploaded)
+                    if category_name or analysis.get("category")
+                ]
+                if links:
+                    await db.execute(insert(document_categories), links)
+
+            await logging_service.log_events(
+                db=db,
+                event_type="document_upload",
+                events=[
+                    {"document_id": document_id, "details": {"filename": row["filename"], "size": row["size_bytes"]}}
+                    for document_id, row in zip(ids, rows)
+                ],
+                user_id=None,  # TODO: Get from auth
+                commit=False
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            # Do not leave files in Drive that no document points to
+            await asyncio.gather(*[
+                run_in_threadpool(drive_service.delete_file, drive_file["id"]) for _, drive_file, _ in uploaded
+            ], return_exceptions=True)
+            raise HTTPException(status_code=500, detail=f"Error saving documents: {str(e)}")
+
+        for document_id, (index, _, analysis) in zip(ids, uploaded):
+            results[index].update(status="uploaded", document_id=document_id)
+            if analysis:
+                results[index].update(
+                    category_suggestion=analysis.get("category"),
+                    confidence_score=analysis.get("confidence_score")
+                )
+
+    return {
+        "uploaded": len(uploaded),
+        "failed": sum(1 for result in results if result.get("status") != "uploaded"),
+        "results": results
+    }
+
+def _filter_documents(
+    query,
+    folder_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    mime_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """Restrict a query on documents to the given filters"""
+    if folder_id is not None:
+        query = query.where(Document.folder_id == folder_id)
+    if mime_type:
+        query = query.where(Document.mime_type == mime_type)
+    if category_id is not None:
+        query = query.where(exists().where(
+            document_categories.c.document_id == Document.id,
+            document_categories.c.category_id == category_id
+        ))
+    if created_after:
+        query = query.where(Document.created_at >= created_after)
+    if created_before:
+        query = query.where(Document.created_at < created_before)
+    return query
+
+async def _select_documents(db: AsyncSession, selection: DocumentSelection, *columns):
+    """Look up the selected documents in one query
+
+    Returns the ids to report on in request order, the found rows by id, and
+    the id to continue a filter from when it matched more than
+    BULK_FILTER_MAX_DOCUMENTS documents.
+    """
+    query = select(Document.id, *columns)
+    if selection.document_ids is not None:
+        document_ids = list(dict.fromkeys(selection.document_ids))
+        rows = (await db.execute(query.where(Document.id.in_(document_ids)))).all()
+        return document_ids, {row.id: row for row in rows}, None
+
+    query = _filter_documents(query, **selection.filter.model_dump())
+    if selection.after_id is not None:
+        query = query.where(Document.id > selection.after_id)
+    rows = (await db.execute(query.order_by(Document.id).limit(BULK_FILTER_MAX_DOCUMENTS + 1))).all()
+    next_after_id = None
+    if len(rows) > BULK_FILTER_MAX_DOCUMENTS:
+        rows = rows[:BULK_FILTER_MAX_DOCUMENTS]
+        next_after_id = rows[-1].id
+    return [row.id for row in rows], {row.id: row for row in rows}, next_after_id
+
+@router.get("/")
+async def list_documents(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    folder_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    mime_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List documents newest first using keyset pagination on (created_at, id)
+
+    Pass the returned `next_cursor` back as `cursor` to fetch the following page.
+    `fields` is a comma-separated projection; only those columns are loaded.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(requested) - LISTABLE_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        requested = DEFAULT_LIST_FIELDS
+    # id and created_at make up the cursor, so they are always selected
+    selected = ["id", "created_at"] + [f for f in requested if f not in ("id", "created_at")]
+
+    query = _filter_documents(
+        select(*[getattr(Document, f) for f in selected]),
+        folder_id=folder_id,
+        category_id=category_id,
+        mime_type=mime_type,
+        created_after=created_after,
+        created_before=created_before
+    )
+
+    rows = (await db.execute(keyset_paginate(query, Document.created_at, Document.id, cursor, limit))).all()
+    return build_page(rows, limit, "created_at", [dict(row._mapping) for row in rows])
 
 @router.get("/{document_id}")
 async def get_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     drive_service: GoogleDriveService = Depends(get_drive_service)
 ):
-    """Get document metadata"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    """Get document metadata
+
+    Served from the database. Drive is only asked in the background when the
+    cached Drive metadata is stale, and a changed size shows up on later reads.
+    """
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Get latest metadata from Google Drive
-    drive_metadata = drive_service.get_file_metadata(document.drive_id)
-    
-    # Update local metadata if needed
-    if drive_metadata.get('size') != document.size_bytes:
-        document.size_bytes = drive_metadata.get('size')
-        db.commit()
+    drive_metadata_cache.get(document.drive_id, drive_service)
     
     return document
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     drive_service: GoogleDriveService = Depends(get_drive_service)
 ):
     """Delete a document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Delete from Google Drive
-    drive_service.delete_file(document.drive_id)
+    await run_in_threadpool(drive_service.delete_file, document.drive_id)
+    drive_metadata_cache.invalidate(document.drive_id)
     
     # Log deletion
     await logging_service.log_event(
@@ -223,8 +532,8 @@ async def delete_document(
     )
     
     # Delete from database
-    db.delete(document)
-    db.commit()
+    await db.delete(document)
+    await db.commit()
     
     # Send notification
     await notification_service.create_notification(
@@ -237,29 +546,277 @@ async def delete_document(
     
     return {"message": "Document deleted successfully"}
 
+@router.post("/delete")
+async def delete_documents(
+    selection: DocumentSelection,
+    db: AsyncSession = Depends(get_async_db),
+    drive_service: GoogleDriveService = Depends(get_drive_service)
+):
+    """Delete many documents, chosen by id or by filter
+
+    Files are deleted from Drive in batch requests; the documents that are
+    gone from Drive are then removed in one transaction. Returns one result
+    per document and, when a filter matched more documents than one request
+    handles, the `next_after_id` to continue from.
+    """
+    document_ids, found, next_after_id = await _select_documents(
+        db, selection, Document.google_drive_id, Document.filename
+    )
+    results = {
+        document_id: {"document_id": document_id, "status": "not_found"}
+        for document_id in document_ids if document_id not in found
+    }
+    rows = [found[document_id] for document_id in document_ids if document_id in found]
+
+    semaphore = asyncio.Semaphore(DRIVE_CONCURRENCY)
+
+    async def delete_in_drive(chunk):
+        file_ids = [row.google_drive_id for row in chunk]
+        async with semaphore:
+            try:
+                return await run_in_threadpool(drive_service.delete_files, file_ids)
+            except Exception as e:
+                return {file_id: str(e) for file_id in file_ids}
+
+    errors = {}
+    chunks = [rows[i:i + GoogleDriveService.BATCH_LIMIT] for i in range(0, len(rows), GoogleDriveService.BATCH_LIMIT)]
+    for chunk_errors in await asyncio.gather(*[delete_in_drive(chunk) for chunk in chunks]):
+        errors.update(chunk_errors)
+
+    deleted = []
+    for row in rows:
+        error = errors.get(row.google_drive_id, "No response from Drive")
+        if error:
+            results[row.id] = {"document_id": row.id, "status": "failed", "error": error}
+        else:
+            drive_metadata_cache.invalidate(row.google_drive_id)
+            deleted.append(row)
+            results[row.id] = {"document_id": row.id, "status": "deleted"}
+
+    if deleted:
+        ids = [row.id for row in deleted]
+        try:
+            # Clear everything that references the documents, then the documents themselves
+            await db.execute(delete(document_categories).where(document_categories.c.document_id.in_(ids)))
+            for statement in (
+                delete(Feedback).where(Feedback.document_id.in_(ids)),
+                update(Notification).where(Notification.document_id.in_(ids)).values(document_id=None),
+                update(LogEntry).where(LogEntry.document_id.in_(ids)).values(document_id=None),
+                delete(Document).where(Document.id.in_(ids)),
+            ):
+                await db.execute(statement, execution_options={"synchronize_session": False})
+            await logging_service.log_events(
+                db=db,
+                event_type="document_delete",
+                # The row is gone, so the id is only kept in the details
+                events=[
+                    {"document_id": None, "details": {"document_id": row.id, "filename": row.filename}}
+                    for row in deleted
+                ],
+                user_id=None,  # TODO: Get from auth
+                commit=False
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Files were deleted from Drive but their documents could not be removed: {str(e)}"
+            )
+
+    return {
+        "deleted": len(deleted),
+        "next_after_id": next_after_id,
+        "results": [results[document_id] for document_id in document_ids]
+    }
+
+@router.post("/categorize")
+async def categorize_documents(
+    categorize: DocumentBulkCategorize,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Assign categories to many documents, chosen by id or by filter
+
+    Adds the missing links, and with `replace` also drops categories not in
+    `category_ids`, in one transaction. Returns one result per document.
+    """
+    category_ids = list(dict.fromkeys(categorize.category_ids))
+    known = set((await db.execute(select(Category.id).where(Category.id.in_(category_ids)))).scalars())
+    missing = [category_id for category_id in category_ids if category_id not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Categories not found: {', '.join(map(str, missing))}")
+
+    document_ids, found, next_after_id = await _select_documents(db, categorize)
+    ids = [document_id for document_id in document_ids if document_id in found]
+
+    current = {document_id: set() for document_id in ids}
+    if ids:
+        links = await db.execute(
+            select(document_categories.c.document_id, document_categories.c.category_id)
+            .where(document_categories.c.document_id.in_(ids))
+        )
+        for document_id, category_id in links:
+            current[document_id].add(category_id)
+
+    results = {}
+    changes = []
+    for document_id in document_ids:
+        if document_id not in found:
+            results[document_id] = {"document_id": document_id, "status": "not_found"}
+            continue
+        added = [category_id for category_id in category_ids if category_id not in current[document_id]]
+        removed = sorted(current[document_id] - set(category_ids)) if categorize.replace else []
+        if added or removed:
+            changes.append((document_id, added, removed))
+            results[document_id] = {"document_id": document_id, "status": "updated", "added": added, "removed": removed}
+        else:
+            results[document_id] = {"document_id": document_id, "status": "unchanged"}
+
+    if changes:
+        if categorize.replace:
+            await db.execute(
+                delete(document_categories).where(
+                    document_categories.c.document_id.in_([document_id for document_id, _, removed in changes if removed]),
+                    document_categories.c.category_id.not_in(category_ids)
+                )
+            )
+        new_links = [
+            {"document_id": document_id, "category_id": category_id}
+            for document_id, added, _ in changes for category_id in added
+        ]
+        if new_links:
+            await db.execute(insert(document_categories), new_links)
+        await logging_service.log_events(
+            db=db,
+            event_type="document_categorize",
+            events=[
+                {"document_id": document_id, "details": {"added": added, "removed": removed}}
+                for document_id, added, removed in changes
+            ],
+            user_id=None,  # TODO: Get from auth
+            commit=False
+        )
+        await db.commit()
+
+    return {
+        "updated": len(changes),
+        "next_after_id": next_after_id,
+        "results": [results[document_id] for document_id in document_ids]
+    }
+
+@router.post("/move")
+async def move_documents(
+    move: DocumentBulkMove,
+    db: AsyncSession = Depends(get_async_db),
+    drive_service: GoogleDriveService = Depends(get_drive_service)
+):
+    """Move many documents to a folder
+
+    Drive moves run concurrently (at most DRIVE_BULK_CONCURRENCY at a time);
+    the documents that moved in Drive are then updated in one transaction.
+    Returns one result per requested id.
+    """
+    folder = await db.get(Folder, move.folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    document_ids = list(dict.fromkeys(move.document_ids))
+    rows = (await db.execute(
+        select(Document.id, Document.google_drive_id, Document.filename, Document.folder_id, Folder.google_drive_id.label("parent_drive_id"))
+        .outerjoin(Folder, Folder.id == Document.folder_id)
+        .where(Document.id.in_(document_ids))
+    )).all()
+    found = {row.id: row for row in rows}
+
+    results = {}
+    to_move = []
+    for document_id in document_ids:
+        row = found.get(document_id)
+        if row is None:
+            results[document_id] = {"document_id": document_id, "status": "not_found"}
+        elif row.folder_id == folder.id:
+            results[document_id] = {"document_id": document_id, "status": "unchanged"}
+        else:
+            to_move.append(row)
+
+    semaphore = asyncio.Semaphore(DRIVE_CONCURRENCY)
+
+    async def move_in_drive(row):
+        async with semaphore:
+            try:
+                await run_in_threadpool(drive_service.move_file, row.google_drive_id, folder.drive_id, row.parent_drive_id)
+            except Exception as e:
+                return row, str(e)
+            drive_metadata_cache.invalidate(row.google_drive_id)
+            return row, None
+
+    moved = []
+    for row, error in await asyncio.gather(*[move_in_drive(row) for row in to_move]):
+        if error:
+            results[row.id] = {"document_id": row.id, "status": "failed", "error": error}
+        else:
+            moved.append(row)
+            results[row.id] = {"document_id": row.id, "status": "moved"}
+
+    if moved:
+        await db.execute(
+            update(Document).where(Document.id.in_([row.id for row in moved])).values(folder_id=folder.id),
+            execution_options={"synchronize_session": False}
+        )
+        await logging_service.log_events(
+            db=db,
+            event_type="document_move",
+            events=[
+                {
+                    "document_id": row.id,
+                    "details": {
+                        "filename": row.filename,
+                        "from_folder_id": row.folder_id,
+                        "to_folder_id": folder.id
+                    }
+                }
+                for row in moved
+            ],
+            user_id=None,  # TODO: Get from auth
+            commit=False
+        )
+        await db.commit()
+
+    return {
+        "moved": len(moved),
+        "results": [results[document_id] for document_id in document_ids]
+    }
+
 @router.post("/{document_id}/move")
 async def move_document(
     document_id: int,
     folder_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     drive_service: GoogleDriveService = Depends(get_drive_service)
 ):
     """Move a document to a different folder"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    folder = db.query(Folder).filter(Folder.id == folder_id).first()
+    folder = await db.get(Folder, folder_id)
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
     
-    # Move in Google Drive
-    drive_service.move_file(document.drive_id, folder.drive_id)
+    # Move in Google Drive, from the parent we already know locally
+    previous_folder = await db.get(Folder, document.folder_id) if document.folder_id else None
+    await run_in_threadpool(
+        drive_service.move_file,
+        document.drive_id,
+        folder.drive_id,
+        previous_folder.drive_id if previous_folder else None
+    )
+    drive_metadata_cache.invalidate(document.drive_id)
     
     # Update database
     old_folder_id = document.folder_id
     document.folder_id = folder_id
-    db.commit()
+    await db.commit()
     
     # Log move
     await logging_service.log_event(
@@ -1,29 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import Feedback, Document
-from ..schemas.feedback import FeedbackCreate, Feedback as FeedbackSchema
-from ..dependencies import get_current_user
-from ..models import User
+from ..schemas.feedback import FeedbackCreate, Feedback as FeedbackSchema, FeedbackPage
+from ..dependencies import CurrentUser, get_current_user
+from ..pagination import keyset_paginate, build_page, MAX_PAGE_SIZE
 
 router = APIRouter(
     prefix="/feedback",
     tags=["feedback"],
-    dependencies=[Depends(get_current_user)]
 )
 
 @router.post("/", response_model=FeedbackSchema)
 async def create_feedback(
     feedback: FeedbackCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Submit feedback for document categorization"""
     # Get the document to verify it exists and get its current category
-    document = db.query(Document).filter(Document.id == feedback.document_id).first()
+    document = await db.get(Document, feedback.document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -40,23 +40,22 @@ async def create_feedback(
     )
 
     db.add(db_feedback)
-    db.commit()
-    db.refresh(db_feedback)
+    await db.commit()
+    await db.refresh(db_feedback)
 
     return db_feedback
 
-@router.get("/", response_model=List[FeedbackSchema])
+@router.get("/", response_model=FeedbackPage)
 async def get_feedback(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get feedback entries, admin users can see all feedback"""
-    if current_user.role == "admin":
-        feedback = db.query(Feedback).offset(skip).limit(limit).all()
-    else:
-        feedback = db.query(Feedback).filter(
-            Feedback.user_id == current_user.id
-        ).offset(skip).limit(limit).all()
-    return feedback
+    """Get feedback entries newest first, admin users can see all feedback"""
+    query = select(Feedback)
+    if current_user.role != "admin":
+        query = query.where(Feedback.user_id == current_user.id)
+    result = await db.execute(keyset_paginate(query, Feedback.timestamp, Feedback.id, cursor, limit))
+    feedback = result.scalars().all()
+    return build_page(feedback, limit, "timestamp", feedback)
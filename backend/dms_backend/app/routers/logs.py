@@ -1,33 +1,37 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
-from ..database import get_db
-from ..models import LogEntry
+from datetime import datetime, timedelta
+from ..database import get_async_db
+from ..models import LogEntry, LogRollup
 from ..services.logging import logging_service
+from ..pagination import build_page, MAX_PAGE_SIZE
 
 router = APIRouter(
     prefix="/logs",
     tags=["logs"],
 )
 
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=dict)
 async def get_logs(
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     event_type: Optional[str] = None,
     document_id: Optional[int] = None,
     user_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get recent log entries with optional filters"""
+    """Get recent log entries with optional filters, one cursor page at a time"""
     logs = await logging_service.get_recent_logs(
         db=db,
         limit=limit,
         event_type=event_type,
         document_id=document_id,
-        user_id=user_id
+        user_id=user_id,
+        cursor=cursor
     )
-    return [
+    return build_page(logs, limit, "timestamp", [
         {
             "id": log.id,
             "event_type": log.event_type,
@@ -37,4 +41,33 @@ async def get_logs(
             "timestamp": log.timestamp
         }
         for log in logs
+    ])
+
+@router.get("/stats", response_model=List[dict])
+async def get_log_stats(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get hourly event counts per event type from the pre-aggregated rollups
+
+    Defaults to the last 24 hours. Dashboards should use this instead of
+    counting raw log entries.
+    """
+    since = since or datetime.utcnow() - timedelta(hours=24)
+    query = select(LogRollup).where(LogRollup.bucket >= since)
+    if until:
+        query = query.where(LogRollup.bucket < until)
+    if event_type:
+        query = query.where(LogRollup.event_type == event_type)
+    result = await db.execute(query.order_by(LogRollup.bucket, LogRollup.event_type))
+    rollups = result.scalars().all()
+    return [
+        {
+            "bucket": rollup.bucket,
+            "event_type": rollup.event_type,
+            "count": rollup.count
+        }
+        for rollup in rollups
     ]
@@ -1,50 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
-from ..database import get_db
+import asyncio
+import json
+from ..database import get_async_db, AsyncSessionLocal
 from ..models import Notification
 from ..services.notifications import notification_service
+from ..services.notification_events import notification_broker, notification_to_dict
+from ..schemas.notifications import NotificationBulkCreate
+from ..pagination import keyset_paginate, build_page, MAX_PAGE_SIZE
 
 router = APIRouter(
     prefix="/notifications",
     tags=["notifications"],
 )
 
-@router.get("/", response_model=List[dict])
+# Idle push connections get a comment line this often so proxies keep them open
+STREAM_KEEPALIVE_SECONDS = 25
+# Notifications loaded per query when a client resumes or falls behind
+STREAM_REPLAY_LIMIT = 500
+
+@router.get("/", response_model=dict)
 async def get_notifications(
     user_id: int,
-    limit: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
     include_read: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get notifications for a user"""
-    query = db.query(Notification).filter(Notification.user_id == user_id)
+    """Get notifications for a user, newest first, one cursor page at a time"""
+    query = select(Notification).where(Notification.user_id == user_id)
     if not include_read:
-        query = query.filter(Notification.read == False)
-    notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+        query = query.where(Notification.read == False)
+    result = await db.execute(keyset_paginate(
+        query, Notification.created_at, Notification.id, cursor, limit
+    ))
+    notifications = result.scalars().all()
     
-    return [
-        {
-            "id": notif.id,
-            "message": notif.message,
-            "event_type": notif.event_type,
-            "document_id": notif.document_id,
-            "created_at": notif.created_at,
-            "read": notif.read,
-            "read_at": notif.read_at
-        }
-        for notif in notifications
-    ]
+    return build_page(notifications, limit, "created_at", [
+        notification_to_dict(notif) for notif in notifications
+    ])
+
+async def _notifications_after(user_id: int, last_id: int) -> List[dict]:
+    """Load a user's notifications created after the given id, oldest first"""
+    # A short-lived session, so idle push connections do not hold a DB connection
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Notification).where(
+                Notification.user_id == user_id,
+                Notification.id > last_id
+            ).order_by(Notification.id).limit(STREAM_REPLAY_LIMIT)
+        )
+        return [notification_to_dict(notif) for notif in result.scalars().all()]
+
+async def _notifications_since(user_id: int, last_id: int) -> AsyncIterator[dict]:
+    """All of a user's notifications created after the given id, oldest first, a page at a time"""
+    while True:
+        events = await _notifications_after(user_id, last_id)
+        for event in events:
+            yield event
+        if len(events) < STREAM_REPLAY_LIMIT:
+            return
+        last_id = events[-1]["id"]
+
+async def _latest_notification_id(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        latest = await db.execute(select(func.max(Notification.id)).where(Notification.user_id == user_id))
+        return latest.scalar() or 0
+
+def _format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    user_id: int,
+    last_event_id: Optional[int] = Header(None),
+):
+    """Push a user's new notifications as server-sent events
+
+    Browsers reconnect with a Last-Event-ID header; notifications created
+    since that id are replayed from the database before live events resume.
+    A new connection starts after the user's latest notification.
+    """
+    async def event_stream():
+        last_id = last_event_id
+        if last_id is None:
+            # Taken before subscribing; the replay below covers anything created in between
+            last_id = await _latest_notification_id(user_id)
+        subscription = notification_broker.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            async for event in _notifications_since(user_id, last_id):
+                last_id = event["id"]
+                yield _format_event(event)
+            while True:
+                if subscription.lagged and subscription.queue.empty():
+                    # Events were dropped while the client was slow; everything
+                    # queued before that has been sent, so catch up from the database
+                    subscription.lagged = False
+                    async for event in _notifications_since(user_id, last_id):
+                        last_id = event["id"]
+                        yield _format_event(event)
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+                yield _format_event(event)
+        finally:
+            notification_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/unread-count")
+async def get_unread_count(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the number of unread notifications for a user"""
+    return {
+        "user_id": user_id,
+        "unread_count": await notification_service.get_unread_count(db, user_id)
+    }
+
+@router.post("/bulk")
+async def create_notifications(
+    notification: NotificationBulkCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Send the same notification to many users at once"""
+    created = await notification_service.create_notifications(
+        db,
+        user_ids=notification.user_ids,
+        message=notification.message,
+        event_type=notification.event_type,
+        document_id=notification.document_id
+    )
+    return {"created": created}
+
+@router.post("/read")
+async def mark_notifications_read(
+    user_id: int,
+    notification_ids: List[int],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mark several of a user's notifications as read"""
+    marked = await notification_service.mark_read(db, user_id, notification_ids)
+    return {"marked_read": marked}
+
+@router.post("/read-all")
+async def mark_all_notifications_read(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mark all of a user's notifications as read"""
+    marked = await notification_service.mark_read(db, user_id)
+    return {"marked_read": marked}
 
 @router.post("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark a notification as read"""
-    notification = db.query(Notification).filter(Notification.id == notification_id).first()
+    notification = await db.get(Notification, notification_id)
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    return await notification_service.mark_as_read(db, notification)
+    return await notification_service.mark_as_read(db, notification.id)
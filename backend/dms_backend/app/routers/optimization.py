@@ -1,32 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Optional
-from ..database import get_db
-from ..services.folder_optimization import folder_optimization_service
+from ..database import SessionLocal, get_async_db
+from ..services.api_scheduler import Priority, api_scheduler
+from ..services.folder_optimization import FolderOptimizationService
 from ..services.folder_structure import FolderStructureService
 from ..services.google_drive import GoogleDriveService
 from ..services.logging import logging_service
+from .documents import get_drive_service
 
 router = APIRouter(
     prefix="/optimization",
     tags=["optimization"],
 )
 
+def _optimization_service(db: Session, drive_service: GoogleDriveService) -> FolderOptimizationService:
+    """Build an optimization service bound to a single request's session"""
+    folder_service = FolderStructureService(db, drive_service)
+    return FolderOptimizationService(db, folder_service, drive_service, None)
+
+def _analyze(drive_service: GoogleDriveService, root_folder_id: Optional[int]) -> Dict:
+    """Run the analysis in a worker thread with its own session
+
+    It walks folder relationships lazily and downloads file contents from
+    Drive, both of which block. It may read many files, so it queues behind
+    interactive calls.
+    """
+    db = SessionLocal()
+    try:
+        with api_scheduler.lane(Priority.BACKGROUND):
+            return _optimization_service(db, drive_service).analyze_folder_structure(root_folder_id)
+    finally:
+        db.close()
+
+def _apply(drive_service: GoogleDriveService, optimization_id: str, action: str) -> bool:
+    """Apply a suggestion in a worker thread with its own session, as it moves files in Drive"""
+    db = SessionLocal()
+    try:
+        return _optimization_service(db, drive_service).apply_optimization(optimization_id, action)
+    finally:
+        db.close()
+
 @router.get("/analyze")
 async def analyze_folder_structure(
     root_folder_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    drive_service: GoogleDriveService = Depends(get_drive_service)
 ):
     """Analyze folder structure and get optimization suggestions"""
-    drive_service = GoogleDriveService()
-    folder_service = FolderStructureService(db, drive_service)
-    
-    # Initialize optimization service with dependencies
-    folder_optimization_service.db = db
-    folder_optimization_service.folder_service = folder_service
-    folder_optimization_service.drive_service = drive_service
-    
-    suggestions = await folder_optimization_service.analyze_folder_structure(root_folder_id)
+    # Duplicate detection downloads file contents, so the analysis needs an authenticated client
+    suggestions = await run_in_threadpool(_analyze, drive_service, root_folder_id)
     
     # Log the analysis
     await logging_service.log_event(
@@ -41,11 +66,12 @@ async def analyze_folder_structure(
 async def apply_optimization(
     optimization_id: str,
     action: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Apply a specific optimization suggestion"""
     try:
-        success = await folder_optimization_service.apply_optimization(optimization_id, action)
+        drive_service = GoogleDriveService()
+        success = await run_in_threadpool(_apply, drive_service, optimization_id, action)
         if success:
             # Log the optimization
             await logging_service.log_event(
@@ -1,35 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from google.oauth2.credentials import Credentials
-import json
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
-from app.services.google_drive import GoogleDriveService
+from app.services.drive_clients import drive_client_pool
 
 router = APIRouter(prefix="/sheets", tags=["sheets"])
 
 SHEET_ID = "1ujJx7bVaKPFLUoladfWMFN7K4FixdIoIQMwO93AtmVQ"
 
 @router.get("/test")
-async def test_sheet_access(db: Session = Depends(get_db)):
+async def test_sheet_access(db: AsyncSession = Depends(get_async_db)):
     """Test access to the configured Google Sheet"""
     try:
         # Get the first user's credentials (for testing)
-        user = db.query(User).first()
+        user = (await db.execute(select(User).limit(1))).scalars().first()
         if not user or not user.credentials:
             raise HTTPException(status_code=401, detail="No authenticated user found")
 
-        # Create credentials object
-        creds_dict = json.loads(user.credentials)
-        credentials = Credentials.from_authorized_user_info(creds_dict)
-
-        # Initialize Google Drive service
-        drive_service = GoogleDriveService(credentials)
+        # Get the user's pooled Google Drive client
+        drive_service = await run_in_threadpool(drive_client_pool.get, user.id, user.credentials)
 
         # Try to get sheet metadata
-        file = drive_service.get_file_metadata(SHEET_ID)
+        file = await run_in_threadpool(drive_service.get_file_metadata, SHEET_ID)
         
         return {
             "success": True,
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import List, Optional
+
+class DocumentBulkMove(BaseModel):
+    document_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    folder_id: int
+
+class DocumentFilter(BaseModel):
+    """The same filters GET /documents accepts"""
+    folder_id: Optional[int] = None
+    category_id: Optional[int] = None
+    mime_type: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # An empty filter would select every document
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("filter needs at least one criterion")
+        return self
+
+class DocumentSelection(BaseModel):
+    """Documents to act on: either explicit ids or a filter, not both"""
+    document_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[DocumentFilter] = None
+    # With a filter: only documents with a larger id, to continue from `next_after_id`
+    after_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_one_selector(self):
+        if (self.document_ids is None) == (self.filter is None):
+            raise ValueError("Pass exactly one of document_ids or filter")
+        if self.after_id is not None and self.filter is None:
+            raise ValueError("after_id only applies to a filter")
+        return self
+
+class DocumentBulkCategorize(DocumentSelection):
+    category_ids: List[int] = Field(..., min_length=1, max_length=100)
+    # Drop existing categories that are not in category_ids
+    replace: bool = False
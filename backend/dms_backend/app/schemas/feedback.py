@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class FeedbackBase(BaseModel):
     document_id: int
@@ -20,3 +20,7 @@ class Feedback(FeedbackBase):
 
     class Config:
         from_attributes = True
+
+class FeedbackPage(BaseModel):
+    items: List[Feedback]
+    next_cursor: Optional[str] = None
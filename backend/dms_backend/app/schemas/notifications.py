@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class NotificationBulkCreate(BaseModel):
+    user_ids: List[int]
+    message: str
+    event_type: str
+    document_id: Optional[int] = None
@@ -12,16 +12,27 @@ import joblib
 import numpy as np
 from datetime import datetime
 from sqlalchemy.orm import Session, sessionmaker
-from ..models import Feedback, Document, Base, ModelMetrics
+from ..models import Feedback, Document, ModelMetrics
 from ..database import engine
+from .api_scheduler import api_scheduler
 
 class AICategorization:
     """Service for AI-based document categorization using Google Cloud APIs"""
     
-    def __init__(self, model_path: Optional[str] = None, version: Optional[str] = None):
-        """Initialize the AI categorization service"""
-        self.vision_client = vision.ImageAnnotatorClient()
-        self.language_client = language_v1.LanguageServiceClient()
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        version: Optional[str] = None,
+        vision_client=None,
+        language_client=None
+    ):
+        """Initialize the AI categorization service
+
+        Pass ``vision_client``/``language_client`` to use other clients than
+        the default Google Cloud ones, e.g. local fakes in benchmarks.
+        """
+        self.vision_client = vision_client or vision.ImageAnnotatorClient()
+        self.language_client = language_client or language_v1.LanguageServiceClient()
         self.version = version or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.model_dir = "models"
         self.model_path = model_path or os.path.join(self.model_dir, f'document_classifier_{self.version}.joblib')
@@ -42,7 +53,11 @@ class AICategorization:
     def extract_text(self, content: bytes) -> str:
         """Extract text from document using Google Cloud Vision API"""
         image = types.Image(content=content)
-        response = self.vision_client.document_text_detection(image=image)
+        response = api_scheduler.call(
+            "vision",
+            lambda: self.vision_client.document_text_detection(image=image),
+            method="document_text_detection"
+        )
         
         if response.error.message:
             raise Exception(
@@ -59,9 +74,9 @@ class AICategorization:
             type_=language_v1.Document.Type.PLAIN_TEXT
         )
         
-        response = self.language_client.analyze_entities(
+        response = api_scheduler.call("language", lambda: self.language_client.analyze_entities(
             request={'document': document}
-        )
+        ), method="analyze_entities")
         
         return [{
             'name': entity.name,
@@ -81,6 +96,10 @@ class AICategorization:
         confidence = np.max(self.classifier.predict_proba([text]))
         
         return prediction[0], float(confidence)
+
+    def predict_category(self, text: str) -> Tuple[str, float]:
+        """Predict the category of document text without training"""
+        return self.classify_document(text)
         
     def retrain_from_feedback(self, db: Session) -> dict:
         """Retrain model using feedback data"""
@@ -145,7 +164,6 @@ class AICategorization:
                 json.dump(metrics, f)
                 
             # Save metrics to database
-            Base.metadata.create_all(bind=engine)
             db = Session(engine)
             try:
                 db_metrics = ModelMetrics(
@@ -153,8 +171,8 @@ class AICategorization:
                     precision=metrics['precision'],
                     recall=metrics['recall'],
                     f1_score=metrics['f1_score'],
-                    training_samples=metrics['training_samples'],
-                    validation_samples=metrics['validation_samples']
+                    training_size=metrics['training_samples'],
+                    validation_size=metrics['validation_samples']
                 )
                 db.add(db_metrics)
                 db.commit()
@@ -0,0 +1,41 @@
+"""Shared AI categorization service, built on first use
+
+AICategorization pulls in scikit-learn and the Google Cloud Vision and
+Language clients and loads the model, which adds seconds to a cold start.
+Callers get the instance through ``get_ai_service`` so that only happens
+when AI categorization is enabled and first needed (or warmed up in the
+background after startup, see ``warm_up_ai_service``).
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .ai_categorization import AICategorization
+
+ENABLE_AI = os.getenv("ENABLE_AI_CATEGORIZATION", "false").lower() == "true"
+
+_ai_service: Optional["AICategorization"] = None
+_lock = threading.Lock()
+
+def get_ai_service() -> Optional["AICategorization"]:
+    """The shared AICategorization, or None when AI categorization is disabled"""
+    global _ai_service
+    if _ai_service is None and ENABLE_AI:
+        with _lock:
+            if _ai_service is None:
+                from .ai_categorization import AICategorization
+                _ai_service = AICategorization()
+    return _ai_service
+
+def set_ai_service(service: Optional["AICategorization"]) -> None:
+    """Use ``service`` instead of building one, e.g. with fake clients in benchmarks"""
+    global _ai_service
+    _ai_service = service
+
+def warm_up_ai_service() -> None:
+    """Build the service ahead of the first request; meant to run in a worker thread"""
+    try:
+        get_ai_service()
+    except Exception as e:
+        print(f"Error initializing AI service: {str(e)}")
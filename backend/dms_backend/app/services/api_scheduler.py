@@ -0,0 +1,227 @@
+"""Process-wide rate limiting and retries for calls to Google APIs"""
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from googleapiclient.errors import HttpError
+
+from ..metrics import EXTERNAL_API_DURATION, EXTERNAL_API_QUEUE_WAIT, register_queue
+
+T = TypeVar("T")
+
+class Priority(IntEnum):
+    """Scheduling lanes; a lower value is served first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "api_priority", default=Priority.INTERACTIVE
+)
+
+# Drive reports some quota errors as 403 instead of 429
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+TRANSIENT_STATUSES = {500, 502, 503, 504}
+
+EMPTY_STATS = {"calls": 0, "retries": 0, "failures": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+def _status(exc: Exception) -> Optional[int]:
+    if isinstance(exc, HttpError):
+        return exc.status_code
+    # google.api_core exceptions carry the HTTP status as `code`
+    code = getattr(exc, "code", None)
+    return code if isinstance(code, int) else None
+
+def is_rate_limited(exc: Exception) -> bool:
+    status = _status(exc)
+    if status == 429:
+        return True
+    # The reason is inside the JSON error body, e.g. {"errors": [{"reason": "rateLimitExceeded"}]}
+    return status == 403 and isinstance(exc, HttpError) and any(
+        f'"{reason}"'.encode() in exc.content for reason in RATE_LIMIT_REASONS
+    )
+
+def is_retryable(exc: Exception, idempotent: bool = True) -> bool:
+    """Whether a failed call may be repeated
+
+    Rate limit errors mean the call was rejected, so it is always safe to
+    repeat. Server errors and broken connections may have happened after the
+    call took effect, so those are only retried for idempotent calls.
+    """
+    if is_rate_limited(exc):
+        return True
+    if not idempotent:
+        return False
+    return _status(exc) in TRANSIENT_STATUSES or isinstance(exc, (ConnectionError, TimeoutError))
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    if isinstance(exc, HttpError):
+        try:
+            return float(exc.resp.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+class TokenBucket:
+    """Thread-safe token bucket that serves waiting callers by priority
+
+    Holds up to ``capacity`` tokens and refills ``rate`` tokens per second.
+    A caller only gets tokens while nobody in a more important lane is
+    waiting, so background work yields to interactive requests.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting = {priority: 0 for priority in Priority}
+
+    def waiting(self, priority: Priority) -> int:
+        return self._waiting[priority]
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float = 1.0, priority: Priority = Priority.INTERACTIVE) -> float:
+        """Block until ``cost`` tokens are taken; returns the seconds waited"""
+        cost = min(cost, self.capacity)
+        started = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    ahead = any(self._waiting[lane] for lane in Priority if lane < priority)
+                    if not ahead and self._tokens >= cost:
+                        self._tokens -= cost
+                        return time.monotonic() - started
+                    if ahead:
+                        # Woken up when a caller in a more important lane is done
+                        self._cond.wait(0.05)
+                    else:
+                        self._cond.wait((cost - self._tokens) / self.rate)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+class ApiScheduler:
+    """Rate limits, retries and lane priorities for all Google API calls
+
+    Every API has one token bucket sized to its quota. ``call`` waits for a
+    token and retries retryable errors with exponential backoff and full
+    jitter, honouring Retry-After. The lane of a call comes from the
+    context, see ``lane``. Calls block, so async code runs them in the
+    threadpool like any other Google API call.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 32.0
+    ):
+        self.buckets = {api: TokenBucket(rate, burst) for api, (rate, burst) in limits.items()}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, Priority], Dict[str, float]] = {}
+
+    @staticmethod
+    @contextmanager
+    def lane(priority: Priority):
+        """Run the calls made inside the block (and the threads it starts) in ``priority``"""
+        token = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+
+    def backoff(self, attempt: int, exc: Optional[Exception] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (counting from 0)"""
+        retry_after = _retry_after(exc) if exc is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def acquire(self, api: str, cost: float = 1.0) -> None:
+        """Wait for ``cost`` tokens of ``api`` in the current lane"""
+        priority = _current_priority.get()
+        waited = self.buckets[api].acquire(cost, priority)
+        EXTERNAL_API_QUEUE_WAIT.labels(api, priority.name.lower()).observe(waited)
+        self._record(api, priority, calls=1, wait_seconds_total=waited, wait_seconds_max=waited)
+
+    def call(
+        self,
+        api: str,
+        fn: Callable[[], T],
+        method: str = "other",
+        idempotent: bool = True,
+        cost: float = 1.0
+    ) -> T:
+        """Run ``fn`` within the rate limit of ``api``, retrying retryable errors
+
+        ``method`` names the API method in the latency metrics.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(api, cost)
+            started = time.perf_counter()
+            try:
+                result = fn()
+                EXTERNAL_API_DURATION.labels(api, method, "ok").observe(time.perf_counter() - started)
+                return result
+            except Exception as e:
+                EXTERNAL_API_DURATION.labels(api, method, "error").observe(time.perf_counter() - started)
+                if attempt == self.max_retries or not is_retryable(e, idempotent):
+                    self._record(api, _current_priority.get(), failures=1)
+                    raise
+                self._record(api, _current_priority.get(), retries=1)
+                time.sleep(self.backoff(attempt, e))
+
+    def _record(self, api: str, priority: Priority, **values: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((api, priority), dict(EMPTY_STATS))
+            for name, value in values.items():
+                stats[name] = max(stats[name], value) if name == "wait_seconds_max" else stats[name] + value
+
+    def stats(self) -> Dict[str, Dict[str, dict]]:
+        """Calls, retries and queue wait times per API and lane"""
+        with self._lock:
+            result = {}
+            for api, bucket in self.buckets.items():
+                result[api] = {}
+                for priority in Priority:
+                    stats = dict(self._stats.get((api, priority), EMPTY_STATS))
+                    stats["waiting"] = bucket.waiting(priority)
+                    result[api][priority.name.lower()] = stats
+            return result
+
+def _limit(api: str, rate: str, burst: str) -> Tuple[float, float]:
+    return float(os.getenv(f"{api}_API_RATE_PER_SECOND", rate)), float(os.getenv(f"{api}_API_BURST", burst))
+
+api_scheduler = ApiScheduler(
+    limits={
+        "drive": _limit("DRIVE", "20", "40"),
+        "vision": _limit("VISION", "30", "30"),
+        "language": _limit("LANGUAGE", "10", "10"),
+    },
+    max_retries=int(os.getenv("API_MAX_RETRIES", "5")),
+    backoff_base=float(os.getenv("API_BACKOFF_BASE_SECONDS", "0.5")),
+    backoff_max=float(os.getenv("API_BACKOFF_MAX_SECONDS", "32"))
+)
+
+for _api, _bucket in api_scheduler.buckets.items():
+    for _priority in Priority:
+        register_queue(
+            f"{_api}_api_{_priority.name.lower()}",
+            lambda bucket=_bucket, priority=_priority: bucket.waiting(priority)
+        )
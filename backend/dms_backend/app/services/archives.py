@@ -0,0 +1,61 @@
+"""Turn uploaded files and archives into a stream of files to import"""
+import mimetypes
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, Optional
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+@dataclass
+class UploadSource:
+    """One file to import; ``read`` loads its content"""
+    filename: str
+    mime_type: str
+    size: Optional[int]
+    read: Callable[[], bytes]
+
+
+def is_archive(filename: str) -> bool:
+    name = (filename or "").lower()
+    return name.endswith(".zip") or name.endswith(TAR_SUFFIXES)
+
+
+def _guess_mime_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _skip_member(path: str) -> bool:
+    # Directory entries and macOS resource forks are not documents
+    base = os.path.basename(path)
+    return not base or base.startswith(".") or path.startswith("__MACOSX/")
+
+
+def iter_archive(filename: str, fileobj: BinaryIO) -> Iterator[UploadSource]:
+    """Yield the files inside a zip or tar archive, one at a time
+
+    Tar archives are read as a stream, so each source has to be read before
+    the iterator advances; zip archives need a seekable ``fileobj``.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _skip_member(info.filename):
+                    continue
+                name = os.path.basename(info.filename)
+                yield UploadSource(
+                    name, _guess_mime_type(name), info.file_size,
+                    lambda info=info: archive.read(info)
+                )
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or _skip_member(member.name):
+                    continue
+                name = os.path.basename(member.name)
+                yield UploadSource(
+                    name, _guess_mime_type(name), member.size,
+                    lambda member=member: archive.extractfile(member).read()
+                )
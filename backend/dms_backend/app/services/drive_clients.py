@@ -0,0 +1,178 @@
+"""Per-user pool of authenticated Google Drive clients"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Optional
+
+from fastapi import HTTPException
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from ..database import SessionLocal
+from ..models import User
+from .google_drive import GoogleDriveService
+
+# The discovery client and httplib2 are slow to import, so they are only
+# imported once the first Drive client is built
+if TYPE_CHECKING:
+    import google_auth_httplib2
+
+_drive_discovery_doc: Optional[dict] = None
+_discovery_lock = threading.Lock()
+
+def drive_discovery_doc() -> dict:
+    """The Drive v3 discovery document bundled with google-api-python-client, parsed once"""
+    global _drive_discovery_doc
+    if _drive_discovery_doc is None:
+        with _discovery_lock:
+            if _drive_discovery_doc is None:
+                from googleapiclient import discovery_cache
+                _drive_discovery_doc = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+    return _drive_discovery_doc
+
+class ThreadLocalHttp:
+    """Authorized HTTP transport that keeps one connection pool per thread
+
+    httplib2.Http is not thread-safe, so a client shared between requests
+    gives each worker thread its own transport and reuses it afterwards.
+    """
+
+    def __init__(self, credentials: Credentials, timeout: float):
+        self.credentials = credentials
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _http(self) -> "google_auth_httplib2.AuthorizedHttp":
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.http = http
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+def _fingerprint(credentials_json: str) -> str:
+    """Identifies stored credentials across access-token refreshes
+
+    Built from the OAuth client and the refresh token, which a refresh
+    keeps, so only a new login (or a rotated refresh token) changes it.
+    """
+    info = json.loads(credentials_json)
+    key = f"{info.get('client_id')}:{info.get('refresh_token') or info.get('token')}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class _PooledClient:
+    __slots__ = ("fingerprint", "credentials", "service", "refresh_lock")
+
+    def __init__(self, fingerprint: str, credentials: Credentials, service):
+        self.fingerprint = fingerprint
+        self.credentials = credentials
+        self.service = service
+        self.refresh_lock = threading.Lock()
+
+def save_credentials(user_id: int, credentials_json: str) -> None:
+    """Persist refreshed credentials for a user"""
+    db = SessionLocal()
+    try:
+        # Through the ORM, so only this user's cached principals are evicted
+        user = db.get(User, user_id)
+        if user is not None:
+            user.credentials = credentials_json
+            db.commit()
+    finally:
+        db.close()
+
+class DriveClientPool:
+    """Keeps a built Drive client per user instead of building one per request
+
+    Clients are built from the bundled discovery document over a reused
+    transport, and evicted least recently used beyond ``max_clients``. When
+    a token has expired, the first caller refreshes it while concurrent
+    callers for the same user wait and then share the new token.
+
+    The methods block on HTTP, so async code should call them through a
+    threadpool.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = 256,
+        timeout: float = 60.0,
+        on_refresh: Callable[[int, str], None] = save_credentials
+    ):
+        self.max_clients = max_clients
+        self.timeout = timeout
+        self.on_refresh = on_refresh
+        self._clients: "OrderedDict[int, _PooledClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One token endpoint session shared by all refreshes
+        self._refresh_request = Request()
+
+    def get(self, user_id: int, credentials_json: Optional[str]) -> GoogleDriveService:
+        """Get a Drive service for the user, refreshing an expired token first"""
+        if not credentials_json:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        client = self._client(user_id, credentials_json)
+        self._ensure_fresh(user_id, client)
+        return GoogleDriveService(client.credentials, service=client.service)
+
+    def refresh(self, user_id: int, credentials_json: Optional[str]) -> None:
+        """Make sure the user's token is valid, refreshing it if needed"""
+        self.get(user_id, credentials_json)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def _client(self, user_id: int, credentials_json: str) -> _PooledClient:
+        fingerprint = _fingerprint(credentials_json)
+        with self._lock:
+            client = self._clients.get(user_id)
+            # Rebuild when the stored credentials changed behind our back, e.g. after a new login
+            if client is None or client.fingerprint != fingerprint:
+                from googleapiclient.discovery import build_from_document
+                credentials = Credentials.from_authorized_user_info(json.loads(credentials_json))
+                service = build_from_document(
+                    drive_discovery_doc(),
+                    http=ThreadLocalHttp(credentials, self.timeout)
+                )
+                client = _PooledClient(fingerprint, credentials, service)
+                self._clients[user_id] = client
+            self._clients.move_to_end(user_id)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def _ensure_fresh(self, user_id: int, client: _PooledClient) -> None:
+        if client.credentials.valid:
+            return
+        with client.refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if client.credentials.valid:
+                return
+            if not client.credentials.refresh_token:
+                raise HTTPException(status_code=401, detail="Invalid credentials")
+            try:
+                client.credentials.refresh(self._refresh_request)
+            except RefreshError as e:
+                self.invalidate(user_id)
+                raise HTTPException(status_code=401, detail=f"Token refresh failed: {str(e)}")
+            except TransportError as e:
+                raise HTTPException(status_code=503, detail=f"Could not reach Google to refresh token: {str(e)}")
+            credentials_json = client.credentials.to_json()
+            # A rotated refresh token changes the fingerprint; keep the client for what we store
+            client.fingerprint = _fingerprint(credentials_json)
+            self.on_refresh(user_id, credentials_json)
+
+drive_client_pool = DriveClientPool(
+    max_clients=int(os.getenv("DRIVE_CLIENT_POOL_SIZE", "256")),
+    timeout=float(os.getenv("DRIVE_HTTP_TIMEOUT_SECONDS", "60"))
+)
@@ -0,0 +1,139 @@
+"""Cache of Drive file metadata with stale-while-revalidate refreshes"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+
+from ..database import AsyncSessionLocal
+from ..models import Document
+from .api_scheduler import Priority, api_scheduler
+from .google_drive import GoogleDriveService
+
+
+def _size(metadata: dict) -> Optional[int]:
+    # Drive reports sizes as strings
+    size = metadata.get("size")
+    return int(size) if size is not None else None
+
+
+class DriveMetadataCache:
+    """Remembers Drive metadata per file id so reads do not call Drive
+
+    Entries younger than ``ttl`` are fresh. Older entries are still served,
+    but the lookup also starts a background refresh, at most one per file.
+    Files that are not cached, or were cached longer than ``max_stale`` ago,
+    return nothing and are refreshed in the background too. A refresh also
+    copies a changed size to the documents table, so GET requests never
+    write to the database themselves. A refresh whose entry is invalidated
+    or stored anew while it runs is dropped, as Drive may have answered
+    from before that change.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_stale: float = 3600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # Webhook syncs store and invalidate entries from the threadpool
+        self._lock = threading.Lock()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Files whose in-flight refresh was overtaken by invalidate() or store()
+        self._superseded: Set[str] = set()
+
+    @property
+    def refreshing_count(self) -> int:
+        return len(self._refreshing)
+
+    def get(self, file_id: str, drive_service: GoogleDriveService) -> Optional[dict]:
+        """Get cached metadata, scheduling a refresh when it is stale or missing
+
+        Must be called from the event loop.
+        """
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None:
+                self._entries.move_to_end(file_id)
+        age = time.monotonic() - entry[0] if entry else None
+        if age is None or age >= self.ttl:
+            self._schedule_refresh(file_id, drive_service)
+        if age is None or age >= self.max_stale:
+            return None
+        return entry[1]
+
+    def store(self, file_id: str, metadata: dict) -> None:
+        with self._lock:
+            self._store(file_id, metadata)
+            if file_id in self._refreshing:
+                self._superseded.add(file_id)
+
+    def invalidate(self, file_id: str) -> None:
+        with self._lock:
+            self._entries.pop(file_id, None)
+            if file_id in self._refreshing:
+                self._superseded.add(file_id)
+
+    def _store(self, file_id: str, metadata: dict) -> Optional[dict]:
+        """Store an entry and return the one it replaced; the caller holds the lock"""
+        previous = self._entries.get(file_id)
+        self._entries[file_id] = (time.monotonic(), metadata)
+        self._entries.move_to_end(file_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return previous[1] if previous else None
+
+    def _schedule_refresh(self, file_id: str, drive_service: GoogleDriveService) -> None:
+        if file_id in self._refreshing:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(file_id, drive_service))
+        self._refreshing[file_id] = task
+        task.add_done_callback(lambda _: self._refresh_done(file_id))
+
+    def _refresh_done(self, file_id: str) -> None:
+        with self._lock:
+            self._refreshing.pop(file_id, None)
+            self._superseded.discard(file_id)
+
+    async def _refresh(self, file_id: str, drive_service: GoogleDriveService) -> None:
+        try:
+            with api_scheduler.lane(Priority.BACKGROUND):
+                metadata = await run_in_threadpool(drive_service.get_file_metadata, file_id)
+            with self._lock:
+                if file_id in self._superseded:
+                    return
+                previous = self._store(file_id, metadata)
+            size = _size(metadata)
+            # A size the cache already had is in the documents table too
+            if previous is not None and _size(previous) == size:
+                return
+            async with AsyncSessionLocal() as db:
+                # Checked with a read first, so an unchanged size never waits for the writer lock
+                changed = await db.execute(
+                    select(Document.id)
+                    .where(Document.google_drive_id == file_id, Document.size_bytes.is_distinct_from(size))
+                    .limit(1)
+                )
+                if changed.first() is None:
+                    return
+                await db.execute(
+                    update(Document)
+                    .where(Document.google_drive_id == file_id, Document.size_bytes.is_distinct_from(size))
+                    .values(size_bytes=size),
+                    execution_options={"synchronize_session": False}
+                )
+                await db.commit()
+        except Exception as e:
+            # Forget the entry, so the next read refreshes and retries the update
+            self.invalidate(file_id)
+            print(f"Error refreshing Drive metadata for {file_id}: {str(e)}")
+
+
+drive_metadata_cache = DriveMetadataCache(
+    ttl=float(os.getenv("DRIVE_METADATA_TTL_SECONDS", "300")),
+    max_stale=float(os.getenv("DRIVE_METADATA_MAX_STALE_SECONDS", "3600")),
+    max_entries=int(os.getenv("DRIVE_METADATA_CACHE_SIZE", "10000"))
+)
@@ -0,0 +1,244 @@
+"""Background email delivery over a pooled SMTP session"""
+import heapq
+import itertools
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class OutgoingEmail:
+    recipient: str
+    subject: str
+    body: str
+    attempts: int = 0
+
+
+@dataclass
+class _Digest:
+    first_queued_at: float
+    entries: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class EmailDeliveryWorker:
+    """Sends queued emails from a background thread over one reused SMTP session
+
+    The session is opened (STARTTLS and login included) on first use, kept
+    while messages keep flowing and closed after ``idle_timeout`` seconds
+    without traffic. Queued messages are sent in batches of up to
+    ``batch_size``. Transient failures are retried with exponential backoff
+    and jitter, up to ``max_attempts`` per message.
+
+    Messages queued with ``digest=True`` are held per recipient and collapsed
+    into a single email once ``digest_window`` seconds have passed since the
+    first of them.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: Optional[str] = None,
+        use_starttls: bool = True,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_backoff: float = 2.0,
+        digest_window: float = 300.0,
+        idle_timeout: float = 60.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_starttls = use_starttls
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.digest_window = digest_window
+        self.idle_timeout = idle_timeout
+
+        self.sent_count = 0
+        self.failed_count = 0
+
+        self._queue: "queue.Queue[OutgoingEmail]" = queue.Queue()
+        self._retries: List[Tuple[float, int, OutgoingEmail]] = []
+        self._retry_sequence = itertools.count()
+        self._digests: Dict[str, _Digest] = {}
+        self._digest_lock = threading.Lock()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending_count(self) -> int:
+        with self._digest_lock:
+            digested = sum(len(digest.entries) for digest in self._digests.values())
+        return self._queue.qsize() + len(self._retries) + digested
+
+    def start(self) -> None:
+        """Start the delivery thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="email-delivery", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Send everything still queued, including pending digests, then stop."""
+        if not self._thread:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def send(self, recipient: str, subject: str, body: str, digest: bool = False) -> None:
+        """Queue an email for delivery."""
+        if digest:
+            with self._digest_lock:
+                pending = self._digests.setdefault(recipient, _Digest(time.monotonic()))
+                pending.entries.append((subject, body))
+        else:
+            self._queue.put(OutgoingEmail(recipient, subject, body))
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            stopping = self._stopping.is_set()
+            batch = self._next_batch(flush_all=stopping)
+            if batch:
+                self._deliver(batch)
+                continue
+            if stopping and self._queue.empty():
+                break
+            if self._smtp and time.monotonic() - self._last_used > self.idle_timeout:
+                self._disconnect()
+            self._wakeup.wait(self._wait_time())
+            self._wakeup.clear()
+        self._disconnect()
+
+    def _wait_time(self) -> float:
+        now = time.monotonic()
+        deadlines = [now + 1.0]
+        if self._retries:
+            deadlines.append(self._retries[0][0])
+        with self._digest_lock:
+            deadlines.extend(d.first_queued_at + self.digest_window for d in self._digests.values())
+        return max(min(deadlines) - now, 0.01)
+
+    def _next_batch(self, flush_all: bool = False) -> List[OutgoingEmail]:
+        now = time.monotonic()
+        batch = []
+        while self._retries and len(batch) < self.batch_size:
+            due, _, message = self._retries[0]
+            if due > now and not flush_all:
+                break
+            heapq.heappop(self._retries)
+            batch.append(message)
+        batch.extend(self._due_digests(now, flush_all))
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _due_digests(self, now: float, flush_all: bool) -> List[OutgoingEmail]:
+        with self._digest_lock:
+            due = [
+                recipient for recipient, digest in self._digests.items()
+                if flush_all or now - digest.first_queued_at >= self.digest_window
+            ]
+            digests = [(recipient, self._digests.pop(recipient)) for recipient in due]
+        messages = []
+        for recipient, digest in digests:
+            if len(digest.entries) == 1:
+                subject, body = digest.entries[0]
+            else:
+                subject = f"{len(digest.entries)} new notifications"
+                body = "\n\n".join(f"{entry_subject}\n{entry_body}" for entry_subject, entry_body in digest.entries)
+            messages.append(OutgoingEmail(recipient, subject, body))
+        return messages
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.use_starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _build_message(self, email: OutgoingEmail) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = email.recipient
+        msg['Subject'] = email.subject
+        msg.attach(MIMEText(email.body, 'plain'))
+        return msg
+
+    def _send(self, message: MIMEMultipart) -> None:
+        reused = self._smtp is not None
+        try:
+            self._connect().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # The server dropped the pooled session; reconnect once right away
+            self._disconnect()
+            self._connect().send_message(message)
+
+    def _deliver(self, batch: List[OutgoingEmail]) -> None:
+        for email in batch:
+            email.attempts += 1
+            try:
+                self._send(self._build_message(email))
+                self._last_used = time.monotonic()
+                self.sent_count += 1
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+                # Permanent rejections will not succeed on retry
+                self.failed_count += 1
+                print(f"Email to {email.recipient} rejected: {str(e)}")
+            except (smtplib.SMTPException, OSError) as e:
+                # Drop the session; the next attempt reconnects from scratch
+                self._disconnect()
+                if email.attempts >= self.max_attempts:
+                    self.failed_count += 1
+                    print(f"Giving up on email to {email.recipient} after {email.attempts} attempts: {str(e)}")
+                    continue
+                delay = self.retry_backoff * 2 ** (email.attempts - 1)
+                due = time.monotonic() + delay * random.uniform(0.5, 1.5)
+                heapq.heappush(self._retries, (due, next(self._retry_sequence), email))
+
+
+email_delivery = EmailDeliveryWorker(
+    host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+    port=int(os.getenv("SMTP_PORT", "587")),
+    username=os.getenv("SMTP_USER"),
+    password=os.getenv("SMTP_PASSWORD"),
+    use_starttls=os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+    batch_size=int(os.getenv("SMTP_BATCH_SIZE", "50")),
+    digest_window=float(os.getenv("EMAIL_DIGEST_WINDOW_SECONDS", "300"))
+)
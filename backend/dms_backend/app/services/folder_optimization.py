@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 import hashlib
@@ -8,16 +8,18 @@ from sqlalchemy import func
 from ..models import Folder, Document, Feedback, Category
 from .folder_structure import FolderStructureService
 from .google_drive import GoogleDriveService
-from .ai_categorization import AICategorization
+
+if TYPE_CHECKING:
+    from .ai_categorization import AICategorization
 
 class FolderOptimizationService:
-    def __init__(self, db: Session, folder_service: FolderStructureService, drive_service: GoogleDriveService, ai_service: AICategorization):
+    def __init__(self, db: Session, folder_service: FolderStructureService, drive_service: GoogleDriveService, ai_service: "AICategorization"):
         self.db = db
         self.folder_service = folder_service
         self.drive_service = drive_service
         self.ai_service = ai_service
 
-    async def analyze_folder_structure(self, root_folder_id: Optional[int] = None, include_ai_suggestions: bool = True) -> Dict:
+    def analyze_folder_structure(self, root_folder_id: Optional[int] = None, include_ai_suggestions: bool = True) -> Dict:
         """Analyze folder structure and return optimization suggestions
         
         Args:
@@ -44,11 +46,11 @@ class FolderOptimizationService:
         root_folders = query.all()
         
         for folder in root_folders:
-            await self._analyze_folder_recursive(folder, suggestions, depth=0)
+            self._analyze_folder_recursive(folder, suggestions, depth=0)
             
         return suggestions
 
-    async def _analyze_folder_recursive(self, folder: Folder, suggestions: Dict, depth: int) -> None:
+    def _analyze_folder_recursive(self, folder: Folder, suggestions: Dict, depth: int) -> None:
         """Recursively analyze a folder and its subfolders"""
         # Check for empty folders
         if not folder.documents and not folder.subfolders:
@@ -79,14 +81,14 @@ class FolderOptimizationService:
             })
 
         # Check naming consistency
-        await self._check_naming_consistency(folder, suggestions)
+        self._check_naming_consistency(folder, suggestions)
 
         # Recursively check subfolders
         for subfolder in folder.subfolders:
-            await self._analyze_folder_recursive(subfolder, suggestions, depth + 1)
+            self._analyze_folder_recursive(subfolder, suggestions, depth + 1)
 
         # Check for duplicate files
-        await self._find_duplicate_files(folder, suggestions)
+        self._find_duplicate_files(folder, suggestions)
 
     def _get_folder_path(self, folder: Folder) -> str:
         """Get the full path of a folder"""
@@ -97,7 +99,7 @@ class FolderOptimizationService:
             path.insert(0, current.name)
         return " / ".join(path)
 
-    async def _check_naming_consistency(self, folder: Folder, suggestions: Dict) -> None:
+    def _check_naming_consistency(self, folder: Folder, suggestions: Dict) -> None:
         """Check for naming inconsistencies within a folder"""
         # Example: mixing of case styles (camelCase, snake_case, etc.)
         names = [doc.filename for doc in folder.documents] + [subfolder.name for subfolder in folder.subfolders]
@@ -113,7 +115,7 @@ class FolderOptimizationService:
                 "issue": "Mixed naming conventions (camelCase and snake_case)"
             })
 
-    async def _find_duplicate_files(self, folder: Folder, suggestions: Dict) -> None:
+    def _find_duplicate_files(self, folder: Folder, suggestions: Dict) -> None:
         """Find duplicate files based on size and content hash"""
         # Group files by size first
         size_groups = defaultdict(list)
@@ -126,7 +128,7 @@ class FolderOptimizationService:
             if len(docs) > 1:
                 hash_groups = defaultdict(list)
                 for doc in docs:
-                    content = await self.drive_service.get_file_content(doc.drive_id)
+                    content = self.drive_service.get_file_content(doc.drive_id)
                     if content:
                         file_hash = hashlib.md5(content).hexdigest()
                         hash_groups[file_hash].append(doc)
@@ -273,7 +275,7 @@ class FolderOptimizationService:
         
         return similarity > 0.7
     
-    async def apply_optimization(self, optimization_id: str, action: str, params: Dict = None) -> bool:
+    def apply_optimization(self, optimization_id: str, action: str, params: Dict = None) -> bool:
         """Apply a specific optimization suggestion
         
         Args:
@@ -296,17 +298,17 @@ class FolderOptimizationService:
                 for doc in source_folder.documents:
                     doc.folder_id = target_folder.id
                     # Update drive location
-                    await self.drive_service.move_file(doc.drive_id, target_folder.drive_id)
+                    self.drive_service.move_file(doc.drive_id, target_folder.drive_id, source_folder.drive_id)
                 
                 # Move all subfolders to target folder
                 for subfolder in source_folder.subfolders:
                     subfolder.parent_id = target_folder.id
                     # Update drive location
-                    await self.drive_service.move_file(subfolder.drive_id, target_folder.drive_id)
+                    self.drive_service.move_file(subfolder.drive_id, target_folder.drive_id, source_folder.drive_id)
                 
                 # Delete the empty source folder
                 self.db.delete(source_folder)
-                await self.drive_service.delete_file(source_folder.drive_id)
+                self.drive_service.delete_file(source_folder.drive_id)
                 
             elif action == "move_document":
                 doc_id = params.get("document_id")
@@ -320,10 +322,11 @@ class FolderOptimizationService:
                 
                 # Update document's folder
                 old_folder_id = document.folder_id
+                previous_parent_id = document.folder.drive_id if document.folder else None
                 document.folder_id = target_folder_id
                 
                 # Move file in Google Drive
-                await self.drive_service.move_file(document.drive_id, target_folder.drive_id)
+                self.drive_service.move_file(document.drive_id, target_folder.drive_id, previous_parent_id)
                 
                 # Update AI prediction if needed
                 if document.ai_prediction:
@@ -346,7 +349,7 @@ class FolderOptimizationService:
                 
                 # Delete folder from database and drive
                 self.db.delete(folder)
-                await self.drive_service.delete_file(folder.drive_id)
+                self.drive_service.delete_file(folder.drive_id)
             
             self.db.commit()
             return True
@@ -355,5 +358,3 @@ class FolderOptimizationService:
             self.db.rollback()
             print(f"Error applying optimization: {str(e)}")
             return False
-
-folder_optimization_service = FolderOptimizationService(None, None, None, None)
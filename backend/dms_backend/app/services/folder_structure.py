@@ -1,9 +1,138 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List
+from typing import Callable, Dict, Hashable, Optional, List, Tuple
+import contextvars
+import os
+import threading
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models import Folder, Document
 from .google_drive import GoogleDriveService
 
+# Drive folders created in parallel by get_or_create_folder_paths
+DRIVE_BULK_CONCURRENCY = int(os.getenv("DRIVE_BULK_CONCURRENCY", "8"))
+
+class FolderIdCache:
+    """Process-wide LRU cache of folder ids with single-flight creation
+
+    The first caller to miss a key in ``get_or_create`` resolves it;
+    callers for the same key arriving meanwhile wait for that result
+    instead of creating a second folder. Resolvers block, so call this
+    from worker threads rather than the event loop.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._inflight: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[int]:
+        folder_id = self._ids.get(key)
+        if folder_id is not None:
+            self._ids.move_to_end(key)
+        return folder_id
+
+    def _store(self, key: Hashable, folder_id: int) -> None:
+        self._ids[key] = folder_id
+        self._ids.move_to_end(key)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            return self._lookup(key)
+
+    def set(self, key: Hashable, folder_id: int) -> None:
+        with self._lock:
+            self._store(key, folder_id)
+
+    def get_or_create(self, key: Hashable, resolve: Callable[[], int]) -> int:
+        """The folder id for ``key``, calling ``resolve`` once across threads on a miss"""
+        with self._lock:
+            folder_id = self._lookup(key)
+            if folder_id is not None:
+                return folder_id
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                with self._lock:
+                    folder_id = self._lookup(key)
+                if folder_id is None:
+                    folder_id = resolve()
+                    with self._lock:
+                        self._store(key, folder_id)
+                return folder_id
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is key_lock:
+                        del self._inflight[key]
+
+    def get_or_create_many(
+        self,
+        keys: List[Hashable],
+        resolve: Callable[[List[Hashable]], Dict[Hashable, int]]
+    ) -> Dict[Hashable, int]:
+        """The folder ids of ``keys``, calling ``resolve`` with the missing ones
+
+        Each missing key is resolved once across threads, as in
+        ``get_or_create``. Keys are claimed in a fixed order, so callers
+        sharing some of them cannot deadlock.
+        """
+        found: Dict[Hashable, int] = {}
+        with self._lock:
+            for key in keys:
+                folder_id = self._lookup(key)
+                if folder_id is not None:
+                    found[key] = folder_id
+            missing = sorted((key for key in keys if key not in found), key=repr)
+            if not missing:
+                return found
+            key_locks = [(key, self._inflight.setdefault(key, threading.Lock())) for key in missing]
+
+        held = []
+        try:
+            for key, key_lock in key_locks:
+                key_lock.acquire()
+                held.append(key_lock)
+            with self._lock:
+                unresolved = []
+                for key in missing:
+                    folder_id = self._lookup(key)
+                    if folder_id is None:
+                        unresolved.append(key)
+                    else:
+                        found[key] = folder_id
+            if unresolved:
+                resolved = resolve(unresolved)
+                with self._lock:
+                    for key, folder_id in resolved.items():
+                        self._store(key, folder_id)
+                found.update(resolved)
+            return found
+        finally:
+            with self._lock:
+                for key, key_lock in key_locks:
+                    if self._inflight.get(key) is key_lock:
+                        del self._inflight[key]
+            for key_lock in held:
+                key_lock.release()
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._ids.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+# Year and month folders by (parent folder id, year, month); month is None for a year folder
+year_month_folders = FolderIdCache(int(os.getenv("FOLDER_CACHE_MAX_ENTRIES", "4096")))
+# Folders by (parent folder id, name), for get_or_create_folder_paths
+folder_paths = FolderIdCache(int(os.getenv("FOLDER_CACHE_MAX_ENTRIES", "4096")))
+
 class FolderStructureService:
     """Service for managing the folder structure in both database and Google Drive"""
     
@@ -11,57 +140,79 @@ class FolderStructureService:
         self.db = db
         self.drive_service = drive_service
     
-    def create_year_month_structure(self, year: int, month: int, parent_folder: Folder) -> Folder:
-        """Create or get year/month folder structure"""
-        # First, try to find or create year folder
-        year_folder = self.db.query(Folder).filter(
-            Folder.parent_id == parent_folder.id,
-            Folder.year == year
-        ).first()
-        
-        if not year_folder:
-            # Create in Google Drive
-            drive_folder = self.drive_service.create_folder(
-                f"{year}",
-                parent_folder.drive_id
-            )
-            
-            # Create in database
-            year_folder = Folder(
-                name=f"{year}",
-                drive_id=drive_folder['id'],
-                parent_id=parent_folder.id,
-                year=year
-            )
-            self.db.add(year_folder)
-            self.db.commit()
-        
-        # Then, try to find or create month folder
-        month_folder = self.db.query(Folder).filter(
-            Folder.parent_id == year_folder.id,
+    def create_year_month_structure(self, year: int, month: int, parent_folder: Optional[Folder]) -> Folder:
+        """Create or get year/month folder structure
+
+        Resolved through the process-wide ``year_month_folders`` cache, so a
+        hit costs one primary key lookup and concurrent uploads for the same
+        month wait for a single creation. ``parent_folder=None`` puts the
+        year folder at the top level.
+        """
+        parent_id = parent_folder.id if parent_folder else None
+
+        def resolve_year() -> int:
+            return self._get_or_create_dated_folder(f"{year}", parent_folder, year).id
+
+        def resolve_month() -> int:
+            year_folder = self._cached_folder((parent_id, year, None), resolve_year)
+            return self._get_or_create_dated_folder(f"{month:02d}", year_folder, year, month).id
+
+        return self._cached_folder((parent_id, year, month), resolve_month)
+
+    def _cached_folder(self, key: Tuple[Optional[int], int, Optional[int]], resolve: Callable[[], int]) -> Folder:
+        folder = self.db.get(Folder, year_month_folders.get_or_create(key, resolve))
+        if folder is None:
+            # Deleted since it was cached
+            year_month_folders.discard(key)
+            folder = self.db.get(Folder, year_month_folders.get_or_create(key, resolve))
+        return folder
+
+    def _get_or_create_dated_folder(
+        self,
+        name: str,
+        parent_folder: Optional[Folder],
+        year: int,
+        month: Optional[int] = None
+    ) -> Folder:
+        """Get or create the year (``month=None``) or month folder below ``parent_folder``
+
+        The unique index on (parent, year, month) makes concurrent creators
+        in other processes converge: the loser drops its Drive folder and
+        uses the winner's.
+        """
+        query = self.db.query(Folder).filter(
+            Folder.parent_id == (parent_folder.id if parent_folder else None),
+            Folder.year == year,
             Folder.month == month
-        ).first()
-        
-        if not month_folder:
-            # Create in Google Drive
-            drive_folder = self.drive_service.create_folder(
-                f"{month:02d}",
-                year_folder.drive_id
-            )
-            
-            # Create in database
-            month_folder = Folder(
-                name=f"{month:02d}",
-                drive_id=drive_folder['id'],
-                parent_id=year_folder.id,
-                year=year,
-                month=month
-            )
-            self.db.add(month_folder)
+        )
+        folder = query.first()
+        if folder:
+            return folder
+
+        # Create in Google Drive
+        drive_folder = self.drive_service.create_folder(name, parent_folder.drive_id if parent_folder else None)
+
+        # Create in database
+        folder = Folder(
+            name=name,
+            drive_id=drive_folder['id'],
+            parent_id=parent_folder.id if parent_folder else None,
+            year=year,
+            month=month
+        )
+        self.db.add(folder)
+        try:
             self.db.commit()
-        
-        return month_folder
-    
+            return folder
+        except IntegrityError:
+            self.db.rollback()
+
+        try:
+            self.drive_service.delete_file(drive_folder['id'])
+        except Exception as e:
+            print(f"Error deleting duplicate Drive folder {drive_folder['id']}: {str(e)}")
+        return query.one()
+
     def create_category_folder(self, name: str, parent_folder: Optional[Folder] = None) -> Folder:
         """Create a category folder"""
         # Create in Google Drive
@@ -83,21 +234,155 @@ class FolderStructureService:
     
     def get_or_create_folder_path(self, path: List[str], parent_folder: Optional[Folder] = None) -> Folder:
         """Get or create a folder path"""
-        current_folder = parent_folder
-        
-        for folder_name in path:
-            next_folder = self.db.query(Folder).filter(
-                Folder.parent_id == (current_folder.id if current_folder else None),
-                Folder.name == folder_name
-            ).first()
-            
-            if not next_folder:
-                next_folder = self.create_category_folder(folder_name, current_folder)
-            
-            current_folder = next_folder
-        
-        return current_folder
-    
+        return self.get_or_create_folder_paths([path], parent_folder)[0]
+
+    def get_or_create_folder_paths(
+        self,
+        paths: List[List[str]],
+        parent_folder: Optional[Folder] = None,
+        _retry: bool = True
+    ) -> List[Folder]:
+        """Get or create many folder paths below ``parent_folder`` at once
+
+        Segments are taken from the ``folder_paths`` cache where possible and
+        the rest are looked up with a single query. Missing folders are
+        created a level at a time: siblings in parallel in Drive, then one
+        commit per level. Concurrent callers create each folder once.
+        Returns the last folder of each path, or ``parent_folder`` for an
+        empty path.
+        """
+        root_id = parent_folder.id if parent_folder else None
+        prefixes = sorted({tuple(path[:i]) for path in paths for i in range(1, len(path) + 1)}, key=len)
+        ids = self._resolve_existing_paths(prefixes, root_id)
+        if any(prefix not in ids for prefix in prefixes):
+            self._create_missing_paths(prefixes, ids, parent_folder)
+
+        wanted = {ids[tuple(path)] for path in paths if path and tuple(path) in ids}
+        folders = {folder.id: folder for folder in self.db.query(Folder).filter(Folder.id.in_(wanted))} if wanted else {}
+        stale = [path for path in paths if path and ids.get(tuple(path)) not in folders]
+        if stale and _retry:
+            # A cached folder of these paths was deleted since; resolve them from the database
+            for path in stale:
+                self._discard_cached_path(path, root_id)
+            return self.get_or_create_folder_paths(paths, parent_folder, _retry=False)
+        return [folders[ids[tuple(path)]] if path else parent_folder for path in paths]
+
+    def _resolve_existing_paths(self, prefixes: List[Tuple[str, ...]], root_id: Optional[int]) -> Dict[tuple, Optional[int]]:
+        """Folder ids of the path prefixes that exist, by prefix (shortest prefixes first)"""
+        ids: Dict[tuple, Optional[int]] = {(): root_id}
+        uncached = []
+        for prefix in prefixes:
+            folder_id = folder_paths.get((ids[prefix[:-1]], prefix[-1])) if prefix[:-1] in ids else None
+            if folder_id is None:
+                uncached.append(prefix)
+            else:
+                ids[prefix] = folder_id
+        if not uncached:
+            return ids
+
+        # Every folder named like a missing segment, then walk down from the root;
+        # with duplicate names under one parent the oldest folder wins
+        names = sorted({prefix[-1] for prefix in uncached})
+        children: Dict[Tuple[Optional[int], str], int] = {}
+        for start in range(0, len(names), 500):
+            rows = self.db.query(Folder.id, Folder.parent_id, Folder.name).filter(
+                Folder.name.in_(names[start:start + 500])
+            ).order_by(Folder.id.desc())
+            children.update({(row.parent_id, row.name): row.id for row in rows})
+
+        for prefix in uncached:
+            if prefix[:-1] not in ids:
+                continue
+            key = (ids[prefix[:-1]], prefix[-1])
+            if key in children:
+                ids[prefix] = children[key]
+                folder_paths.set(key, children[key])
+        return ids
+
+    def _create_missing_paths(self, prefixes: List[Tuple[str, ...]], ids: Dict[tuple, Optional[int]], parent_folder: Optional[Folder]) -> None:
+        """Create the folders of ``prefixes`` missing from ``ids``, adding them to ``ids``
+
+        Prefixes below a cached folder that no longer exists are left out.
+        """
+        drive_ids: Dict[Optional[int], Optional[str]] = {None: None}
+        if parent_folder:
+            drive_ids[parent_folder.id] = parent_folder.drive_id
+
+        with ThreadPoolExecutor(max_workers=DRIVE_BULK_CONCURRENCY) as pool:
+            for depth in sorted({len(prefix) for prefix in prefixes if prefix not in ids}):
+                level = [prefix for prefix in prefixes if len(prefix) == depth and prefix not in ids and prefix[:-1] in ids]
+                parent_ids = {ids[prefix[:-1]] for prefix in level} - set(drive_ids)
+                if parent_ids:
+                    drive_ids.update(self.db.query(Folder.id, Folder.google_drive_id).filter(Folder.id.in_(parent_ids)).all())
+                keys = {(ids[prefix[:-1]], prefix[-1]): prefix for prefix in level if ids[prefix[:-1]] in drive_ids}
+                level_ids = folder_paths.get_or_create_many(
+                    list(keys), lambda missing: self._create_path_folders(missing, drive_ids, pool)
+                )
+                for key, folder_id in level_ids.items():
+                    ids[keys[key]] = folder_id
+
+    def _create_path_folders(
+        self,
+        keys: List[Tuple[Optional[int], str]],
+        drive_ids: Dict[Optional[int], Optional[str]],
+        pool: ThreadPoolExecutor
+    ) -> Dict[Tuple[Optional[int], str], int]:
+        """Create the folders of one level, as (parent id, name) keys, unless they exist by now
+
+        Returns their ids. Created folders are committed and cached even
+        when some of their siblings fail, and the first failure is raised.
+        """
+        ids: Dict[Tuple[Optional[int], str], int] = {}
+        rows = self.db.query(Folder.id, Folder.parent_id, Folder.name).filter(
+            Folder.name.in_({name for _, name in keys})
+        ).order_by(Folder.id.desc())
+        existing = {(row.parent_id, row.name): row.id for row in rows}
+        missing = []
+        for key in keys:
+            if key in existing:
+                ids[key] = existing[key]
+            else:
+                missing.append(key)
+
+        # Each call gets a copy of our context, so it keeps the caller's API priority lane
+        futures = [
+            pool.submit(contextvars.copy_context().run, self.drive_service.create_folder, name, drive_ids[parent_id])
+            for parent_id, name in missing
+        ]
+        created, errors = [], []
+        for key, future in zip(missing, futures):
+            try:
+                drive_folder = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            folder = Folder(name=key[1], drive_id=drive_folder['id'], parent_id=key[0])
+            self.db.add(folder)
+            created.append((key, folder))
+
+        # Store what was created in Drive even if some siblings failed
+        self.db.flush()
+        created_ids = [(key, folder.id, folder.drive_id) for key, folder in created]
+        self.db.commit()
+        for key, folder_id, drive_id in created_ids:
+            ids[key] = folder_id
+            drive_ids[folder_id] = drive_id
+            folder_paths.set(key, folder_id)
+        if errors:
+            raise errors[0]
+        return ids
+
+    @staticmethod
+    def _discard_cached_path(path: List[str], root_id: Optional[int]) -> None:
+        """Drop the cached folders of ``path``, leaving other paths cached"""
+        parent_id = root_id
+        for name in path:
+            key = (parent_id, name)
+            parent_id = folder_paths.get(key)
+            folder_paths.discard(key)
+            if parent_id is None:
+                return
+
     def sync_folder_structure(self, folder: Folder) -> None:
         """Sync folder structure with Google Drive"""
         # Get files from Google Drive
@@ -1,12 +1,16 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from datetime import datetime
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.errors import HttpError
 from fastapi import HTTPException
 import os
 import io
+import time
+
+from .api_scheduler import api_scheduler, is_retryable
+
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import Flow
 
 class GoogleDriveService:
     """Service for interacting with Google Drive API"""
@@ -23,17 +27,28 @@ class GoogleDriveService:
         'https://www.googleapis.com/auth/drive.meet.readonly',
         'https://www.googleapis.com/auth/drive.scripts'
     ]
+
+    # Most calls Drive accepts in one batch request
+    BATCH_LIMIT = 100
     
-    def __init__(self, credentials: Optional[Credentials] = None):
-        """Initialize the Google Drive service with optional credentials"""
+    def __init__(self, credentials: Optional[Credentials] = None, service=None):
+        """Initialize the Google Drive service with optional credentials
+
+        Pass an already built ``service`` to reuse a pooled client (see
+        ``drive_clients.DriveClientPool``) instead of building a new one.
+        """
         self.credentials = credentials
-        self.service = None
-        if credentials:
+        self.service = service
+        if credentials and service is None:
+            # Imported here, the discovery client is slow to import
+            from googleapiclient.discovery import build
             self.service = build('drive', 'v3', credentials=credentials)
     
     @classmethod
-    def create_auth_url(cls, redirect_uri: Optional[str] = None) -> tuple[Flow, str]:
+    def create_auth_url(cls, redirect_uri: Optional[str] = None) -> tuple["Flow", str]:
         """Create OAuth2 authorization URL"""
+        from google_auth_oauthlib.flow import Flow
+
         default_redirect_uri = os.getenv("GOOGLE_OAUTH_REDIRECT_URI")
         if not redirect_uri and not default_redirect_uri:
             raise ValueError("No redirect URI provided and GOOGLE_OAUTH_REDIRECT_URI environment variable is not set")
@@ -74,10 +89,11 @@ class GoogleDriveService:
         if parent_id:
             file_metadata['parents'] = [parent_id]
             
-        return self.service.files().create(
+        # Creating is not idempotent, so only rate limit errors are retried
+        return api_scheduler.call("drive", self.service.files().create(
             body=file_metadata,
             fields='id, name, createdTime, modifiedTime'
-        ).execute()
+        ).execute, method="files.create", idempotent=False)
     
     def upload_file(self, name: str, content: bytes, mime_type: str, parent_id: Optional[str] = None) -> dict:
         """Upload a file to Google Drive"""
@@ -88,27 +104,41 @@ class GoogleDriveService:
         if parent_id:
             file_metadata['parents'] = [parent_id]
             
-        media = MediaIoBaseUpload(
-            io.BytesIO(content),
-            mimetype=mime_type,
-            resumable=True
-        )
+        from googleapiclient.http import MediaIoBaseUpload
+
+        def upload():
+            # A fresh stream per attempt; a retried upload starts over
+            media = MediaIoBaseUpload(
+                io.BytesIO(content),
+                mimetype=mime_type,
+                resumable=True
+            )
+            return self.service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id, name, size, createdTime, modifiedTime'
+            ).execute()
         
-        return self.service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, name, size, createdTime, modifiedTime'
-        ).execute()
+        return api_scheduler.call("drive", upload, method="files.create", idempotent=False)
     
     def get_file_metadata(self, file_id: str) -> dict:
         """Get metadata for a file"""
         if not self.service:
             raise HTTPException(status_code=401, detail="Not authenticated")
             
-        return self.service.files().get(
+        return api_scheduler.call("drive", self.service.files().get(
             fileId=file_id,
             fields='id, name, size, createdTime, modifiedTime, parents'
-        ).execute()
+        ).execute, method="files.get")
+    
+    def get_file_content(self, file_id: str) -> bytes:
+        """Download the content of a file"""
+        if not self.service:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+            
+        return api_scheduler.call(
+            "drive", self.service.files().get_media(fileId=file_id).execute, method="files.get_media"
+        )
     
     def list_files(self, folder_id: Optional[str] = None, page_size: int = 100) -> List[dict]:
         """List files in a folder"""
@@ -117,33 +147,41 @@ class GoogleDriveService:
             
         query = f"'{folder_id}' in parents" if folder_id else None
         
-        results = self.service.files().list(
+        results = api_scheduler.call("drive", self.service.files().list(
             pageSize=page_size,
             q=query,
             fields='files(id, name, size, createdTime, modifiedTime, mimeType)'
-        ).execute()
+        ).execute, method="files.list")
         
         return results.get('files', [])
     
-    def move_file(self, file_id: str, new_parent_id: str) -> dict:
-        """Move a file to a different folder"""
+    def move_file(self, file_id: str, new_parent_id: str, previous_parent_id: Optional[str] = None) -> dict:
+        """Move a file to a different folder
+
+        Pass the current parent's ``previous_parent_id`` when it is known
+        locally to move with a single request; otherwise the parents are
+        looked up first.
+        """
         if not self.service:
             raise HTTPException(status_code=401, detail="Not authenticated")
             
-        # Get current parents
-        file = self.service.files().get(
-            fileId=file_id,
-            fields='parents'
-        ).execute()
+        if previous_parent_id:
+            previous_parents = previous_parent_id
+        else:
+            # Get current parents
+            file = api_scheduler.call("drive", self.service.files().get(
+                fileId=file_id,
+                fields='parents'
+            ).execute, method="files.get")
+            previous_parents = ",".join(file.get('parents', []))
         
         # Remove old parents and add new one
-        previous_parents = ",".join(file.get('parents', []))
-        file = self.service.files().update(
+        file = api_scheduler.call("drive", self.service.files().update(
             fileId=file_id,
             addParents=new_parent_id,
             removeParents=previous_parents,
             fields='id, name, parents'
-        ).execute()
+        ).execute, method="files.update")
         
         return file
     
@@ -152,4 +190,43 @@ class GoogleDriveService:
         if not self.service: 
             raise HTTPException(status_code=401, detail="Not authenticated")
             
-        self.service.files().delete(fileId=file_id).execute()
+        api_scheduler.call("drive", self.service.files().delete(fileId=file_id).execute, method="files.delete")
+
+    def delete_files(self, file_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Delete many files with batch requests of up to BATCH_LIMIT calls
+
+        Returns the error per file id, None for files that are gone. Files
+        that do not exist (any more) count as deleted. Calls that failed
+        with a retryable error are sent again in a later batch.
+        """
+        if not self.service:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+
+        errors: Dict[str, Optional[str]] = {}
+        pending = list(file_ids)
+        for attempt in range(api_scheduler.max_retries + 1):
+            retry = []
+            last_error = None
+
+            def on_response(request_id, response, exception):
+                nonlocal last_error
+                if exception is None or (isinstance(exception, HttpError) and exception.resp.status == 404):
+                    errors[request_id] = None
+                elif is_retryable(exception) and attempt < api_scheduler.max_retries:
+                    retry.append(request_id)
+                    last_error = exception
+                else:
+                    errors[request_id] = str(exception)
+
+            for start in range(0, len(pending), self.BATCH_LIMIT):
+                chunk = pending[start:start + self.BATCH_LIMIT]
+                batch = self.service.new_batch_http_request(callback=on_response)
+                for file_id in chunk:
+                    batch.add(self.service.files().delete(fileId=file_id), request_id=file_id)
+                # Every call in the batch counts against the quota
+                api_scheduler.call("drive", batch.execute, method="batch", cost=len(chunk))
+            if not retry:
+                break
+            time.sleep(api_scheduler.backoff(attempt, last_error))
+            pending = retry
+        return errors
@@ -0,0 +1,236 @@
+"""Time partitioning, retention and archival for log_entries
+
+log_entries is split into monthly partitions named ``log_entries_YYYY_MM``:
+
+* On Postgres these are native range partitions of the log_entries table
+  (see the 2b8e0f4c6d13 migration). Partitions for the current and next
+  month are created ahead of time; a default partition catches the rest.
+* On SQLite, log_entries only holds the current month. Closed months are
+  rotated out into standalone ``log_entries_YYYY_MM`` tables with the same
+  keyset indexes, so the hot table and its indexes stay small. GET /logs
+  pages across log_entries and the rotated tables together (see
+  LoggingService.get_recent_logs).
+
+Partitions that fall completely outside the retention window are written to
+gzip-compressed NDJSON files in the archive directory and then dropped.
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+
+PARTITION_NAME = re.compile(r"^log_entries_(\d{4})_(\d{2})$")
+LOG_COLUMNS = "id, event_type, document_id, user_id, details, timestamp"
+# Keyset indexes of a rotated SQLite table, mirroring those of log_entries
+ROTATED_INDEXES = {
+    "timestamp_id": "timestamp, id",
+    "document_id_timestamp_id": "document_id, timestamp, id",
+    "user_id_timestamp_id": "user_id, timestamp, id",
+    "event_type_timestamp_id": "event_type, timestamp, id",
+}
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"log_entries_{month.year:04d}_{month.month:02d}"
+
+
+def _parse_partitions(names: List[str]) -> List[Tuple[str, date]]:
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def rotated_partitions(db: AsyncSession) -> List[Tuple[str, date]]:
+    """List (table name, month) for every rotated SQLite log table, oldest first"""
+    # A plain SELECT, so reading the catalog never waits for the writer lock
+    sqlite_master = table("sqlite_master", literal_column("type"), literal_column("name"))
+    names = (await db.execute(
+        select(sqlite_master.c.name).where(
+            sqlite_master.c.type == "table",
+            sqlite_master.c.name.like("log_entries_%")
+        )
+    )).scalars().all()
+    return _parse_partitions(names)
+
+
+class LogRetentionService:
+    """Maintains log_entries partitions and applies the retention policy"""
+
+    def __init__(self, retention_days: int = 90, archive_dir: str = "log_archive"):
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+
+    def run_maintenance(self, db: Session, now: Optional[datetime] = None) -> dict:
+        """Create upcoming partitions, rotate closed months and expire old ones"""
+        now = now or datetime.utcnow()
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            created = self._ensure_postgres_partitions(db, now.date())
+            rotated = []
+        else:
+            created = []
+            rotated = self._rotate_sqlite(db, now.date())
+        archived = self._expire_partitions(db, now - timedelta(days=self.retention_days), dialect)
+        return {"created": created, "rotated": rotated, "archived": archived}
+
+    def list_partitions(self, db: Session) -> List[Tuple[str, date]]:
+        """List (table name, month) for every monthly log partition, oldest first"""
+        if db.get_bind().dialect.name == "postgresql":
+            names = db.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'log_entries'"
+            )).scalars().all()
+        else:
+            names = db.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'log_entries_%'"
+            )).scalars().all()
+        return _parse_partitions(names)
+
+    def _ensure_postgres_partitions(self, db: Session, today: date) -> List[str]:
+        existing = {name for name, _ in self.list_partitions(db)}
+        created = []
+        month = _month_start(today)
+        for _ in range(2):
+            name = partition_name(month)
+            if name not in existing:
+                start, end = month.isoformat(), _next_month(month).isoformat()
+                # Build the partition standalone and move any rows that already
+                # landed in the default partition, so attaching it cannot fail
+                db.execute(text(f"CREATE TABLE {name} (LIKE log_entries INCLUDING DEFAULTS)"))
+                db.execute(text(
+                    f"WITH moved AS (DELETE FROM log_entries_default "
+                    f"WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ), {"start": start, "end": end})
+                db.execute(text(
+                    f"ALTER TABLE log_entries ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                ))
+                db.commit()
+                created.append(name)
+            month = _next_month(month)
+        return created
+
+    def _rotate_sqlite(self, db: Session, today: date) -> List[str]:
+        current_month = _month_start(today)
+        oldest = db.execute(text(
+            "SELECT MIN(timestamp) FROM log_entries WHERE timestamp < :cutoff"
+        ), {"cutoff": current_month.isoformat()}).scalar()
+        if oldest is None:
+            return []
+        if isinstance(oldest, str):
+            oldest = datetime.fromisoformat(oldest)
+
+        rotated = []
+        month = _month_start(oldest.date())
+        while month < current_month:
+            name = partition_name(month)
+            start, end = month.isoformat(), _next_month(month).isoformat()
+            month = _next_month(month)
+            has_rows = db.execute(text(
+                "SELECT 1 FROM log_entries WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+            ), {"start": start, "end": end}).scalar()
+            if not has_rows:
+                continue
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} AS SELECT {LOG_COLUMNS} FROM log_entries WHERE 0"
+            ))
+            for suffix, columns in ROTATED_INDEXES.items():
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{name}_{suffix} ON {name} ({columns})"))
+            db.execute(text(
+                f"INSERT INTO {name} ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM log_entries "
+                f"WHERE timestamp >= :start AND timestamp < :end"
+            ), {"start": start, "end": end})
+            db.execute(text(
+                "DELETE FROM log_entries WHERE timestamp >= :start AND timestamp < :end"
+            ), {"start": start, "end": end})
+            db.commit()
+            rotated.append(name)
+        return rotated
+
+    def _expire_partitions(self, db: Session, cutoff: datetime, dialect: str) -> List[str]:
+        archived = []
+        for name, month in self.list_partitions(db):
+            # Only partitions whose whole month lies before the cutoff expire
+            if _next_month(month) > cutoff.date():
+                break
+            if dialect == "postgresql":
+                db.execute(text(f"ALTER TABLE log_entries DETACH PARTITION {name}"))
+                db.commit()
+            self._archive_table(db, name)
+            db.execute(text(f"DROP TABLE {name}"))
+            db.commit()
+            archived.append(name)
+        return archived
+
+    def _archive_table(self, db: Session, name: str) -> str:
+        """Write every row of a partition to <archive_dir>/<name>.ndjson.gz"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{name}.ndjson.gz")
+        tmp_path = f"{path}.tmp"
+        result = db.execute(
+            text(f"SELECT {LOG_COLUMNS} FROM {name} ORDER BY timestamp, id"),
+            execution_options={"stream_results": True}
+        )
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+            for row in result.mappings():
+                record = dict(row)
+                if isinstance(record["details"], str):
+                    record["details"] = json.loads(record["details"])
+                archive.write(json.dumps(record, default=str) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+
+log_retention_service = LogRetentionService(
+    retention_days=int(os.getenv("LOG_RETENTION_DAYS", "90")),
+    archive_dir=os.getenv("LOG_ARCHIVE_DIR", "log_archive")
+)
+
+
+def _run_log_maintenance() -> dict:
+    db = SessionLocal()
+    try:
+        return log_retention_service.run_maintenance(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def periodic_log_maintenance():
+    """Periodically rotate, archive and expire log partitions"""
+    interval = int(os.getenv("LOG_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            result = await loop.run_in_executor(None, _run_log_maintenance)
+            if any(result.values()):
+                print(f"Log maintenance completed: {result}")
+        except Exception as e:
+            print(f"Error during log maintenance: {str(e)}")
+
+        await asyncio.sleep(interval)
@@ -1,48 +1,283 @@
+import asyncio
+import os
+from collections import Counter
 from datetime import datetime
-from typing import Optional
-from sqlalchemy.orm import Session
-from ..models import LogEntry, Document, User
+from typing import List, Optional
+from sqlalchemy import column, insert, select, table, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from ..database import AsyncSessionLocal
+from ..models import LogEntry, LogRollup, Document, User
+from ..pagination import decode_cursor, keyset_paginate
+from .log_retention import rotated_partitions
+
+# Events that must be on disk before the request returns, regardless of buffering
+DURABLE_EVENT_TYPES = {"document_delete"}
+
+async def record_rollups(db: AsyncSession, entries: List[dict]) -> None:
+    """Add log entries to the hourly per-event-type counters in log_rollups"""
+    counts = Counter(
+        (entry["timestamp"].replace(minute=0, second=0, microsecond=0), entry["event_type"])
+        for entry in entries
+    )
+    if not counts:
+        return
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(LogRollup).values([
+        {"bucket": bucket, "event_type": event_type, "count": count}
+        for (bucket, event_type), count in counts.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["bucket", "event_type"],
+        set_={"count": LogRollup.count + stmt.excluded["count"]}
+    ))
+
+class LogSink:
+    """Buffers log entries in memory and writes them to the database in bulk.
+
+    Entries are flushed as one multi-row insert whenever ``batch_size`` entries
+    are queued or ``flush_interval`` seconds have passed since the first one.
+    When the queue is full, ``put`` waits for the writer to catch up.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 1.0, max_queue_size: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the background writer on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the writer."""
+        if not self.running:
+            return
+        await self._queue.put(self._STOP)
+        await self._task
+        self._task = None
+
+    async def put(self, values: dict) -> None:
+        """Queue a log entry, waiting while the queue is full."""
+        await self._queue.put(values)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: List[dict]) -> None:
+        """Write a batch, so that one bad entry does not lose the others
+
+        Entries may point at documents or users deleted before the flush,
+        which fails the foreign keys. When the batch fails, those references
+        are cleared and the batch retried; if it still fails, the entries
+        are written one by one and only the failing ones are dropped.
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                await self._insert(db, batch)
+                return
+            except Exception as e:
+                await db.rollback()
+                print(f"Failed to write {len(batch)} log entries, retrying: {str(e)}")
+
+            batch = await self._without_dangling_references(db, batch)
+            try:
+                await self._insert(db, batch)
+                return
+            except Exception:
+                await db.rollback()
+
+            for values in batch:
+                try:
+                    await self._insert(db, [values])
+                except Exception as e:
+                    await db.rollback()
+                    print(f"Dropped {values['event_type']} log entry: {str(e)}")
+
+    @staticmethod
+    async def _insert(db: AsyncSession, batch: List[dict]) -> None:
+        await db.execute(insert(LogEntry), batch)
+        await record_rollups(db, batch)
+        await db.commit()
+
+    @staticmethod
+    async def _without_dangling_references(db: AsyncSession, batch: List[dict]) -> List[dict]:
+        """The batch with document and user ids that no longer exist set to None"""
+        existing = {}
+        for key, model in (("document_id", Document), ("user_id", User)):
+            ids = {values[key] for values in batch} - {None}
+            existing[key] = set()
+            if ids:
+                existing[key] = set((await db.execute(select(model.id).where(model.id.in_(ids)))).scalars())
+        return [
+            dict(values, **{key: None for key in existing if values[key] not in existing[key]})
+            for values in batch
+        ]
+
+log_sink = LogSink(
+    batch_size=int(os.getenv("LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1.0")),
+    max_queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+)
 
 class LoggingService:
     @staticmethod
     async def log_event(
-        db: Session,
+        db: AsyncSession,
         event_type: str,
         document_id: Optional[int] = None,
         user_id: Optional[int] = None,
-        details: Optional[dict] = None
+        details: Optional[dict] = None,
+        durable: bool = False
     ) -> LogEntry:
-        """Log an event in the system."""
-        log_entry = LogEntry(
-            event_type=event_type,
-            document_id=document_id,
-            user_id=user_id,
-            details=details,
-            timestamp=datetime.utcnow()
-        )
+        """Log an event in the system.
+
+        Entries go through the buffered ``log_sink`` and are written shortly
+        after the request. Pass ``durable=True`` (or use an event type from
+        ``DURABLE_EVENT_TYPES``) to commit the entry in ``db`` before returning.
+        """
+        values = {
+            "event_type": event_type,
+            "document_id": document_id,
+            "user_id": user_id,
+            "details": details,
+            "timestamp": datetime.utcnow()
+        }
+        if not durable and event_type not in DURABLE_EVENT_TYPES and log_sink.running:
+            await log_sink.put(values)
+            return LogEntry(**values)
+
+        log_entry = LogEntry(**values)
         db.add(log_entry)
-        db.commit()
-        db.refresh(log_entry)
+        await record_rollups(db, [values])
+        await db.commit()
+        await db.refresh(log_entry)
         return log_entry
 
+    @staticmethod
+    async def log_events(
+        db: AsyncSession,
+        event_type: str,
+        events: List[dict],
+        user_id: Optional[int] = None,
+        durable: bool = False,
+        commit: bool = True
+    ) -> None:
+        """Log many events of one type at once, for bulk operations.
+
+        Each item of ``events`` may carry a ``document_id`` and ``details``.
+        Buffering works as in ``log_event``. Otherwise the entries are
+        inserted with one statement; pass ``commit=False`` to leave them in
+        the caller's transaction. Such entries always bypass the buffer: the
+        caller may hold the SQLite writer lock the buffer's writer needs, and
+        they should roll back with the rest of the transaction.
+        """
+        timestamp = datetime.utcnow()
+        values = [
+            {
+                "event_type": event_type,
+                "document_id": event.get("document_id"),
+                "user_id": user_id,
+                "details": event.get("details"),
+                "timestamp": timestamp
+            }
+            for event in events
+        ]
+        if not values:
+            return
+        if commit and not durable and event_type not in DURABLE_EVENT_TYPES and log_sink.running:
+            for entry in values:
+                await log_sink.put(entry)
+            return
+
+        await db.execute(insert(LogEntry), values)
+        await record_rollups(db, values)
+        if commit:
+            await db.commit()
+
     @staticmethod
     async def get_recent_logs(
-        db: Session,
+        db: AsyncSession,
         limit: int = 100,
         event_type: Optional[str] = None,
         document_id: Optional[int] = None,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None
     ) -> list[LogEntry]:
-        """Get recent log entries with optional filters."""
-        query = db.query(LogEntry).order_by(LogEntry.timestamp.desc())
-        
-        if event_type:
-            query = query.filter(LogEntry.event_type == event_type)
-        if document_id:
-            query = query.filter(LogEntry.document_id == document_id)
-        if user_id:
-            query = query.filter(LogEntry.user_id == user_id)
-            
-        return query.limit(limit).all()
+        """Get recent log entries with optional filters, newest first.
+
+        Returns up to ``limit + 1`` entries after ``cursor``; the extra entry
+        only signals that another page exists (see ``pagination.build_page``).
+        On SQLite the months rotated out of log_entries are included: each
+        table contributes its own page and the pages are merged.
+        """
+        def page(query, columns):
+            if event_type:
+                query = query.where(columns.event_type == event_type)
+            if document_id:
+                query = query.where(columns.document_id == document_id)
+            if user_id:
+                query = query.where(columns.user_id == user_id)
+            return keyset_paginate(query, columns.timestamp, columns.id, cursor, limit)
+
+        partitions = []
+        if db.get_bind().dialect.name == "sqlite":
+            partitions = await rotated_partitions(db)
+        if cursor and partitions:
+            # Months that start after the cursor cannot hold anything older than it
+            before = decode_cursor(cursor)[0].date()
+            partitions = [(name, month) for name, month in partitions if month <= before]
+
+        if not partitions:
+            result = await db.execute(page(select(LogEntry), LogEntry))
+            return result.scalars().all()
+
+        sources = [LogEntry.__table__] + [
+            table(name, *[column(c.name, c.type) for c in LogEntry.__table__.columns])
+            for name, _ in reversed(partitions)
+        ]
+        # SQLite only allows ORDER BY and LIMIT on the members of a compound inside subqueries
+        merged = union_all(*[select(page(select(*source.c), source.c).subquery()) for source in sources]).subquery()
+        entries = aliased(LogEntry, merged)
+        result = await db.execute(
+            select(entries).order_by(entries.timestamp.desc(), entries.id.desc()).limit(limit + 1)
+        )
+        return result.scalars().all()
 
 logging_service = LoggingService()
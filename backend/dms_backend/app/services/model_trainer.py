@@ -3,7 +3,6 @@ from datetime import datetime, timedelta
 import asyncio
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
-from .ai_categorization import AICategorization
 
 async def periodic_model_training():
     """Periodically retrain the model with new feedback"""
@@ -12,7 +11,8 @@ async def periodic_model_training():
             # Create new database session
             db = SessionLocal()
             
-            # Initialize AI categorization service
+            # Initialize AI categorization service; imported here as it is slow to load
+            from .ai_categorization import AICategorization
             ai_service = AICategorization()
             
             # Retrain model with new feedback
@@ -0,0 +1,86 @@
+"""In-process pub/sub that pushes new notifications to open SSE connections"""
+import asyncio
+import os
+from collections import defaultdict
+from typing import Dict, Set
+
+from ..models import Notification
+
+
+def notification_to_dict(notification: Notification) -> dict:
+    """Serialize a notification the same way for GET /notifications and the push stream"""
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "event_type": notification.event_type,
+        "document_id": notification.document_id,
+        "created_at": notification.created_at,
+        "read": notification.read,
+        "read_at": notification.read_at
+    }
+
+
+class Subscription:
+    """A single push connection's bounded inbox"""
+
+    __slots__ = ("user_id", "queue", "lagged")
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Set when events were dropped because the client could not keep up;
+        # the stream then replays from the database instead of the queue
+        self.lagged = False
+
+
+class NotificationBroker:
+    """Fans published notifications out to every subscription of the target user
+
+    Publishing never blocks: a subscription whose inbox is full is flagged as
+    lagged and catches up from the database, so one slow client cannot hold
+    up the request that created the notification.
+    """
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    @property
+    def pending_count(self) -> int:
+        """Events published but not yet sent to their streams"""
+        return sum(
+            subscription.queue.qsize()
+            for subscriptions in self._subscriptions.values()
+            for subscription in subscriptions
+        )
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: dict) -> None:
+        for subscription in self._subscriptions.get(user_id, ()):
+            if subscription.lagged:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.lagged = True
+
+
+notification_broker = NotificationBroker(
+    queue_size=int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "32"))
+)
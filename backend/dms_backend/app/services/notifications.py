@@ -1,11 +1,14 @@
-from datetime import datetime
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from ..models import Notification, User
-from fastapi import BackgroundTasks
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, List
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import AsyncSessionLocal
+from ..models import Notification, NotificationCounter, User
+from .notification_events import notification_broker, notification_to_dict
+from .email_delivery import email_delivery
+import asyncio
 import os
 
 class NotificationService:
@@ -15,15 +18,54 @@ class NotificationService:
         self.smtp_user = os.getenv("SMTP_USER")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
 
+    @property
+    def email_enabled(self) -> bool:
+        return bool(self.smtp_user and self.smtp_password)
+
+    async def _increment_unread(self, db: AsyncSession, counts: Dict[int, int]) -> None:
+        """Add per-user amounts to the unread counters in the current transaction."""
+        counts = {user_id: count for user_id, count in counts.items() if user_id is not None and count}
+        if not counts:
+            return
+        dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(NotificationCounter).values([
+            {"user_id": user_id, "unread_count": count}
+            for user_id, count in counts.items()
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count}
+        ))
+
+    async def _decrement_unread(self, db: AsyncSession, user_id: int, amount: int) -> None:
+        """Subtract from a user's unread counter in the current transaction."""
+        if user_id is None or not amount:
+            return
+        await db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread_count=case(
+                (NotificationCounter.unread_count > amount, NotificationCounter.unread_count - amount),
+                else_=0
+            )),
+            execution_options={"synchronize_session": False}
+        )
+
     async def create_notification(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: int,
         message: str,
         event_type: str,
         document_id: Optional[int] = None
-    ) -> Notification:
-        """Create a new notification."""
+    ) -> Optional[Notification]:
+        """Create a new notification.
+
+        Nothing is stored without a recipient: routes that do not resolve the
+        current user yet pass ``user_id=None``, and the column is NOT NULL.
+        """
+        if user_id is None:
+            return None
         notification = Notification(
             user_id=user_id,
             message=message,
@@ -33,61 +75,162 @@ class NotificationService:
             read=False
         )
         db.add(notification)
-        db.commit()
-        db.refresh(notification)
+        await self._increment_unread(db, {user_id: 1})
+        await db.commit()
+        await db.refresh(notification)
+        notification_broker.publish(user_id, notification_to_dict(notification))
+        await self._email_recipients(db, [user_id], event_type, message)
         return notification
 
-    async def mark_as_read(self, db: Session, notification_id: int) -> Notification:
-        """Mark a notification as read."""
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if notification:
-            notification.read = True
-            notification.read_at = datetime.utcnow()
-            db.commit()
-            db.refresh(notification)
-        return notification
+    async def create_notifications(
+        self,
+        db: AsyncSession,
+        user_ids: Iterable[int],
+        message: str,
+        event_type: str,
+        document_id: Optional[int] = None
+    ) -> int:
+        """Fan a notification out to many users with a single insert."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "message": message,
+                "event_type": event_type,
+                "document_id": document_id,
+                "created_at": created_at,
+                "read": False
+            }
+            for user_id in user_ids
+        ]
+        ids = (await db.execute(
+            insert(Notification).returning(Notification.id, sort_by_parameter_order=True), rows
+        )).scalars().all()
+        await self._increment_unread(db, Counter(user_ids))
+        await db.commit()
+        for notification_id, row in zip(ids, rows):
+            notification_broker.publish(row["user_id"], dict(row, id=notification_id, read_at=None))
+        await self._email_recipients(db, user_ids, event_type, message)
+        return len(user_ids)
+
+    async def _email_recipients(self, db: AsyncSession, user_ids: Iterable[int], event_type: str, message: str) -> None:
+        """Email a new notification to its recipients, as a digest for users who chose one."""
+        if not self.email_enabled:
+            return
+        recipients = await db.execute(
+            select(User.email, User.email_digest).where(User.id.in_(set(user_ids)))
+        )
+        subject = event_type.replace("_", " ").capitalize()
+        for email, digest in recipients:
+            if email:
+                await self.send_email_notification(email, subject, message, digest=bool(digest))
+
+    async def mark_as_read(self, db: AsyncSession, notification_id: int) -> Optional[Notification]:
+        """Mark a notification as read.
+
+        The update only matches while the notification is unread, so of
+        concurrent calls exactly one decrements the unread counter.
+        """
+        user_id = (await db.execute(
+            update(Notification)
+            .where(Notification.id == notification_id, Notification.read == False)
+            .values(read=True, read_at=datetime.utcnow())
+            .returning(Notification.user_id),
+            execution_options={"synchronize_session": False}
+        )).scalar()
+        if user_id is not None:
+            await self._decrement_unread(db, user_id, 1)
+        await db.commit()
+        return await db.get(Notification, notification_id, populate_existing=True)
+
+    async def mark_read(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        notification_ids: Optional[List[int]] = None
+    ) -> int:
+        """Mark a user's unread notifications as read in one statement.
+
+        Only the given ids are marked when ``notification_ids`` is passed,
+        otherwise every unread notification of the user. Returns the number marked.
+        """
+        stmt = update(Notification).where(
+            Notification.user_id == user_id,
+            Notification.read == False
+        )
+        if notification_ids is not None:
+            stmt = stmt.where(Notification.id.in_(notification_ids))
+        marked = (await db.execute(
+            stmt.values(read=True, read_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )).rowcount
+        await self._decrement_unread(db, user_id, marked)
+        await db.commit()
+        return marked
+
+    async def get_unread_count(self, db: AsyncSession, user_id: int) -> int:
+        """Get the number of unread notifications from the user's counter."""
+        counter = await db.get(NotificationCounter, user_id)
+        return counter.unread_count if counter else 0
+
+    async def purge_read_notifications(self, db: AsyncSession, older_than: timedelta) -> int:
+        """Delete notifications that were read more than ``older_than`` ago."""
+        purged = (await db.execute(
+            delete(Notification).where(
+                Notification.read == True,
+                Notification.read_at < datetime.utcnow() - older_than
+            ),
+            execution_options={"synchronize_session": False}
+        )).rowcount
+        await db.commit()
+        return purged
 
     async def get_user_notifications(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: int,
         unread_only: bool = False,
         limit: int = 50
     ) -> List[Notification]:
         """Get notifications for a user."""
-        query = db.query(Notification).filter(Notification.user_id == user_id)
+        query = select(Notification).where(Notification.user_id == user_id)
         if unread_only:
-            query = query.filter(Notification.read == False)
-        return query.order_by(Notification.created_at.desc()).limit(limit).all()
+            query = query.where(Notification.read == False)
+        result = await db.execute(query.order_by(Notification.created_at.desc()).limit(limit))
+        return result.scalars().all()
 
     async def send_email_notification(
         self,
-        background_tasks: BackgroundTasks,
         recipient_email: str,
         subject: str,
-        message: str
+        message: str,
+        digest: bool = False
     ):
-        """Send an email notification in the background."""
-        background_tasks.add_task(self._send_email, recipient_email, subject, message)
+        """Queue an email notification for the background delivery worker.
 
-    def _send_email(self, recipient_email: str, subject: str, message: str):
-        """Helper method to send emails."""
-        if not all([self.smtp_user, self.smtp_password]):
+        With ``digest=True`` bursts of emails to the same recipient are
+        collapsed into one digest email.
+        """
+        if not self.email_enabled:
             return
+        email_delivery.send(recipient_email, subject, message, digest=digest)
 
-        msg = MIMEMultipart()
-        msg['From'] = self.smtp_user
-        msg['To'] = recipient_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(message, 'plain'))
+notification_service = NotificationService()
 
+async def periodic_notification_purge():
+    """Periodically delete old read notifications"""
+    retention = timedelta(days=int(os.getenv("NOTIFICATION_READ_RETENTION_DAYS", "30")))
+    while True:
         try:
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-        except Exception as e: 
-            print(f"Failed to send email: {str(e)}")
+            async with AsyncSessionLocal() as db:
+                purged = await notification_service.purge_read_notifications(db, retention)
+            if purged:
+                print(f"Purged {purged} read notifications")
+        except Exception as e:
+            print(f"Error purging notifications: {str(e)}")
 
-notification_service = NotificationService()
+        # Run once a day
+        await asyncio.sleep(24 * 60 * 60)
@@ -0,0 +1,6 @@
+"""Benchmarks for the DMS backend
+
+Run from backend/dms_backend, e.g. ``python -m benchmarks.load --help``.
+They use local fakes for Google APIs and a scratch database, never the
+configured one.
+"""
@@ -0,0 +1,235 @@
+"""Benchmark of the document classifier in AICategorization
+
+Builds synthetic labeled corpora for every combination of corpus size and
+vocabulary size, then measures for each:
+
+- ``train_model``: fit time (with and without the cross-validated
+  evaluation) and peak memory while fitting
+- the saved model: artifact size and the time to load it
+- ``classify_document``: single-document latency, plus batched prediction
+  through the same pipeline
+- accuracy on a held-out set
+- ``retrain_from_feedback``: time to retrain from feedback rows in a
+  scratch database, and the held-out accuracy afterwards
+
+The ``model`` field of the results names the pipeline steps, so results
+from different model implementations can be told apart and compared.
+
+    python -m benchmarks.classifier --sizes 100,1000,10000 --vocabularies 2000,20000 --output classifier.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated training corpus sizes")
+    parser.add_argument("--vocabularies", default="2000,20000", help="comma-separated vocabulary sizes")
+    parser.add_argument("--categories", type=int, default=8, help="number of categories")
+    parser.add_argument("--words-per-document", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.95, help="share of words drawn from the shared vocabulary")
+    parser.add_argument("--test-documents", type=int, default=500, help="held-out documents for accuracy")
+    parser.add_argument("--predict-samples", type=int, default=200, help="single-document predictions to time")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--feedback", type=int, default=200, help="feedback rows to retrain from")
+    parser.add_argument("--skip-evaluate", action="store_true", help="skip timing train_model with cross-validation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+def configure_environment(workdir: str) -> None:
+    """Point the app at a scratch database before it is imported; train_model writes its metrics there"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'classifier.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+class Corpus:
+    """Synthetic documents where each category favours its own slice of the vocabulary
+
+    ``noise`` of every document's words come from the whole vocabulary,
+    the rest from the category's slice; word frequencies are Zipf-like in
+    both, as in real text.
+    """
+
+    def __init__(self, vocabulary: int, categories: int, words_per_document: int, noise: float, seed: int):
+        self.rng = random.Random(seed)
+        self.words = [f"w{i:x}" for i in range(vocabulary)]
+        self.rng.shuffle(self.words)
+        self.labels = [f"category_{i}" for i in range(categories)]
+        self.words_per_document = words_per_document
+        self.noise = noise
+        slice_size = max(1, vocabulary // categories)
+        self.slices = {
+            label: self.words[i * slice_size:(i + 1) * slice_size] for i, label in enumerate(self.labels)
+        }
+        self.weights = {size: [1 / (rank + 1) for rank in range(size)] for size in {vocabulary, slice_size}}
+
+    def _draw(self, words: List[str], count: int) -> List[str]:
+        return self.rng.choices(words, self.weights[len(words)], k=count)
+
+    def document(self, label: str) -> str:
+        noisy = sum(self.rng.random() < self.noise for _ in range(self.words_per_document))
+        words = self._draw(self.words, noisy) + self._draw(self.slices[label], self.words_per_document - noisy)
+        self.rng.shuffle(words)
+        return " ".join(words)
+
+    def sample(self, count: int) -> Tuple[List[str], List[str]]:
+        labels = [self.labels[i % len(self.labels)] for i in range(count)]
+        self.rng.shuffle(labels)
+        return [self.document(label) for label in labels], labels
+
+def model_name(classifier) -> str:
+    return "+".join(type(step).__name__ for _, step in classifier.steps)
+
+def new_service(model_path: str, workdir: str):
+    from app.services.ai_categorization import AICategorization
+    from benchmarks.fakes import FakeLanguageClient, FakeVisionClient
+
+    service = AICategorization(model_path=model_path, vision_client=FakeVisionClient(), language_client=FakeLanguageClient())
+    service.model_dir = workdir
+    service.metrics_path = os.path.join(workdir, "metrics.json")
+    return service
+
+def peak_memory_mb(fn) -> float:
+    """Peak memory allocated by Python while ``fn`` runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+    finally:
+        tracemalloc.stop()
+
+def accuracy(classifier, texts: List[str], labels: List[str]) -> float:
+    predictions = classifier.predict(texts)
+    return round(sum(p == label for p, label in zip(predictions, labels)) / len(labels), 4)
+
+def seed_feedback(db, corpus: Corpus, count: int) -> None:
+    """Documents with extracted text and a correcting feedback row each"""
+    from app.models import Document, Feedback, User
+
+    user = User(email="bench@example.com", role="admin", credentials="{}")
+    db.add(user)
+    db.flush()
+    texts, labels = corpus.sample(count)
+    for i, (text, label) in enumerate(zip(texts, labels)):
+        document = Document(filename=f"feedback_{i}.pdf", extracted_text=text, ai_prediction=corpus.rng.choice(corpus.labels))
+        db.add(document)
+        db.flush()
+        db.add(Feedback(
+            document_id=document.id,
+            user_id=user.id,
+            correct_category=label,
+            original_category=document.ai_prediction
+        ))
+    db.commit()
+
+def run_case(args: argparse.Namespace, size: int, vocabulary: int, workdir: str) -> dict:
+    from benchmarks.stats import summarize_latencies
+
+    corpus = Corpus(vocabulary, args.categories, args.words_per_document, args.noise, args.seed)
+    texts, labels = corpus.sample(size)
+    test_texts, test_labels = corpus.sample(args.test_documents)
+    model_path = os.path.join(workdir, f"classifier_{size}_{vocabulary}.joblib")
+    service = new_service(model_path, workdir)
+    result: Dict[str, object] = {"documents": size, "vocabulary": vocabulary, "model": model_name(service.classifier)}
+
+    started = time.perf_counter()
+    service.train_model(texts, labels, evaluate=False)
+    result["train_seconds"] = round(time.perf_counter() - started, 4)
+    if not args.skip_evaluate:
+        started = time.perf_counter()
+        service.train_model(texts, labels, evaluate=True)
+        result["train_evaluated_seconds"] = round(time.perf_counter() - started, 4)
+    result["train_peak_memory_mb"] = peak_memory_mb(lambda: service.classifier.fit(texts, labels))
+    result["artifact_bytes"] = os.path.getsize(model_path)
+
+    started = time.perf_counter()
+    service = new_service(model_path, workdir)
+    result["load_seconds"] = round(time.perf_counter() - started, 4)
+    result["accuracy"] = accuracy(service.classifier, test_texts, test_labels)
+
+    latencies = []
+    started = time.perf_counter()
+    for text in test_texts[:args.predict_samples]:
+        predict_started = time.perf_counter()
+        service.classify_document(text)
+        latencies.append(time.perf_counter() - predict_started)
+    result["predict_single"] = summarize_latencies(latencies, time.perf_counter() - started)
+
+    # classify_document takes one text; batches go through the pipeline it wraps
+    latencies = []
+    started = time.perf_counter()
+    for start in range(0, len(test_texts), args.batch_size):
+        batch = test_texts[start:start + args.batch_size]
+        predict_started = time.perf_counter()
+        service.classifier.predict(batch)
+        service.classifier.predict_proba(batch)
+        latencies.append(time.perf_counter() - predict_started)
+    elapsed = time.perf_counter() - started
+    result["predict_batch"] = dict(
+        summarize_latencies(latencies, elapsed),
+        batch_size=args.batch_size,
+        per_document_ms=round(elapsed / len(test_texts) * 1000, 4)
+    )
+    result["predict_peak_memory_mb"] = peak_memory_mb(
+        lambda: service.classifier.predict_proba(test_texts[:args.batch_size])
+    )
+
+    if args.feedback:
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            seed_feedback(db, corpus, args.feedback)
+            started = time.perf_counter()
+            service.retrain_from_feedback(db)
+            result["retrain_from_feedback"] = {
+                "feedback": args.feedback,
+                "seconds": round(time.perf_counter() - started, 4),
+                "accuracy_after": accuracy(service.classifier, test_texts, test_labels),
+            }
+        finally:
+            db.close()
+    return result
+
+def print_row(result: dict) -> None:
+    if not getattr(print_row, "header_printed", False):
+        print(f"{'docs':>8}{'vocab':>8}{'train s':>10}{'model KB':>10}{'load ms':>10}{'p50 ms':>9}{'batch/doc ms':>14}{'acc':>7}")
+        print_row.header_printed = True
+    print(
+        f"{result['documents']:>8}{result['vocabulary']:>8}{result['train_seconds']:>10.3f}"
+        f"{result['artifact_bytes'] / 1024:>10.1f}{result['load_seconds'] * 1000:>10.1f}"
+        f"{result['predict_single']['p50_ms']:>9.2f}{result['predict_batch']['per_document_ms']:>14.4f}"
+        f"{result['accuracy']:>7.3f}"
+    )
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    vocabularies = [int(v) for v in args.vocabularies.split(",") if v.strip()]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="dms-classifier-") as workdir:
+        configure_environment(workdir)
+        from app.database import Base, engine
+        import app.models  # noqa: F401  (registers the tables on Base.metadata)
+        for vocabulary in vocabularies:
+            for size in sizes:
+                # Fresh tables per case, so retraining only sees this case's feedback
+                Base.metadata.drop_all(bind=engine)
+                Base.metadata.create_all(bind=engine)
+                results.append(run_case(args, size, vocabulary, workdir))
+                print_row(results[-1])
+                sys.stdout.flush()
+
+    report = {"config": {k: v for k, v in vars(args).items() if k != "output"}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main()
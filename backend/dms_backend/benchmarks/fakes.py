@@ -0,0 +1,214 @@
+"""Local stand-ins for the Google Drive, Vision and Natural Language clients
+
+The fakes replace the API client objects, not the services, so benchmarks
+still run GoogleDriveService, AICategorization and the API scheduler. Each
+call sleeps for a configurable latency and fails at a configurable rate
+with the same errors the real clients raise.
+"""
+import hashlib
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import httplib2
+from google.api_core import exceptions as google_exceptions
+from google.cloud import language_v1
+from googleapiclient.errors import HttpError
+
+# Words the fake OCR draws document text from, per category
+CATEGORY_WORDS = {
+    "invoice": ["invoice", "amount", "due", "payment", "total", "vat", "billing", "account"],
+    "contract": ["agreement", "party", "term", "clause", "signature", "liability", "effective", "notice"],
+    "receipt": ["receipt", "paid", "cash", "store", "change", "item", "thank", "purchase"],
+    "letter": ["dear", "sincerely", "regards", "letter", "reply", "address", "request", "kind"],
+}
+
+@dataclass
+class Latency:
+    """Latency and failure profile of one fake API"""
+    mean_ms: float = 50.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+
+    def wait(self) -> None:
+        delay = random.gauss(self.mean_ms, self.jitter_ms) / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+def _http_error(status: int, reason: str) -> HttpError:
+    content = f'{{"error": {{"code": {status}, "message": "{reason}", "errors": [{{"reason": "{reason}"}}]}}}}'
+    return HttpError(httplib2.Response({"status": status}), content.encode())
+
+def fake_content(file_id: str, size: int) -> bytes:
+    """Deterministic file content, so files registered with the same seed are duplicates"""
+    block = hashlib.sha256(file_id.encode()).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+class _FakeRequest:
+    def __init__(self, api: "FakeDriveApi", fn: Callable[[], object]):
+        self.api = api
+        self.fn = fn
+
+    def execute(self, *args, **kwargs):
+        self.api.latency.wait()
+        return self.api.run(self.fn)
+
+class _FakeBatch:
+    def __init__(self, api: "FakeDriveApi", callback):
+        self.api = api
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request: _FakeRequest, request_id: str) -> None:
+        self.requests.append((request_id, request))
+
+    def execute(self, *args, **kwargs):
+        # One round trip for the whole batch; calls fail individually
+        self.api.latency.wait()
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, self.api.run(request.fn), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+class _FakeFiles:
+    def __init__(self, api: "FakeDriveApi"):
+        self.api = api
+
+    def create(self, body: dict, media_body=None, fields: Optional[str] = None):
+        def create():
+            size = media_body.size() if media_body is not None else 0
+            return self.api.add_file(body["name"], size=size, parents=body.get("parents", []))
+        return _FakeRequest(self.api, create)
+
+    def get(self, fileId: str, fields: Optional[str] = None):
+        return _FakeRequest(self.api, lambda: dict(self.api.file(fileId)))
+
+    def get_media(self, fileId: str):
+        def download():
+            file = self.api.file(fileId)
+            return fake_content(file["content_seed"], int(file["size"]))
+        return _FakeRequest(self.api, download)
+
+    def list(self, pageSize: int = 100, q: Optional[str] = None, fields: Optional[str] = None):
+        def list_files():
+            with self.api.lock:
+                files = list(self.api.files_by_id.values())
+            if q and "in parents" in q:
+                parent = q.split("'")[1]
+                files = [file for file in files if parent in file["parents"]]
+            return {"files": [dict(file) for file in files[:pageSize]]}
+        return _FakeRequest(self.api, list_files)
+
+    def update(self, fileId: str, addParents: str = "", removeParents: str = "", fields: Optional[str] = None):
+        def update():
+            with self.api.lock:
+                file = self.api.file(fileId)
+                removed = set(removeParents.split(","))
+                file["parents"] = [p for p in file["parents"] if p not in removed] + [addParents]
+                return dict(file)
+        return _FakeRequest(self.api, update)
+
+    def delete(self, fileId: str):
+        def delete():
+            with self.api.lock:
+                if self.api.files_by_id.pop(fileId, None) is None:
+                    raise _http_error(404, "notFound")
+        return _FakeRequest(self.api, delete)
+
+class FakeDriveApi:
+    """In-memory replacement for the built Drive v3 client
+
+    Pass it as ``service`` to GoogleDriveService. Failing calls raise the
+    429/503 errors Drive uses for rate limits and outages.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self.files_by_id: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def run(self, fn: Callable[[], object]):
+        with self.lock:
+            self.calls += 1
+        if self.latency.should_fail():
+            raise random.choice([_http_error(429, "rateLimitExceeded"), _http_error(503, "backendError")])
+        return fn()
+
+    def add_file(
+        self,
+        name: str,
+        size: int = 0,
+        parents: Optional[List[str]] = None,
+        mime_type: str = "application/octet-stream",
+        content_seed: Optional[str] = None
+    ) -> dict:
+        file_id = uuid.uuid4().hex
+        file = {
+            "id": file_id,
+            "name": name,
+            "size": str(size),
+            "mimeType": mime_type,
+            "parents": list(parents or []),
+            "createdTime": "2024-01-01T00:00:00.000Z",
+            "modifiedTime": "2024-01-01T00:00:00.000Z",
+            "content_seed": content_seed or file_id,
+        }
+        with self.lock:
+            self.files_by_id[file_id] = file
+        return dict(file)
+
+    def file(self, file_id: str) -> dict:
+        file = self.files_by_id.get(file_id)
+        if file is None:
+            raise _http_error(404, "notFound")
+        return file
+
+    def files(self) -> _FakeFiles:
+        return _FakeFiles(self)
+
+    def new_batch_http_request(self, callback=None) -> _FakeBatch:
+        return _FakeBatch(self, callback)
+
+def _maybe_fail(latency: Latency) -> None:
+    latency.wait()
+    if latency.should_fail():
+        raise random.choice([google_exceptions.TooManyRequests("quota"), google_exceptions.ServiceUnavailable("down")])
+
+def fake_document_text(rng: random.Random, words: int = 200) -> str:
+    category = rng.choice(sorted(CATEGORY_WORDS))
+    return " ".join(rng.choice(CATEGORY_WORDS[category]) for _ in range(words))
+
+class FakeVisionClient:
+    """Stand-in for vision.ImageAnnotatorClient returning synthetic text"""
+
+    def __init__(self, latency: Optional[Latency] = None, seed: int = 0):
+        self.latency = latency or Latency(mean_ms=300.0, jitter_ms=100.0)
+        self.rng = random.Random(seed)
+
+    def document_text_detection(self, image=None, **kwargs):
+        _maybe_fail(self.latency)
+        return SimpleNamespace(
+            error=SimpleNamespace(message=""),
+            full_text_annotation=SimpleNamespace(text=fake_document_text(self.rng))
+        )
+
+class FakeLanguageClient:
+    """Stand-in for language_v1.LanguageServiceClient that finds one date per text"""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency(mean_ms=150.0, jitter_ms=50.0)
+
+    def analyze_entities(self, request=None, **kwargs):
+        _maybe_fail(self.latency)
+        return SimpleNamespace(entities=[
+            SimpleNamespace(name="2024-03-15", type_=language_v1.Entity.Type.DATE, salience=0.4)
+        ])
@@ -0,0 +1,302 @@
+"""Scaling benchmark for FolderOptimizationService.analyze_folder_structure
+
+Generates synthetic folder trees into a scratch SQLite database and runs
+the analysis on each, timing every suggestion pass separately (exclusive
+of the passes it calls) and counting the queries each pass issues. Every
+size runs in its own process with a time limit, so a size that does not
+finish still yields a data point for the scaling curve.
+
+    python -m benchmarks.folder_analysis --output folder_analysis.json
+    python -m benchmarks.folder_analysis --sizes 1000,10000,100000 --timeout 600
+    python -m benchmarks.folder_analysis --sizes 2000 --fanout 4 --max-depth 8 --duplicate-rate 0.2
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Service methods timed as separate passes; time outside them counts as "walk"
+# (the recursion itself plus lazy loads of folder.documents/subfolders)
+PASSES = {
+    "_analyze_category_mismatches": "category_mismatches",
+    "_get_category_folder_mapping": "category_mapping",
+    "_check_naming_consistency": "naming",
+    "_find_duplicate_files": "duplicates",
+    "_get_folder_path": "folder_paths",
+}
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,100,200", help="comma-separated folder counts; larger trees are opt-in")
+    parser.add_argument("--fanout", type=int, default=10, help="subfolders per folder")
+    parser.add_argument("--max-depth", type=int, default=6, help="levels below a root; more roots are added once full")
+    parser.add_argument("--documents-per-folder", type=float, default=3.0, help="mean documents per folder")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="share of documents that duplicate a sibling")
+    parser.add_argument(
+        "--categories", default="invoice:0.4,contract:0.3,receipt:0.2,letter:0.1",
+        help="category mix as name:weight pairs"
+    )
+    parser.add_argument("--home-share", type=float, default=0.4, help="share of each category filed in one folder")
+    parser.add_argument("--mispredict-rate", type=float, default=0.1, help="share of AI predictions that disagree with the category")
+    parser.add_argument("--drive-latency-ms", type=float, default=0.0, help="latency of the fake content downloads")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds allowed per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def parse_categories(spec: str) -> Dict[str, float]:
+    categories = {}
+    for pair in spec.split(","):
+        name, _, weight = pair.partition(":")
+        categories[name.strip()] = float(weight or 1)
+    return categories
+
+def _name(rng: random.Random, base: str) -> str:
+    # Mix naming styles so the naming pass has something to find
+    style = rng.random()
+    if style < 0.1:
+        return f"{base}_file".lower()
+    if style < 0.2:
+        return f"{base}File"
+    return base.capitalize()
+
+def generate_tree(db_url: str, args: argparse.Namespace, folder_count: int) -> Dict[str, int]:
+    """Fill a scratch database with a synthetic folder tree"""
+    from sqlalchemy import create_engine, insert
+
+    from app.database import Base
+    from app.models import Category, Document, Folder, document_categories
+
+    rng = random.Random(args.seed)
+    categories = parse_categories(args.categories)
+    names, weights = list(categories), list(categories.values())
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+
+    # Breadth-first, so every root is filled up to max_depth before the next one starts
+    folders: List[dict] = []
+    frontier = []
+    while len(folders) < folder_count:
+        if not frontier:
+            folder_id = len(folders) + 1
+            folders.append({"id": folder_id, "name": f"Root{folder_id}", "google_drive_id": f"folder-{folder_id}", "parent_id": None})
+            frontier = [(folder_id, 0)]
+            continue
+        parent_id, depth = frontier.pop(0)
+        if depth >= args.max_depth:
+            continue
+        for _ in range(args.fanout):
+            if len(folders) >= folder_count:
+                break
+            folder_id = len(folders) + 1
+            folders.append({
+                "id": folder_id,
+                "name": _name(rng, f"folder{folder_id}"),
+                "google_drive_id": f"folder-{folder_id}",
+                "parent_id": parent_id,
+            })
+            frontier.append((folder_id, depth + 1))
+
+    # Each category has a "home" folder holding a share of its documents, which is
+    # what the category mismatch pass looks for; the rest are spread at random
+    homes = {name: rng.choice(folders)["id"] for name in names}
+    siblings: Dict[int, list] = defaultdict(list)
+    documents: List[dict] = []
+    links: List[dict] = []
+    for document_id in range(1, int(len(folders) * args.documents_per_folder) + 1):
+        category = rng.choices(names, weights)[0]
+        folder_id = homes[category] if rng.random() < args.home_share else rng.choice(folders)["id"]
+        if siblings[folder_id] and rng.random() < args.duplicate_rate:
+            size, content_seed = rng.choice(siblings[folder_id])
+        else:
+            size, content_seed = rng.choice([1024, 2048, 4096, 8192]), str(document_id)
+        siblings[folder_id].append((size, content_seed))
+        prediction = category if rng.random() >= args.mispredict_rate else rng.choice(names)
+        documents.append({
+            "id": document_id,
+            "filename": _name(rng, f"document{document_id}") + ".pdf",
+            # The fake Drive derives content from the id, so duplicates share a seed
+            "google_drive_id": f"doc-{document_id}-{content_seed}-{size}",
+            "mime_type": "application/pdf",
+            "size_bytes": size,
+            "folder_id": folder_id,
+            "ai_prediction": prediction,
+        })
+        links.append({"document_id": document_id, "category_id": names.index(category) + 1})
+
+    with engine.begin() as conn:
+        conn.execute(insert(Category), [{"id": i + 1, "name": name} for i, name in enumerate(names)])
+        for start in range(0, len(folders), 10000):
+            conn.execute(insert(Folder), folders[start:start + 10000])
+        for start in range(0, len(documents), 10000):
+            conn.execute(insert(Document), documents[start:start + 10000])
+            conn.execute(insert(document_categories), links[start:start + 10000])
+    engine.dispose()
+    return {"folders": len(folders), "documents": len(documents)}
+
+class PassProfiler:
+    """Attributes wall time and queries to the innermost running pass"""
+
+    def __init__(self, engine):
+        self.stats = defaultdict(lambda: {"seconds": 0.0, "queries": 0, "calls": 0})
+        self.stack = ["walk"]
+        self.mark = time.perf_counter()
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", self._count_query)
+
+    def _count_query(self, *args):
+        self.stats[self.stack[-1]]["queries"] += 1
+
+    def _switch(self, push: Optional[str] = None) -> None:
+        now = time.perf_counter()
+        self.stats[self.stack[-1]]["seconds"] += now - self.mark
+        self.mark = now
+        if push:
+            self.stack.append(push)
+            self.stats[push]["calls"] += 1
+        else:
+            self.stack.pop()
+
+    def wrap(self, service, method_name: str, pass_name: str) -> None:
+        method = getattr(service, method_name)
+
+        def timed(*args, **kwargs):
+            self._switch(push=pass_name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._switch()
+        setattr(service, method_name, timed)
+
+    def finish(self) -> Dict[str, dict]:
+        self.stats["walk"]["seconds"] += time.perf_counter() - self.mark
+        self.mark = time.perf_counter()
+        return {name: dict(stats, seconds=round(stats["seconds"], 4)) for name, stats in self.stats.items()}
+
+def synthetic_drive_api(latency_ms: float):
+    """A FakeDriveApi that derives files from the generated drive ids instead of storing them"""
+    from benchmarks.fakes import FakeDriveApi, Latency
+
+    def file(file_id: str) -> dict:
+        _, _, content_seed, size = file_id.split("-")
+        return {"id": file_id, "size": size, "content_seed": content_seed}
+
+    api = FakeDriveApi(Latency(latency_ms, latency_ms / 5))
+    api.file = file
+    return api
+
+def run_size(args: argparse.Namespace, folder_count: int) -> dict:
+    """Generate one tree and analyze it; runs inside the per-size subprocess"""
+    with tempfile.TemporaryDirectory(prefix="dms-folders-") as workdir:
+        db_url = f"sqlite:///{os.path.join(workdir, 'folders.db')}"
+        # Set before the app is imported: keep it off the real database and the
+        # fake downloads out of the Drive quota
+        os.environ["DATABASE_URL"] = db_url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.environ.setdefault("DRIVE_API_RATE_PER_SECOND", "100000")
+        os.environ.setdefault("DRIVE_API_BURST", "100000")
+
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+
+        from app.services.folder_optimization import FolderOptimizationService
+        from app.services.folder_structure import FolderStructureService
+        from app.services.google_drive import GoogleDriveService
+
+        started = time.perf_counter()
+        counts = generate_tree(db_url, args, folder_count)
+        generate_seconds = time.perf_counter() - started
+
+        engine = create_engine(db_url)
+        drive_service = GoogleDriveService(service=synthetic_drive_api(args.drive_latency_ms))
+        db = Session(engine)
+        try:
+            service = FolderOptimizationService(db, FolderStructureService(db, drive_service), drive_service, None)
+            profiler = PassProfiler(engine)
+            for method_name, pass_name in PASSES.items():
+                profiler.wrap(service, method_name, pass_name)
+            started = time.perf_counter()
+            suggestions = service.analyze_folder_structure()
+            total_seconds = time.perf_counter() - started
+            passes = profiler.finish()
+        finally:
+            db.close()
+            engine.dispose()
+
+    return {
+        **counts,
+        "generate_seconds": round(generate_seconds, 2),
+        "analyze_seconds": round(total_seconds, 4),
+        "queries": sum(stats["queries"] for stats in passes.values()),
+        "passes": passes,
+        "suggestions": {kind: len(items) for kind, items in suggestions.items()},
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def run_in_subprocess(argv: List[str], folder_count: int, timeout: float) -> dict:
+    command = [sys.executable, "-m", "benchmarks.folder_analysis", *argv, "--single-size", str(folder_count)]
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"folders": folder_count, "timed_out": True, "timeout_seconds": timeout}
+    if completed.returncode != 0:
+        return {"folders": folder_count, "error": completed.stderr.strip().splitlines()[-1:]}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["wall_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+def main(argv=None) -> dict:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args = parse_args(argv)
+    if args.single_size:
+        print(json.dumps(run_size(args, args.single_size)))
+        return {}
+
+    # Child processes get the same options minus the ones handled here
+    child_argv = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg in ("--sizes", "--output", "--timeout"):
+            skip = True
+            continue
+        if arg.split("=")[0] in ("--sizes", "--output", "--timeout"):
+            continue
+        child_argv.append(arg)
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        result = run_in_subprocess(child_argv, size, args.timeout)
+        results.append(result)
+        if result.get("timed_out"):
+            print(f"{size:>8} folders: timed out after {args.timeout:.0f}s")
+        elif "error" in result:
+            print(f"{size:>8} folders: failed: {result['error']}")
+        else:
+            slowest = sorted(result["passes"].items(), key=lambda item: -item[1]["seconds"])[:3]
+            print(
+                f"{size:>8} folders, {result['documents']:>8} documents: {result['analyze_seconds']:>9.2f}s, "
+                f"{result['queries']:>9} queries; slowest passes: "
+                + ", ".join(f"{name} {stats['seconds']:.2f}s" for name, stats in slowest)
+            )
+
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("output", "single_size")}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""End-to-end load test of the API against local Google API fakes
+
+Drives concurrent upload/get/move/list/analyze workloads through the ASGI
+app in-process and reports throughput and latency percentiles per
+workload. Everything runs against a scratch SQLite database and the fakes
+in ``benchmarks.fakes``, so no Google credentials are needed.
+
+    python -m benchmarks.load --requests 500 --concurrency 32 --drive-latency-ms 80
+    python -m benchmarks.load --workloads upload,get --ai --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+WORKLOADS = ("upload", "get", "move", "list", "analyze")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset of %(default)s")
+    parser.add_argument("--requests", type=int, default=200, help="requests per workload")
+    parser.add_argument("--analyze-requests", type=int, default=10, help="requests for the (much slower) analyze workload")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per workload")
+    parser.add_argument("--folders", type=int, default=50, help="folders to seed")
+    parser.add_argument("--documents", type=int, default=1000, help="documents to seed")
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024, help="size of each uploaded file")
+    parser.add_argument("--drive-latency-ms", type=float, default=50.0)
+    parser.add_argument("--vision-latency-ms", type=float, default=300.0)
+    parser.add_argument("--language-latency-ms", type=float, default=150.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake API calls that fail")
+    parser.add_argument("--ai", action="store_true", help="run uploads through AI categorization with fake clients")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    return args
+
+def configure_environment(workdir: str) -> None:
+    """Point the app at a scratch database before it is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+    os.environ.setdefault("UPLOAD_SLOW_SECONDS", "3600")
+    # Measure the app rather than our Google quota; set these to test the rate limits too
+    for api in ("DRIVE", "VISION", "LANGUAGE"):
+        os.environ.setdefault(f"{api}_API_RATE_PER_SECOND", "100000")
+        os.environ.setdefault(f"{api}_API_BURST", "100000")
+
+def seed(drive_api, folder_count: int, document_count: int, rng: random.Random) -> Dict[str, List[int]]:
+    """Create a user, a two-level folder tree and documents, in the database and the fake Drive"""
+    from app.database import SessionLocal
+    from app.models import Document, Folder, User
+
+    db = SessionLocal()
+    try:
+        db.add(User(email="bench@example.com", role="admin", credentials="{}"))
+        roots = max(1, folder_count // 10)
+        folders = []
+        for i in range(folder_count):
+            parent = folders[i % roots] if i >= roots else None
+            drive_folder = drive_api.add_file(
+                f"folder_{i}",
+                parents=[parent.drive_id] if parent else [],
+                mime_type="application/vnd.google-apps.folder"
+            )
+            folder = Folder(name=f"folder_{i}", drive_id=drive_folder["id"], parent=parent)
+            db.add(folder)
+            folders.append(folder)
+        db.flush()
+
+        documents = []
+        for i in range(document_count):
+            folder = rng.choice(folders)
+            size = rng.choice([1024, 2048, 4096, 8192])
+            # A few identical files so the analysis has duplicates to hash
+            content_seed = f"dup-{i % 20}" if rng.random() < 0.05 else None
+            drive_file = drive_api.add_file(f"document_{i}.pdf", size=size, parents=[folder.drive_id], content_seed=content_seed)
+            documents.append(Document(
+                filename=f"document_{i}.pdf",
+                drive_id=drive_file["id"],
+                mime_type="application/pdf",
+                size_bytes=size,
+                folder_id=folder.id
+            ))
+        db.add_all(documents)
+        db.commit()
+        return {"folders": [f.id for f in folders], "documents": [d.id for d in documents]}
+    finally:
+        db.close()
+
+def install_ai(vision_latency, language_latency, workdir: str, seed_value: int) -> None:
+    """Enable AI categorization with fake clients and a trained model"""
+    from app.services.ai_categorization import AICategorization
+    from app.services.ai_service import set_ai_service
+    from benchmarks.fakes import CATEGORY_WORDS, FakeLanguageClient, FakeVisionClient
+
+    ai_service = AICategorization(
+        model_path=os.path.join(workdir, "classifier.joblib"),
+        vision_client=FakeVisionClient(vision_latency, seed=seed_value),
+        language_client=FakeLanguageClient(language_latency)
+    )
+    ai_service.model_dir = workdir
+    rng = random.Random(seed_value)
+    texts, labels = [], []
+    for category, words in CATEGORY_WORDS.items():
+        for _ in range(20):
+            texts.append(" ".join(rng.choice(words) for _ in range(50)))
+            labels.append(category)
+    ai_service.train_model(texts, labels, evaluate=False)
+    set_ai_service(ai_service)
+
+def make_requests(ids: Dict[str, List[int]], upload_bytes: int, rng: random.Random) -> Dict[str, Callable]:
+    """One function per workload that issues a single request with the given client"""
+    payload = bytes(rng.getrandbits(8) for _ in range(upload_bytes))
+    counter = iter(range(sys.maxsize))
+
+    async def upload(client):
+        return await client.post(
+            "/api/v1/documents/upload",
+            params={"folder_id": rng.choice(ids["folders"])},
+            files={"file": (f"upload_{next(counter)}.pdf", payload, "application/pdf")}
+        )
+
+    async def get(client):
+        return await client.get(f"/api/v1/documents/{rng.choice(ids['documents'])}")
+
+    async def move(client):
+        return await client.post(
+            f"/api/v1/documents/{rng.choice(ids['documents'])}/move",
+            params={"folder_id": rng.choice(ids["folders"])}
+        )
+
+    async def list_documents(client):
+        return await client.get("/api/v1/documents/", params={"folder_id": rng.choice(ids["folders"]), "limit": 50})
+
+    async def analyze(client):
+        return await client.get("/api/v1/optimization/analyze")
+
+    return {"upload": upload, "get": get, "move": move, "list": list_documents, "analyze": analyze}
+
+async def run_workload(client, send: Callable, requests: int, concurrency: int) -> dict:
+    from benchmarks.stats import summarize_latencies
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await send(client)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return dict(summarize_latencies(latencies, elapsed), elapsed_seconds=round(elapsed, 2), statuses=dict(statuses))
+
+async def run(args: argparse.Namespace, workdir: str) -> dict:
+    import httpx
+
+    from app.database import Base, engine
+    from app.main import app
+    from app.routers.documents import get_drive_service
+    from app.services.google_drive import GoogleDriveService
+    from benchmarks.fakes import FakeDriveApi, Latency
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    Base.metadata.create_all(bind=engine)
+    drive_api = FakeDriveApi(Latency(args.drive_latency_ms, args.drive_latency_ms / 5, args.error_rate))
+    ids = seed(drive_api, args.folders, args.documents, rng)
+    if args.ai:
+        install_ai(
+            Latency(args.vision_latency_ms, args.vision_latency_ms / 5, args.error_rate),
+            Latency(args.language_latency_ms, args.language_latency_ms / 5, args.error_rate),
+            workdir,
+            args.seed
+        )
+
+    async def fake_drive_service():
+        return GoogleDriveService(service=drive_api)
+    app.dependency_overrides[get_drive_service] = fake_drive_service
+
+    senders = make_requests(ids, args.upload_bytes, rng)
+    results = {}
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for workload in args.workloads:
+                requests = args.analyze_requests if workload == "analyze" else args.requests
+                results[workload] = await run_workload(client, senders[workload], requests, args.concurrency)
+                print_row(workload, results[workload])
+    finally:
+        await app.router.shutdown()
+        app.dependency_overrides.pop(get_drive_service, None)
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "drive_calls": drive_api.calls,
+        "workloads": results,
+    }
+
+def print_row(workload: str, result: dict) -> None:
+    if not getattr(print_row, "header_printed", False):
+        print(f"{'workload':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+        print_row.header_printed = True
+    print(
+        f"{workload:<10}{result['throughput_per_second']:>10.1f}{result['p50_ms']:>10.1f}"
+        f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}  {result['statuses']}"
+    )
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="dms-bench-") as workdir:
+        configure_environment(workdir)
+        results = asyncio.run(run(args, workdir))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
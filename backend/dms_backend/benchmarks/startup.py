@@ -0,0 +1,116 @@
+"""Startup profile of the API process
+
+Imports ``app.main`` in a fresh interpreter with ``-X importtime`` and runs
+the startup hooks, then reports where the time went: wall time for the
+import and for startup, import time per top-level package, the slowest
+modules, and the cumulative import time of every ``app`` module (which
+includes the libraries it pulls in).
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --enable-ai --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Runs in the child process; prints the wall times as JSON on its last line
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+asyncio.run(app.main.app.router.startup())
+ready = time.perf_counter()
+asyncio.run(app.main.app.router.shutdown())
+print(json.dumps({"import_seconds": imported - started, "startup_seconds": ready - imported}))
+"""
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs; the fastest one is reported")
+    parser.add_argument("--top", type=int, default=15, help="packages and modules to list")
+    parser.add_argument("--enable-ai", action="store_true", help="start with ENABLE_AI_CATEGORIZATION=true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+def run_once(args: argparse.Namespace, workdir: str) -> Tuple[dict, List[Tuple[str, int, int]]]:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env.pop("ASYNC_DATABASE_URL", None)
+    if args.enable_ai:
+        env["ENABLE_AI_CATEGORIZATION"] = "true"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True, text=True, env=env, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+def summarize(modules: List[Tuple[str, int, int]], top: int) -> dict:
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    slowest = sorted(modules, key=lambda module: -module[1])[:top]
+    return {
+        "import_time_ms": round(sum(self_us for _, self_us, _ in modules) / 1000, 1),
+        "modules_imported": len(modules),
+        "packages_ms": {
+            name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        "slowest_modules_ms": {name: round(self_us / 1000, 1) for name, self_us, _ in slowest},
+        "app_modules_cumulative_ms": {
+            name: round(cumulative_us / 1000, 1)
+            for name, _, cumulative_us in sorted(modules, key=lambda module: -module[2])
+            if name == "app" or name.startswith("app.")
+        },
+    }
+
+def print_report(report: dict) -> None:
+    print(f"import app.main: {report['import_seconds'] * 1000:.0f} ms, startup hooks: {report['startup_seconds'] * 1000:.0f} ms")
+    print(f"{report['modules_imported']} modules, {report['import_time_ms']:.0f} ms of import time")
+    for title, key in (
+        ("by package", "packages_ms"),
+        ("slowest modules (self)", "slowest_modules_ms"),
+        ("app modules (cumulative)", "app_modules_cumulative_ms"),
+    ):
+        print(f"\n{title}:")
+        for name, ms in report[key].items():
+            print(f"  {ms:>8.1f} ms  {name}")
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="dms-startup-") as workdir:
+        # The scratch database is created on import; the first run also pays for that
+        for _ in range(max(1, args.repeat)):
+            runs.append(run_once(args, workdir))
+    timings, modules = min(runs, key=lambda run: run[0]["import_seconds"])
+    report = {
+        "enable_ai": args.enable_ai,
+        "runs": len(runs),
+        "import_seconds": round(timings["import_seconds"], 4),
+        "startup_seconds": round(timings["startup_seconds"], 4),
+        **summarize(modules, args.top),
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Shared fixtures; the app runs against a scratch SQLite database
+
+DATABASE_URL is read when app.database is imported, so it is set here,
+before any test module imports the app.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="dms-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+
+@pytest.fixture
+def database():
+    """Empty tables for every test, including tables created at runtime"""
+    from sqlalchemy import text
+
+    from app import models  # noqa: F401 - registers the tables on Base
+    from app.database import Base, engine
+
+    with engine.begin() as conn:
+        names = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )).scalars().all()
+        for name in names:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop
+
+    The async engine's pooled connections are closed before the loop goes
+    away, so the next test does not reuse them from another loop.
+    """
+    from app.database import async_engine
+
+    def run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def drive_api():
+    """In-memory Drive client without latency (see benchmarks.fakes)"""
+    from benchmarks.fakes import FakeDriveApi, Latency
+
+    return FakeDriveApi(Latency(mean_ms=0.0, jitter_ms=0.0))
+
+
+@pytest.fixture
+def client(database, drive_api):
+    """Factory for an HTTP client of the API, with Drive served by ``drive_api``
+
+    The client talks to the app in-process, so create and use it inside ``run``.
+    """
+    import httpx
+
+    from app.main import app
+    from app.routers.documents import get_drive_service
+    from app.services.google_drive import GoogleDriveService
+
+    app.dependency_overrides[get_drive_service] = lambda: GoogleDriveService(service=drive_api)
+    yield lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api/v1")
+    app.dependency_overrides.pop(get_drive_service, None)
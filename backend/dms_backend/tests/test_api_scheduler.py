@@ -0,0 +1,91 @@
+"""Rate limiting lanes and retries of the Google API scheduler"""
+import threading
+import time
+
+import httplib2
+import pytest
+from fastapi.concurrency import run_in_threadpool
+from googleapiclient.errors import HttpError
+
+from app.services.api_scheduler import ApiScheduler, Priority, TokenBucket
+
+
+def _http_error(status: int, **headers) -> HttpError:
+    return HttpError(httplib2.Response({"status": status, **headers}), b"{}")
+
+
+def _failing(*errors: Exception):
+    """A call that raises the given errors in turn and then succeeds"""
+    attempts = []
+
+    def call():
+        attempts.append(time.monotonic())
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return "ok"
+
+    return call, attempts
+
+
+def test_background_callers_yield_to_interactive_ones():
+    bucket = TokenBucket(rate=10, capacity=1)
+    bucket.acquire()
+    served = []
+
+    def acquire(priority):
+        bucket.acquire(priority=priority)
+        served.append(priority)
+
+    background = threading.Thread(target=acquire, args=(Priority.BACKGROUND,))
+    background.start()
+    while not bucket.waiting(Priority.BACKGROUND):
+        time.sleep(0.001)
+    interactive = threading.Thread(target=acquire, args=(Priority.INTERACTIVE,))
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+
+    assert served == [Priority.INTERACTIVE, Priority.BACKGROUND]
+
+
+def test_retry_after_is_honoured():
+    # Without Retry-After the backoff would be zero
+    scheduler = ApiScheduler({"drive": (1000, 1000)}, backoff_base=0)
+    call, attempts = _failing(_http_error(429, **{"retry-after": "0.2"}))
+
+    assert scheduler.call("drive", call) == "ok"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.2
+    assert scheduler.backoff(0, _http_error(429, **{"retry-after": "3600"})) == scheduler.backoff_max
+
+
+def test_server_errors_are_only_retried_for_idempotent_calls():
+    scheduler = ApiScheduler({"drive": (1000, 1000)}, backoff_base=0)
+
+    call, attempts = _failing(_http_error(503))
+    with pytest.raises(HttpError):
+        scheduler.call("drive", call, idempotent=False)
+    assert len(attempts) == 1
+
+    call, attempts = _failing(_http_error(503))
+    assert scheduler.call("drive", call) == "ok"
+    assert len(attempts) == 2
+
+    # A rate limited call was rejected, so it is repeated either way
+    call, attempts = _failing(_http_error(429))
+    assert scheduler.call("drive", call, idempotent=False) == "ok"
+    assert len(attempts) == 2
+
+
+def test_lane_reaches_calls_made_in_the_threadpool(run):
+    scheduler = ApiScheduler({"drive": (1000, 1000)})
+
+    async def scenario():
+        with scheduler.lane(Priority.BACKGROUND):
+            await run_in_threadpool(scheduler.call, "drive", lambda: None)
+        await run_in_threadpool(scheduler.call, "drive", lambda: None)
+
+    run(scenario())
+    stats = scheduler.stats()["drive"]
+    assert stats["background"]["calls"] == 1
+    assert stats["interactive"]["calls"] == 1
@@ -0,0 +1,66 @@
+"""SQLite writer lock of the sync and async sessions"""
+import asyncio
+
+from sqlalchemy import select, text
+
+from app.database import AsyncSessionLocal, sqlite_writer_lock
+from app.models import User
+
+
+def test_reads_do_not_wait_for_the_writer_lock(database, run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            # Another writer holds the lock meanwhile
+            with sqlite_writer_lock:
+                rows = await asyncio.wait_for(db.run_sync(lambda session: session.execute(select(User)).all()), 1)
+                value = await asyncio.wait_for(db.execute(text("  select 1")), 1)
+                plan = await asyncio.wait_for(db.execute(text("EXPLAIN QUERY PLAN SELECT * FROM users")), 1)
+            return rows, value.scalar(), plan.all()
+
+    rows, value, plan = run(scenario())
+    assert rows == [] and value == 1 and plan
+
+
+def test_text_writes_take_the_writer_lock_until_commit(database, run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("UPDATE users SET email = email"))
+            held = sqlite_writer_lock.locked()
+            await db.commit()
+            return held, sqlite_writer_lock.locked()
+
+    assert run(scenario()) == (True, False)
+
+
+def test_run_sync_writes_take_the_writer_lock(database, run):
+    def add_user(session):
+        session.add(User(email="sync@example.com"))
+        session.flush()
+        return sqlite_writer_lock.locked()
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            held = await db.run_sync(add_user)
+            await db.commit()
+            return held, sqlite_writer_lock.locked()
+
+    assert run(scenario()) == (True, False)
+
+
+def test_writers_are_serialized(database, run):
+    async def scenario():
+        async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+            first.add(User(email="first@example.com"))
+            await first.flush()
+
+            second.add(User(email="second@example.com"))
+            waiting = asyncio.create_task(second.commit())
+            await asyncio.sleep(0.1)
+            blocked = not waiting.done()
+
+            await first.commit()
+            await asyncio.wait_for(waiting, 1)
+            emails = (await first.execute(select(User.email).order_by(User.id))).scalars().all()
+            return blocked, emails
+
+    assert run(scenario()) == (True, ["first@example.com", "second@example.com"])
@@ -0,0 +1,50 @@
+"""Token authentication and its principal cache"""
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import delete, update
+
+from app.database import AsyncSessionLocal
+from app.dependencies import ALGORITHM, SECRET_KEY, get_current_user, principal_cache
+from app.models import User
+
+
+@pytest.fixture
+def token(database):
+    principal_cache.clear()
+    return jwt.encode({"sub": "user@example.com", "exp": time.time() + 3600}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def _authenticate(token: str):
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(token=token, db=db)
+
+
+async def _bulk(statement) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(statement)
+        await db.commit()
+
+
+async def _add_user() -> None:
+    async with AsyncSessionLocal() as db:
+        db.add(User(email="user@example.com"))
+        await db.commit()
+
+
+@pytest.mark.parametrize("statement", [
+    update(User).where(User.email == "user@example.com").values(email="renamed@example.com"),
+    delete(User).where(User.email == "user@example.com"),
+], ids=["update", "delete"])
+def test_bulk_user_changes_evict_cached_principals(token, run, statement):
+    async def scenario():
+        await _add_user()
+        assert (await _authenticate(token)).email == "user@example.com"
+        await _bulk(statement)
+        with pytest.raises(HTTPException) as rejected:
+            await _authenticate(token)
+        return rejected.value.status_code
+
+    assert run(scenario()) == 401
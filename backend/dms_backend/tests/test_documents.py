@@ -0,0 +1,331 @@
+"""Documents API against the scratch database and an in-memory Drive"""
+import asyncio
+import io
+import zipfile
+from typing import List, Optional
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from sqlalchemy import event, func, select
+
+from app.database import SessionLocal, async_engine
+from app.models import Category, Document, Folder, LogEntry, document_categories
+from app.routers import documents as documents_router
+from app.services import logging as logging_module
+from app.services.logging import LogSink
+from benchmarks import fakes
+from benchmarks.fakes import Latency
+
+
+def _upload(http, filename: str, **params):
+    return http.post(
+        "/documents/upload", params=params, files={"file": (filename, b"%PDF-1.4", "application/pdf")}
+    )
+
+
+def _upload_batch(http, filenames, **params):
+    return http.post(
+        "/documents/upload/batch", params=params,
+        files=[("files", (filename, b"%PDF-1.4", "application/pdf")) for filename in filenames]
+    )
+
+
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _add_folder(drive_api, name: str) -> int:
+    drive_folder = drive_api.add_file(name, mime_type="application/vnd.google-apps.folder")
+    db = SessionLocal()
+    try:
+        folder = Folder(name=name, google_drive_id=drive_folder["id"])
+        db.add(folder)
+        db.commit()
+        return folder.id
+    finally:
+        db.close()
+
+
+def _add_documents(
+    drive_api, count: int, folder_id: Optional[int] = None, category_id: Optional[int] = None
+) -> List[int]:
+    """Documents stored in Drive and the database, without going through the API"""
+    db = SessionLocal()
+    try:
+        documents = [
+            Document(
+                filename=f"doc{i}.pdf", google_drive_id=drive_api.add_file(f"doc{i}.pdf")["id"], folder_id=folder_id
+            )
+            for i in range(count)
+        ]
+        if category_id is not None:
+            for document in documents:
+                document.categories.append(db.get(Category, category_id))
+        db.add_all(documents)
+        db.commit()
+        return [document.id for document in documents]
+    finally:
+        db.close()
+
+
+def _add_category(name: str) -> int:
+    db = SessionLocal()
+    try:
+        category = Category(name=name)
+        db.add(category)
+        db.commit()
+        return category.id
+    finally:
+        db.close()
+
+
+def _links() -> set:
+    db = SessionLocal()
+    try:
+        return set(db.execute(select(document_categories.c.document_id, document_categories.c.category_id)).all())
+    finally:
+        db.close()
+
+
+def _count(statement) -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(statement).scalar()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def competing_category():
+    """Add the category right before the app inserts it
+
+    This is the window between an upload finding no category and creating
+    it, in which a concurrent upload of the same new category gets there
+    first. SQLite admits one writer at a time, so the row is written on the
+    app's own connection rather than committed from another.
+    """
+    def before_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO categories") and not created:
+            created.append(True)
+            conn.connection.cursor().execute("INSERT INTO categories (name) VALUES ('Invoices')")
+
+    created = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_insert)
+    yield created
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_insert)
+
+
+def test_upload_reuses_a_category_created_concurrently(client, run, competing_category):
+    async def scenario():
+        async with client() as http:
+            return await _upload(http, "invoice.pdf", category_name="Invoices")
+
+    response = run(scenario())
+    assert competing_category
+    assert response.status_code == 200, response.text
+    assert _count(select(func.count()).select_from(Category)) == 1
+    assert _count(select(func.count()).select_from(document_categories)) == 1
+
+
+def test_batch_upload_reuses_a_category_created_concurrently(client, run, competing_category):
+    async def scenario():
+        async with client() as http:
+            return await _upload_batch(http, ["a.pdf", "b.pdf"], category_name="Invoices")
+
+    response = run(scenario())
+    assert competing_category
+    assert response.status_code == 200, response.text
+    assert _count(select(func.count()).select_from(Category)) == 1
+    assert _count(select(func.count()).select_from(document_categories)) == 2
+
+
+def test_batch_upload_stores_files_and_archive_members(client, run, drive_api, monkeypatch):
+    monkeypatch.setattr(documents_router, "UPLOAD_MAX_FILE_BYTES", 100)
+    folder_id = _add_folder(drive_api, "Inbox")
+    archive = _zip({"scans/a.pdf": b"%PDF-1.4 a", "scans/b.txt": b"b", "big.pdf": b"x" * 200})
+
+    async def scenario():
+        async with client() as http:
+            return await http.post("/documents/upload/batch", params={"folder_id": folder_id}, files=[
+                ("files", ("letter.pdf", b"%PDF-1.4", "application/pdf")),
+                ("files", ("scans.zip", archive, "application/zip")),
+            ])
+
+    response = run(scenario())
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["uploaded"] == 3 and body["failed"] == 1
+    assert [(result["filename"], result["status"]) for result in body["results"]] == [
+        ("letter.pdf", "uploaded"), ("a.pdf", "uploaded"), ("b.txt", "uploaded"), ("big.pdf", "failed")
+    ]
+    assert _count(select(func.count()).select_from(Document).where(Document.folder_id == folder_id)) == 3
+    # The folder plus one Drive file per stored document
+    assert len(drive_api.files_by_id) == 4
+    assert _count(select(func.count()).select_from(LogEntry).where(LogEntry.event_type == "document_upload")) == 3
+
+
+def test_batch_upload_removes_drive_files_when_saving_fails(client, run, drive_api):
+    def fail_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO documents"):
+            raise RuntimeError("disk full")
+
+    async def scenario():
+        async with client() as http:
+            return await _upload_batch(http, ["a.pdf", "b.pdf", "c.pdf"])
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", fail_insert)
+    try:
+        response = run(scenario())
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", fail_insert)
+    assert response.status_code == 500
+    assert "disk full" in response.json()["detail"]
+    assert drive_api.files_by_id == {}
+    assert _count(select(func.count()).select_from(Document)) == 0
+
+
+def test_bulk_move_logs_with_the_log_buffer_full(client, run, drive_api, monkeypatch):
+    # The buffer's writer needs the SQLite writer lock the request holds until it commits
+    sink = LogSink(batch_size=1, flush_interval=0.01, max_queue_size=1)
+    monkeypatch.setattr(logging_module, "log_sink", sink)
+    folder_id = _add_folder(drive_api, "Archive")
+    document_ids = _add_documents(drive_api, 5)
+
+    async def scenario():
+        await sink.start()
+        try:
+            async with client() as http:
+                return await asyncio.wait_for(
+                    http.post("/documents/move", json={"document_ids": document_ids, "folder_id": folder_id}), 10
+                )
+        finally:
+            await sink.stop()
+
+    response = run(scenario())
+    assert response.status_code == 200, response.text
+    assert response.json()["moved"] == 5
+    assert _count(select(func.count()).select_from(LogEntry).where(LogEntry.event_type == "document_move")) == 5
+
+
+def test_bulk_delete_by_ids(client, run, drive_api, monkeypatch):
+    category_id = _add_category("Invoices")
+    document_ids = _add_documents(drive_api, 3, category_id=category_id)
+    db = SessionLocal()
+    locked = db.get(Document, document_ids[2]).google_drive_id
+    db.close()
+
+    def forbidden():
+        raise HttpError(httplib2.Response({"status": 403}), b"insufficientFilePermissions")
+
+    delete = fakes._FakeFiles.delete
+
+    def delete_unless_locked(files, fileId):
+        request = delete(files, fileId)
+        if fileId == locked:
+            request.fn = forbidden
+        return request
+
+    monkeypatch.setattr(fakes._FakeFiles, "delete", delete_unless_locked)
+
+    async def scenario():
+        async with client() as http:
+            return await http.post("/documents/delete", json={"document_ids": document_ids + [404]})
+
+    response = run(scenario())
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["deleted"] == 2 and body["next_after_id"] is None
+    assert [result["status"] for result in body["results"]] == ["deleted", "deleted", "failed", "not_found"]
+    assert list(drive_api.files_by_id) == [locked]
+    assert _count(select(func.count()).select_from(Document)) == 1
+    assert _links() == {(document_ids[2], category_id)}
+    assert _count(select(func.count()).select_from(LogEntry).where(LogEntry.event_type == "document_delete")) == 2
+
+
+def test_bulk_delete_by_filter_continues_after_the_limit(client, run, drive_api, monkeypatch):
+    monkeypatch.setattr(documents_router, "BULK_FILTER_MAX_DOCUMENTS", 2)
+    folder_id = _add_folder(drive_api, "Old")
+    document_ids = _add_documents(drive_api, 3, folder_id=folder_id)
+    kept = _add_documents(drive_api, 1)
+
+    async def scenario():
+        pages = []
+        async with client() as http:
+            selection = {"filter": {"folder_id": folder_id}}
+            while True:
+                body = (await http.post("/documents/delete", json=selection)).json()
+                pages.append(body)
+                if body["next_after_id"] is None:
+                    return pages
+                selection["after_id"] = body["next_after_id"]
+
+    pages = run(scenario())
+    assert [(page["deleted"], page["next_after_id"]) for page in pages] == [(2, document_ids[1]), (1, None)]
+    assert _count(select(Document.id)) == kept[0]
+    assert _count(select(func.count()).select_from(Document)) == 1
+
+
+def test_bulk_categorize_adds_and_replaces_links(client, run, drive_api):
+    invoices, receipts = _add_category("Invoices"), _add_category("Receipts")
+    tagged = _add_documents(drive_api, 1, category_id=invoices)[0]
+    retagged = _add_documents(drive_api, 1, category_id=receipts)[0]
+    untagged = _add_documents(drive_api, 1)[0]
+
+    async def scenario():
+        async with client() as http:
+            categorized = await http.post("/documents/categorize", json={
+                "document_ids": [tagged, retagged, untagged, 404], "category_ids": [invoices], "replace": True
+            })
+            unknown = await http.post("/documents/categorize", json={"document_ids": [tagged], "category_ids": [999]})
+            return categorized, unknown
+
+    categorized, unknown = run(scenario())
+    assert categorized.status_code == 200, categorized.text
+    body = categorized.json()
+    assert body["updated"] == 2
+    assert body["results"] == [
+        {"document_id": tagged, "status": "unchanged"},
+        {"document_id": retagged, "status": "updated", "added": [invoices], "removed": [receipts]},
+        {"document_id": untagged, "status": "updated", "added": [invoices], "removed": []},
+        {"document_id": 404, "status": "not_found"},
+    ]
+    assert _links() == {(tagged, invoices), (retagged, invoices), (untagged, invoices)}
+    assert unknown.status_code == 404
+    assert _count(select(func.count()).select_from(LogEntry).where(LogEntry.event_type == "document_categorize")) == 2
+
+
+def test_drive_calls_do_not_stall_the_event_loop(client, run, drive_api):
+    folder_id = _add_folder(drive_api, "Archive")
+    drive_api.latency = Latency(mean_ms=200.0, jitter_ms=0.0)
+
+    async def scenario():
+        gaps = []
+        stop = asyncio.Event()
+
+        async def tick():
+            loop = asyncio.get_running_loop()
+            last = loop.time()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                gaps.append(loop.time() - last)
+                last = loop.time()
+
+        ticker = asyncio.create_task(tick())
+        async with client() as http:
+            uploaded = await _upload(http, "a.pdf")
+            document_id = uploaded.json()["document"]["id"]
+            moved = await http.post(f"/documents/{document_id}/move", params={"folder_id": folder_id})
+            analyzed = await http.get("/optimization/analyze")
+            deleted = await http.delete(f"/documents/{document_id}")
+        stop.set()
+        await ticker
+        return [response.status_code for response in (uploaded, moved, analyzed, deleted)], max(gaps)
+
+    statuses, longest_gap = run(scenario())
+    assert statuses == [200, 200, 200, 200]
+    assert longest_gap < 0.1
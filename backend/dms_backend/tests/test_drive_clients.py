@@ -0,0 +1,109 @@
+"""Drive client pool token refreshes and stored credentials"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from app.database import SessionLocal
+from app.dependencies import CurrentUser, principal_cache
+from app.models import User
+from app.services.drive_clients import DriveClientPool, save_credentials
+
+
+def _credentials_json(refresh_token: str = "refresh-1", expired: bool = True) -> str:
+    expiry = datetime.utcnow() + (timedelta(hours=-1) if expired else timedelta(hours=1))
+    return json.dumps({
+        "token": "access-0",
+        "refresh_token": refresh_token,
+        "client_id": "client",
+        "client_secret": "secret",
+        "expiry": expiry.isoformat() + "Z",
+    })
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """Token refreshes made, answered without Google after a short delay"""
+    calls = []
+
+    def refresh(credentials, request):
+        calls.append(credentials.refresh_token)
+        time.sleep(0.05)
+        credentials.token = f"access-{len(calls)}"
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    return calls
+
+
+def test_concurrent_callers_refresh_an_expired_token_once(refreshes):
+    saved = []
+    pool = DriveClientPool(on_refresh=lambda user_id, credentials_json: saved.append((user_id, credentials_json)))
+    stored = _credentials_json()
+    start = threading.Barrier(8)
+
+    def get():
+        start.wait()
+        return pool.get(1, stored).credentials.token
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tokens = [future.result() for future in [executor.submit(get) for _ in range(8)]]
+
+    assert tokens == ["access-1"] * 8
+    assert refreshes == ["refresh-1"]
+    assert [(user_id, json.loads(credentials_json)["token"]) for user_id, credentials_json in saved] == [
+        (1, "access-1")
+    ]
+
+
+def test_rotated_refresh_token_keeps_the_client_and_a_new_login_replaces_it(monkeypatch):
+    def refresh_and_rotate(credentials, request):
+        credentials.token = "access-1"
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+        credentials._refresh_token = "refresh-2"
+
+    monkeypatch.setattr(Credentials, "refresh", refresh_and_rotate)
+    saved = []
+    pool = DriveClientPool(on_refresh=lambda user_id, credentials_json: saved.append(credentials_json))
+
+    pool.get(1, _credentials_json())
+    client = pool._clients[1]
+    # Callers now read the rotated credentials back from the database
+    assert json.loads(saved[0])["refresh_token"] == "refresh-2"
+    pool.get(1, saved[0])
+    assert pool._clients[1] is client
+
+    pool.get(1, _credentials_json(refresh_token="refresh-3", expired=False))
+    assert pool._clients[1] is not client
+    assert pool._clients[1].credentials.refresh_token == "refresh-3"
+
+
+def test_saving_credentials_only_evicts_that_users_principals(database):
+    db = SessionLocal()
+    try:
+        users = [User(email="first@example.com"), User(email="second@example.com")]
+        db.add_all(users)
+        db.commit()
+        first, second = (user.id for user in users)
+    finally:
+        db.close()
+    principal_cache.clear()
+    principal_cache.put("first-token", CurrentUser(id=first, email="first@example.com", role=None))
+    principal_cache.put("second-token", CurrentUser(id=second, email="second@example.com", role=None))
+
+    stored = _credentials_json()
+    save_credentials(first, stored)
+
+    assert principal_cache.get("first-token") is None
+    assert principal_cache.get("second-token") is not None
+    db = SessionLocal()
+    try:
+        assert db.get(User, first).credentials == stored
+        assert db.get(User, second).credentials is None
+    finally:
+        db.close()
+    principal_cache.clear()
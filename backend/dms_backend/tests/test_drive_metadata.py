@@ -0,0 +1,130 @@
+"""Drive metadata cache refreshes against the scratch database"""
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, async_engine
+from app.models import Document
+from app.services.drive_metadata import DriveMetadataCache
+
+
+class _Drive:
+    """Answers metadata lookups with a settable size, optionally held until released"""
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_file_metadata(self, file_id: str) -> dict:
+        self.release.wait(5)
+        self.calls += 1
+        return {"id": file_id, "size": str(self.size)}
+
+
+async def _refreshed(cache: DriveMetadataCache) -> None:
+    await asyncio.gather(*list(cache._refreshing.values()))
+
+
+@pytest.fixture
+def writes():
+    """UPDATE statements run against the database"""
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            statements.append(statement)
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def _document_size(file_id: str = "file") -> float:
+    db = SessionLocal()
+    try:
+        return db.query(Document).filter(Document.google_drive_id == file_id).one().size_bytes
+    finally:
+        db.close()
+
+
+def test_stale_entries_are_served_while_they_refresh(database, run):
+    cache = DriveMetadataCache(ttl=0.05, max_stale=10)
+    drive = _Drive()
+
+    async def scenario():
+        assert cache.get("file", drive) is None
+        await _refreshed(cache)
+        fresh = cache.get("file", drive)
+        assert cache.refreshing_count == 0
+        await asyncio.sleep(0.06)
+        drive.size = 20
+        stale = cache.get("file", drive)
+        assert cache.refreshing_count == 1
+        await _refreshed(cache)
+        return fresh, stale, cache.get("file", drive)
+
+    fresh, stale, refreshed = run(scenario())
+    assert fresh["size"] == stale["size"] == "10"
+    assert refreshed["size"] == "20"
+    assert drive.calls == 2
+
+
+def test_entries_older_than_max_stale_are_not_served(database, run):
+    cache = DriveMetadataCache(ttl=0.01, max_stale=0.05)
+    drive = _Drive()
+
+    async def scenario():
+        cache.get("file", drive)
+        await _refreshed(cache)
+        await asyncio.sleep(0.06)
+        expired = cache.get("file", drive)
+        await _refreshed(cache)
+        return expired, cache.get("file", drive)
+
+    expired, refreshed = run(scenario())
+    assert expired is None
+    assert refreshed["size"] == "10"
+
+
+def test_refresh_invalidated_while_in_flight_is_dropped(database, run):
+    cache = DriveMetadataCache()
+    drive = _Drive()
+    drive.release.clear()
+
+    async def scenario():
+        cache.get("file", drive)
+        await asyncio.sleep(0.01)
+        # E.g. the document was deleted or moved while Drive was answering
+        cache.invalidate("file")
+        drive.release.set()
+        await _refreshed(cache)
+        return dict(cache._entries), cache._superseded
+
+    entries, superseded = run(scenario())
+    assert entries == {}
+    assert superseded == set()
+
+
+def test_refresh_writes_only_changed_sizes(database, run, writes):
+    db = SessionLocal()
+    try:
+        db.add(Document(filename="a.pdf", google_drive_id="file", size_bytes=10))
+        db.commit()
+    finally:
+        db.close()
+    cache = DriveMetadataCache(ttl=0)
+    drive = _Drive(size=10)
+
+    async def scenario():
+        for size in (10, 10, 20):
+            drive.size = size
+            cache.get("file", drive)
+            await _refreshed(cache)
+
+    run(scenario())
+    assert drive.calls == 3
+    assert len(writes) == 1
+    assert _document_size() == 20
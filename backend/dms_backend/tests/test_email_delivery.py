@@ -0,0 +1,132 @@
+"""Email delivery worker tests against a local SMTP sink"""
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+
+import pytest
+
+from app.services.email_delivery import EmailDeliveryWorker
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal in-process SMTP server that records what it receives"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_next_data = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.connections += 1
+        self.reply("220 localhost SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                if self.server.fail_next_data:
+                    self.server.fail_next_data -= 1
+                    self.reply("451 Temporary failure")
+                else:
+                    self.server.messages.append(message_from_bytes(data[:-5]))
+                    self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def worker(sink):
+    worker = EmailDeliveryWorker(
+        host="127.0.0.1",
+        port=sink.port,
+        sender="dms@example.com",
+        use_starttls=False,
+        retry_backoff=0.01,
+        digest_window=0.2
+    )
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for delivery"
+        time.sleep(0.01)
+
+
+def test_batch_is_sent_over_one_session(sink, worker):
+    for i in range(20):
+        worker.send(f"user{i}@example.com", f"Subject {i}", "body")
+
+    wait_for(lambda: len(sink.messages) == 20)
+    assert sink.connections == 1
+    assert {m["To"] for m in sink.messages} == {f"user{i}@example.com" for i in range(20)}
+
+
+def test_transient_failure_is_retried(sink, worker):
+    sink.fail_next_data = 2
+    worker.send("user@example.com", "Retry me", "body")
+
+    wait_for(lambda: len(sink.messages) == 1)
+    assert sink.messages[0]["Subject"] == "Retry me"
+    assert worker.failed_count == 0
+
+
+def test_digest_collapses_burst_into_one_email(sink, worker):
+    for i in range(5):
+        worker.send("user@example.com", f"Document uploaded {i}", f"file{i}.pdf", digest=True)
+    worker.send("other@example.com", "Immediate", "body")
+
+    wait_for(lambda: len(sink.messages) == 2)
+    digest = next(m for m in sink.messages if m["To"] == "user@example.com")
+    assert digest["Subject"] == "5 new notifications"
+    body = digest.get_payload()[0].get_payload()
+    assert all(f"file{i}.pdf" in body for i in range(5))
+
+
+def test_stop_flushes_pending_digests(sink):
+    worker = EmailDeliveryWorker(
+        host="127.0.0.1", port=sink.port, sender="dms@example.com",
+        use_starttls=False, digest_window=3600
+    )
+    worker.start()
+    worker.send("user@example.com", "Held back", "body", digest=True)
+    worker.stop()
+
+    assert [m["Subject"] for m in sink.messages] == ["Held back"]
@@ -0,0 +1,244 @@
+"""Folder id caches and folder creation against the scratch database and an in-memory Drive"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Folder
+from app.services import folder_structure
+from app.services.api_scheduler import Priority, _current_priority, api_scheduler
+from app.services.folder_structure import FolderIdCache, FolderStructureService, folder_paths, year_month_folders
+from app.services.google_drive import GoogleDriveService
+from benchmarks.fakes import Latency
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    year_month_folders.clear()
+    folder_paths.clear()
+    yield
+    year_month_folders.clear()
+    folder_paths.clear()
+
+
+def _in_threads(fn, count: int = 8) -> list:
+    """Call ``fn`` from ``count`` threads at once"""
+    start = threading.Barrier(count)
+
+    def call():
+        start.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return [future.result() for future in [pool.submit(call) for _ in range(count)]]
+
+
+def _folders() -> list:
+    db = SessionLocal()
+    try:
+        return [
+            (folder.name, folder.parent_id, folder.year, folder.month)
+            for folder in db.query(Folder).order_by(Folder.id)
+        ]
+    finally:
+        db.close()
+
+
+def test_folder_id_cache_resolves_a_key_once_across_threads():
+    cache = FolderIdCache()
+    calls = []
+
+    def resolve():
+        calls.append(1)
+        time.sleep(0.05)
+        return 7
+
+    assert _in_threads(lambda: cache.get_or_create("key", resolve)) == [7] * 8
+    assert len(calls) == 1
+    assert cache.get("key") == 7
+
+
+def test_folder_id_cache_retries_after_a_failed_resolve():
+    cache = FolderIdCache()
+
+    def fail():
+        raise RuntimeError("Drive is down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("key", fail)
+    assert cache._inflight == {}
+    assert cache.get_or_create("key", lambda: 7) == 7
+
+
+def test_folder_id_cache_resolves_overlapping_key_sets_once():
+    cache = FolderIdCache()
+    resolved = []
+    calls = iter(range(8))
+
+    def resolve(keys):
+        resolved.extend(keys)
+        time.sleep(0.02)
+        return {key: ord(key) for key in keys}
+
+    def get():
+        keys = ["a", "b"] if next(calls) % 2 else ["c", "b"]
+        return cache.get_or_create_many(keys, resolve)
+
+    results = _in_threads(get)
+    assert sorted(resolved) == ["a", "b", "c"]
+    assert all(result["b"] == ord("b") for result in results)
+    assert cache._inflight == {}
+
+
+def test_folder_id_cache_evicts_least_recently_used():
+    cache = FolderIdCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_concurrent_uploads_create_the_month_folders_once(database, drive_api):
+    drive_api.latency = Latency(mean_ms=20.0, jitter_ms=0.0)
+
+    def resolve():
+        db = SessionLocal()
+        try:
+            return FolderStructureService(db, GoogleDriveService(service=drive_api)).create_year_month_structure(
+                2024, 3, None
+            ).id
+        finally:
+            db.close()
+
+    assert len(set(_in_threads(resolve))) == 1
+    assert len(drive_api.files_by_id) == 2
+    year_id = year_month_folders.get((None, 2024, None))
+    assert _folders() == [("2024", None, 2024, None), ("03", year_id, 2024, 3)]
+
+
+def test_losing_a_folder_creation_race_drops_the_drive_folder(database, drive_api):
+    class RacingDriveService(GoogleDriveService):
+        """Another process commits the year folder while this one creates it in Drive"""
+
+        def create_folder(self, name, parent_id=None):
+            if name == "2024":
+                db = SessionLocal()
+                try:
+                    db.add(Folder(name="2024", google_drive_id="winner", year=2024))
+                    db.commit()
+                finally:
+                    db.close()
+            return super().create_folder(name, parent_id)
+
+    db = SessionLocal()
+    try:
+        service = FolderStructureService(db, RacingDriveService(service=drive_api))
+        month = service.create_year_month_structure(2024, 3, None)
+        month_drive_id = month.drive_id
+    finally:
+        db.close()
+
+    # Only the month folder is left in Drive, below the winner's year folder
+    assert list(drive_api.files_by_id) == [month_drive_id]
+    assert drive_api.files_by_id[month_drive_id]["parents"] == ["winner"]
+    assert [name for name, *_ in _folders()] == ["2024", "03"]
+
+
+def _resolve_path(drive_api, path, parent_id=None) -> int:
+    db = SessionLocal()
+    try:
+        parent = db.get(Folder, parent_id) if parent_id else None
+        service = FolderStructureService(db, GoogleDriveService(service=drive_api))
+        return service.get_or_create_folder_path(path, parent).id
+    finally:
+        db.close()
+
+
+def test_folder_path_is_created_once_and_then_served_without_drive(database, drive_api):
+    folder_id = _resolve_path(drive_api, ["Clients", "Acme", "2024"])
+    assert len(drive_api.files_by_id) == 3
+    calls = drive_api.calls
+
+    assert _resolve_path(drive_api, ["Clients", "Acme", "2024"]) == folder_id
+    folder_paths.clear()
+    assert _resolve_path(drive_api, ["Clients", "Acme", "2024"]) == folder_id
+    assert _resolve_path(drive_api, ["Clients", "Acme"]) != folder_id
+    assert drive_api.calls == calls
+
+
+def test_concurrent_callers_create_a_folder_path_once(database, drive_api):
+    drive_api.latency = Latency(mean_ms=20.0, jitter_ms=0.0)
+
+    assert len(set(_in_threads(lambda: _resolve_path(drive_api, ["Clients", "Acme"])))) == 1
+    assert len(drive_api.files_by_id) == 2
+    assert [name for name, *_ in _folders()] == ["Clients", "Acme"]
+
+
+def test_deleted_cached_folder_only_evicts_its_own_path(database, drive_api):
+    acme = _resolve_path(drive_api, ["Clients", "Acme"])
+    archive = _resolve_path(drive_api, ["Archive"])
+    db = SessionLocal()
+    try:
+        db.delete(db.get(Folder, acme))
+        db.commit()
+    finally:
+        db.close()
+
+    recreated = _resolve_path(drive_api, ["Clients", "Acme"])
+    assert recreated != acme
+    assert folder_paths.get((None, "Archive")) == archive
+    assert len(drive_api.files_by_id) == 4
+
+
+def test_many_folder_paths_are_resolved_together(database, drive_api):
+    paths = [["Clients", "Acme"], ["Clients", "Beta"], ["Archive"], []]
+    db = SessionLocal()
+    try:
+        service = FolderStructureService(db, GoogleDriveService(service=drive_api))
+        folders = service.get_or_create_folder_paths(paths)
+        assert [folder.name if folder else None for folder in folders] == ["Acme", "Beta", "Archive", None]
+        assert folders[0].parent_id == folders[1].parent_id
+        calls = drive_api.calls
+
+        folder_paths.clear()
+        assert [folder.id if folder else None for folder in service.get_or_create_folder_paths(paths)] == [
+            folder.id if folder else None for folder in folders
+        ]
+        assert drive_api.calls == calls
+    finally:
+        db.close()
+    assert sorted(name for name, *_ in _folders()) == ["Acme", "Archive", "Beta", "Clients"]
+
+
+def test_sibling_folders_are_created_in_parallel_in_the_callers_lane(database, drive_api, monkeypatch):
+    monkeypatch.setattr(folder_structure, "DRIVE_BULK_CONCURRENCY", 4)
+    drive_api.latency = Latency(mean_ms=50.0, jitter_ms=0.0)
+    lock = threading.Lock()
+    running, most_running, lanes = [0], [0], []
+
+    class CountingDriveService(GoogleDriveService):
+        def create_folder(self, name, parent_id=None):
+            with lock:
+                running[0] += 1
+                most_running[0] = max(most_running[0], running[0])
+                lanes.append(_current_priority.get())
+            try:
+                return super().create_folder(name, parent_id)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+    db = SessionLocal()
+    try:
+        service = FolderStructureService(db, CountingDriveService(service=drive_api))
+        with api_scheduler.lane(Priority.BACKGROUND):
+            service.get_or_create_folder_paths([["Clients", f"Client {i}"] for i in range(8)])
+    finally:
+        db.close()
+
+    assert len(drive_api.files_by_id) == 9
+    assert most_running[0] == 4
+    assert set(lanes) == {Priority.BACKGROUND}
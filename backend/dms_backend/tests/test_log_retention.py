@@ -0,0 +1,201 @@
+"""Log partitioning, rotation and retention
+
+The SQLite tests run against the app's scratch database. Set
+TEST_POSTGRES_URL (see test_query_plans.py) to also run the Postgres
+partition migration and maintenance; that database is wiped first.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import LogEntry
+from app.pagination import build_page
+from app.services.log_retention import LogRetentionService
+from app.services.logging import logging_service
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _add_entries(timestamps, document_id=None):
+    db = SessionLocal()
+    try:
+        entries = [
+            LogEntry(event_type="document_upload", document_id=document_id, timestamp=timestamp)
+            for timestamp in timestamps
+        ]
+        db.add_all(entries)
+        db.commit()
+        return [entry.id for entry in entries]
+    finally:
+        db.close()
+
+
+def _rotate(tmp_path, now):
+    db = SessionLocal()
+    try:
+        return LogRetentionService(retention_days=3650, archive_dir=str(tmp_path)).run_maintenance(db, now=now)
+    finally:
+        db.close()
+
+
+async def _all_pages(limit, **filters):
+    """Follow next_cursor through GET /logs pages, returning the ids in order"""
+    ids, cursor = [], None
+    async with AsyncSessionLocal() as db:
+        while True:
+            logs = await logging_service.get_recent_logs(db, limit=limit, cursor=cursor, **filters)
+            page = build_page(logs, limit, "timestamp", [log.id for log in logs])
+            ids.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+
+def test_recent_logs_page_across_rotated_months(database, run, tmp_path):
+    february = _add_entries([datetime(2024, 2, day, 9) for day in (3, 14, 27)])
+    march = _add_entries([datetime(2024, 3, day, 9) for day in (1, 15)], document_id=7)
+    april = _add_entries([datetime(2024, 4, day, 9) for day in (2, 5)])
+
+    result = _rotate(tmp_path, datetime(2024, 4, 10))
+    assert result["rotated"] == ["log_entries_2024_02", "log_entries_2024_03"]
+    with database.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM log_entries")).scalar() == len(april)
+
+    newest_first = list(reversed(february + march + april))
+    assert run(_all_pages(limit=2)) == newest_first
+    assert run(_all_pages(limit=100)) == newest_first
+    assert run(_all_pages(limit=1, document_id=7)) == list(reversed(march))
+
+
+def test_rotated_months_get_keyset_indexes(database, tmp_path):
+    _add_entries([datetime(2024, 2, 3, 9)])
+    _rotate(tmp_path, datetime(2024, 4, 10))
+
+    with database.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM log_entries_2024_02 "
+            "WHERE document_id = 7 ORDER BY timestamp DESC, id DESC LIMIT 51"
+        ).fetchall()
+    assert all(not row[-1].startswith("SCAN ") for row in plan), plan
+
+
+@pytest.fixture
+def postgres_url():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    reset = create_engine(url, isolation_level="AUTOCOMMIT")
+    with reset.connect() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    reset.dispose()
+    return url
+
+
+def _alembic(url: str) -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def _insert_log(conn, timestamp: str, event_type: str = "document_upload") -> None:
+    conn.execute(
+        text("INSERT INTO log_entries (event_type, timestamp) VALUES (:event_type, :timestamp)"),
+        {"event_type": event_type, "timestamp": timestamp}
+    )
+
+
+def _primary_key(conn) -> list:
+    return conn.execute(text(
+        "SELECT a.attname FROM pg_index i "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+        "WHERE i.indrelid = 'log_entries'::regclass AND i.indisprimary ORDER BY a.attname"
+    )).scalars().all()
+
+
+def _is_partitioned(conn) -> bool:
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'log_entries'")).scalar() == "p"
+
+
+def test_postgres_partition_migration_round_trip(postgres_url):
+    config = _alembic(postgres_url)
+    command.upgrade(config, "d41b7a2e9c05")
+    engine = create_engine(postgres_url)
+    try:
+        with engine.begin() as conn:
+            for timestamp in ("2024-01-15 10:00", "2024-01-15 10:30", "2024-02-20 08:00"):
+                _insert_log(conn, timestamp)
+            old_ids = conn.execute(text("SELECT id FROM log_entries ORDER BY id")).scalars().all()
+
+        command.upgrade(config, "2b8e0f4c6d13")
+        with engine.begin() as conn:
+            assert _is_partitioned(conn)
+            assert _primary_key(conn) == ["id", "timestamp"]
+            partitions = set(conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'log_entries'::regclass"
+            )).scalars())
+            assert {"log_entries_2024_01", "log_entries_2024_02", "log_entries_default"} <= partitions
+            assert conn.execute(text("SELECT COUNT(*) FROM log_entries_2024_01")).scalar() == 2
+            assert conn.execute(text("SELECT id FROM log_entries ORDER BY id")).scalars().all() == old_ids
+            rollups = conn.execute(text("SELECT bucket, count FROM log_rollups ORDER BY bucket")).all()
+            assert [(str(bucket), count) for bucket, count in rollups] == [
+                ("2024-01-15 10:00:00", 2), ("2024-02-20 08:00:00", 1)
+            ]
+            # The id sequence carries on where the unpartitioned table left off
+            _insert_log(conn, "2024-02-21 08:00")
+            assert conn.execute(text("SELECT MAX(id) FROM log_entries")).scalar() > max(old_ids)
+
+        command.downgrade(config, "d41b7a2e9c05")
+        with engine.begin() as conn:
+            assert not _is_partitioned(conn)
+            assert _primary_key(conn) == ["id"]
+            assert conn.execute(text("SELECT COUNT(*) FROM log_entries")).scalar() == len(old_ids) + 1
+    finally:
+        engine.dispose()
+
+
+def test_postgres_maintenance_creates_and_expires_partitions(postgres_url, tmp_path):
+    command.upgrade(_alembic(postgres_url), "head")
+    engine = create_engine(postgres_url)
+    retention = LogRetentionService(retention_days=90, archive_dir=str(tmp_path))
+
+    def maintain(now):
+        with Session(engine) as db:
+            return retention.run_maintenance(db, now=now)
+
+    def count(table):
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+    try:
+        # No partition covers the month yet, so the row lands in the default partition
+        with engine.begin() as conn:
+            _insert_log(conn, "2024-01-15 10:00")
+        result = maintain(datetime(2024, 1, 20))
+        assert result["created"] == ["log_entries_2024_01", "log_entries_2024_02"]
+        assert result["archived"] == []
+        assert count("log_entries_default") == 0
+        assert count("log_entries_2024_01") == 1
+
+        with engine.begin() as conn:
+            _insert_log(conn, "2031-01-05 12:00")
+        result = maintain(datetime(2031, 1, 10))
+        assert result["created"] == ["log_entries_2031_01", "log_entries_2031_02"]
+        assert {"log_entries_2024_01", "log_entries_2024_02"} <= set(result["archived"])
+        assert count("log_entries_2031_01") == 1
+        assert count("log_entries") == 1
+
+        with gzip.open(tmp_path / "log_entries_2024_01.ndjson.gz", "rt") as archive:
+            assert [json.loads(line)["timestamp"] for line in archive] == ["2024-01-15 10:00:00"]
+    finally:
+        engine.dispose()
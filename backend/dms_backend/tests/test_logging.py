@@ -0,0 +1,82 @@
+"""LoggingService and the buffered log sink"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models import Document, LogEntry, LogRollup
+from app.services import logging as logging_module
+from app.services.logging import LogSink, logging_service
+
+
+def test_entries_left_in_the_callers_transaction_roll_back_with_it(database, run, monkeypatch):
+    sink = LogSink(flush_interval=0.01)
+    monkeypatch.setattr(logging_module, "log_sink", sink)
+
+    async def scenario():
+        await sink.start()
+        try:
+            async with AsyncSessionLocal() as db:
+                await logging_service.log_events(
+                    db, "document_move", [{"document_id": 1}, {"document_id": 2}], commit=False
+                )
+                await db.rollback()
+        finally:
+            await sink.stop()
+        async with AsyncSessionLocal() as db:
+            return [
+                (await db.execute(select(func.count()).select_from(model))).scalar()
+                for model in (LogEntry, LogRollup)
+            ]
+
+    assert run(scenario()) == [0, 0]
+
+
+@pytest.fixture
+def foreign_keys():
+    """Enforce foreign keys on new async connections, as Postgres does"""
+    def enable(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    event.listen(async_engine.sync_engine, "connect", enable)
+    yield
+    event.remove(async_engine.sync_engine, "connect", enable)
+
+
+def test_sink_keeps_the_batch_when_entries_are_dangling_or_bad(database, run, foreign_keys):
+    db = SessionLocal()
+    document = Document(filename="kept.pdf", google_drive_id="kept")
+    db.add(document)
+    db.commit()
+    document_id = document.id
+    db.close()
+
+    def entry(event_type, document_id=None, user_id=None):
+        return {
+            "event_type": event_type, "document_id": document_id, "user_id": user_id,
+            "details": None, "timestamp": datetime(2024, 3, 1, 9)
+        }
+
+    async def scenario():
+        await LogSink()._write([
+            entry("document_upload", document_id),
+            # The document and the user were deleted before the flush
+            entry("document_move", 404),
+            entry("document_upload", user_id=404),
+            # Fails on its own: event_type is required
+            entry(None),
+        ])
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(LogEntry.event_type, LogEntry.document_id, LogEntry.user_id).order_by(LogEntry.id)
+            )
+            return rows.all()
+
+    assert run(scenario()) == [
+        ("document_upload", document_id, None),
+        ("document_move", None, None),
+        ("document_upload", None, None),
+    ]
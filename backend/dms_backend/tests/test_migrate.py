@@ -0,0 +1,43 @@
+"""Upgrading databases that create_all made before the app used migrations"""
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from app.migrate import CREATE_ALL_REVISIONS, alembic_config, migrate
+
+
+def test_database_without_migration_history_is_upgraded_to_head(database):
+    # The schema startup produced back then, without its migration history
+    database.dispose()
+    with database.begin() as conn:
+        for name in inspect(conn).get_table_names():
+            conn.execute(text(f'DROP TABLE "{name}"'))
+    config = alembic_config()
+    for revision in CREATE_ALL_REVISIONS:
+        command.upgrade(config, revision)
+    with database.begin() as conn:
+        conn.execute(text("DROP TABLE alembic_version"))
+        # Only create_all made this table then
+        conn.execute(text(
+            "CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, message VARCHAR NOT NULL, "
+            "event_type VARCHAR NOT NULL, document_id INTEGER, created_at DATETIME NOT NULL, read BOOLEAN, "
+            "read_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'user@example.com')"))
+        conn.execute(text(
+            "INSERT INTO notifications (user_id, message, event_type, created_at, read) VALUES "
+            "(1, 'a', 'document_upload', CURRENT_TIMESTAMP, 0), (1, 'b', 'document_upload', CURRENT_TIMESTAMP, 0)"
+        ))
+
+    migrate()
+
+    with database.connect() as conn:
+        versions = conn.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+        tables = inspect(conn).get_table_names()
+        user_columns = [column["name"] for column in inspect(conn).get_columns("users")]
+        counters = conn.execute(text("SELECT user_id, unread_count FROM notification_counters")).all()
+    assert versions == [ScriptDirectory.from_config(config).get_current_head()]
+    assert {"notification_counters", "log_rollups"} <= set(tables)
+    assert "email_digest" in user_columns
+    # Seeded by the migration, which create_all would have skipped
+    assert counters == [(1, 2)]
@@ -0,0 +1,155 @@
+"""NotificationService against the scratch database"""
+import asyncio
+
+from app.database import AsyncSessionLocal
+from app.models import User
+from app.routers import notifications as notifications_router
+from app.services.notification_events import notification_broker
+from app.services.email_delivery import email_delivery
+from app.services.notifications import notification_service
+
+
+async def _user(email: str = "user@example.com", **values) -> int:
+    async with AsyncSessionLocal() as db:
+        user = User(email=email, **values)
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def _unread_count(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await notification_service.get_unread_count(db, user_id)
+
+
+def test_concurrent_mark_as_read_decrements_once(database, run):
+    async def scenario():
+        user_id = await _user()
+        async with AsyncSessionLocal() as db:
+            first = await notification_service.create_notification(db, user_id, "First", "document_upload")
+            await notification_service.create_notification(db, user_id, "Second", "document_upload")
+
+        async def mark():
+            async with AsyncSessionLocal() as db:
+                return await notification_service.mark_as_read(db, first.id)
+
+        marked = await asyncio.gather(*[mark() for _ in range(5)])
+        assert all(notification.read for notification in marked)
+        return await _unread_count(user_id)
+
+    assert run(scenario()) == 1
+
+
+def test_mark_as_read_of_unknown_notification(database, run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            return await notification_service.mark_as_read(db, 404)
+
+    assert run(scenario()) is None
+
+
+def test_new_notifications_are_emailed_with_each_users_digest_setting(database, run, monkeypatch):
+    sent = []
+    monkeypatch.setattr(notification_service, "smtp_user", "dms@example.com")
+    monkeypatch.setattr(notification_service, "smtp_password", "secret")
+    monkeypatch.setattr(
+        email_delivery, "send",
+        lambda recipient, subject, body, digest=False: sent.append((recipient, subject, body, digest))
+    )
+
+    async def scenario():
+        immediate = await _user("immediate@example.com")
+        digested = await _user("digest@example.com", email_digest=True)
+        async with AsyncSessionLocal() as db:
+            await notification_service.create_notifications(
+                db, [immediate, digested], "New document uploaded: a.pdf", "document_upload"
+            )
+            await notification_service.create_notification(db, digested, "Document moved: a.pdf", "document_move")
+
+    run(scenario())
+    assert sorted(sent) == [
+        ("digest@example.com", "Document move", "Document moved: a.pdf", True),
+        ("digest@example.com", "Document upload", "New document uploaded: a.pdf", True),
+        ("immediate@example.com", "Document upload", "New document uploaded: a.pdf", False),
+    ]
+
+
+def test_no_email_without_smtp_credentials(database, run, monkeypatch):
+    sent = []
+    monkeypatch.setattr(notification_service, "smtp_user", None)
+    monkeypatch.setattr(email_delivery, "send", lambda *args, **kwargs: sent.append(args))
+
+    async def scenario():
+        user_id = await _user()
+        async with AsyncSessionLocal() as db:
+            await notification_service.create_notification(db, user_id, "Hello", "document_upload")
+
+    run(scenario())
+    assert sent == []
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def _notify(user_id: int, count: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return [
+            (await notification_service.create_notification(db, user_id, f"Note {i}", "document_upload")).id
+            for i in range(count)
+        ]
+
+
+async def _open_stream(user_id: int, last_event_id=None):
+    response = await notifications_router.stream_notifications(_ConnectedRequest(), user_id, last_event_id)
+    stream = response.body_iterator
+    assert (await stream.__anext__()).startswith("retry:")
+    return stream
+
+
+async def _event_ids(stream, count: int) -> list:
+    events = [await asyncio.wait_for(stream.__anext__(), 5) for _ in range(count)]
+    return [int(event.split("\n")[0].removeprefix("id: ")) for event in events]
+
+
+def test_stream_replays_everything_after_the_last_event_id(database, run, monkeypatch):
+    monkeypatch.setattr(notifications_router, "STREAM_REPLAY_LIMIT", 2)
+
+    async def scenario():
+        user_id = await _user()
+        ids = await _notify(user_id, 5)
+        stream = await _open_stream(user_id, last_event_id=ids[0])
+        try:
+            replayed = await _event_ids(stream, 4)
+            live = await _notify(user_id, 1)
+            return ids, replayed, live, await _event_ids(stream, 1)
+        finally:
+            await stream.aclose()
+
+    ids, replayed, live, received = run(scenario())
+    assert replayed == ids[1:]
+    assert received == live
+
+
+def test_lagging_stream_catches_up_from_where_it_was(database, run, monkeypatch):
+    monkeypatch.setattr(notifications_router, "STREAM_REPLAY_LIMIT", 2)
+    monkeypatch.setattr(notification_broker, "queue_size", 1)
+
+    async def scenario():
+        user_id = await _user()
+        await _notify(user_id, 3)
+        stream = await _open_stream(user_id)
+        try:
+            # One event fits in the queue, the others are caught up in pages
+            missed = await _notify(user_id, 5)
+            received = await _event_ids(stream, 5)
+            live = await _notify(user_id, 1)
+            return missed, received, live, await _event_ids(stream, 1)
+        finally:
+            await stream.aclose()
+
+    missed, received, live, after = run(scenario())
+    assert received == missed
+    assert after == live
+    assert notification_broker.connection_count == 0